@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Single entry point for the AZ-104 crawler tools
+Each command's module is imported only when that command runs, so file-only
+tasks (catalog, link checks, asset GC, fixing source URLs) start without
+loading Playwright, aiohttp or BeautifulSoup
+
+    python az104.py <command> [options]
+    python az104.py <command> --help
+"""
+
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent
+
+# command -> (directory, module, extra arguments, description)
+COMMANDS = {
+    'build': ('crawlers', 'workflow', [], "bring content and site up to date, running only out-of-date steps"),
+    'serve': ('crawlers', 'dev_server', [], "preview the site locally, rebuilding and reloading on every save"),
+    'crawl': ('scripts', 'az104_crawler', [], "crawl courses from courses.json"),
+    'recrawl': ('crawlers', 'batch_processor', [], "batch re-crawl menu and sharded re-crawls"),
+    'fix-urls': ('crawlers', 'batch_processor', ['--fix-source-urls'], "fix source links in saved unit pages"),
+    'rewrite': ('crawlers', 'html_rewrite', [], "apply maintenance rewrites to every unit page in one pass"),
+    'export': ('crawlers', 'unit_export', [], "write structured JSON documents of saved unit pages"),
+    'snapshot': ('crawlers', 'snapshot_store', [], "snapshot history of crawled pages and change reports"),
+    'retry': ('crawlers', 'retry_failed_units', [], "retry units from the retry queue"),
+    'catalog': ('crawlers', 'course_catalog', [], "course catalog maintenance"),
+    'check-links': ('crawlers', 'link_checker', [], "check local links and assets of every unit page"),
+    'asset-gc': ('crawlers', 'asset_gc', [], "reclaim unreferenced and duplicate assets"),
+    'clean': ('scripts', 'content_cleaner', [], "clean saved unit pages"),
+    'translate': ('crawlers', 'translation_tools', [], "Vietnamese translation templates and terminology"),
+    'benchmark': ('benchmarks', 'run_benchmark', [], "benchmark the crawlers against the replay server")
+}
+
+def usage():
+    """Print the available commands"""
+    print("Usage: python az104.py <command> [options]\n")
+    print("Commands:")
+    for name, (_directory, _module, _args, description) in COMMANDS.items():
+        print(f"  {name:<13}{description}")
+
+def run(command, args):
+    """Import a command's module and run its main() with the remaining arguments"""
+    directory, module_name, extra_args, _description = COMMANDS[command]
+    # Sibling modules import each other as top-level modules
+    for path in (REPO_ROOT / "crawlers", REPO_ROOT / directory):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+    sys.argv = [f"az104.py {command}", *extra_args, *args]
+
+    import importlib
+    import inspect
+    module = importlib.import_module(module_name)
+    if inspect.iscoroutinefunction(module.main):
+        import asyncio
+        return asyncio.run(module.main())
+    return module.main()
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] in ('-h', '--help', 'help'):
+        usage()
+        return
+    command = sys.argv[1]
+    if command not in COMMANDS:
+        print(f"❌ Unknown command: {command}\n")
+        usage()
+        sys.exit(2)
+    run(command, sys.argv[2:])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Import-time budget check for file-only entry points
+Imports each module in a fresh interpreter with `python -X importtime`, and
+fails when one takes longer than its budget or loads a heavy dependency
+(Playwright, aiohttp, BeautifulSoup) it should only import on demand
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Heavy packages file-only tools must not load at startup
+HEAVY_PACKAGES = ('playwright', 'aiohttp', 'bs4', 'lxml')
+
+# module -> directory; every one of them serves at least one command that touches only files
+FILE_ONLY_MODULES = {
+    'batch_processor': 'crawlers',
+    'retry_failed_units': 'crawlers',
+    'course_catalog': 'crawlers',
+    'link_checker': 'crawlers',
+    'html_rewrite': 'crawlers',
+    'unit_export': 'crawlers',
+    'snapshot_store': 'crawlers',
+    'asset_gc': 'crawlers',
+    'translation_tools': 'crawlers',
+    'workflow': 'crawlers',
+    'dev_server': 'crawlers',
+    'content_cleaner': 'scripts'
+}
+
+def measure(module, directory):
+    """(milliseconds to import module, set of top-level packages it loaded)"""
+    paths = [str(REPO_ROOT / "crawlers"), str(REPO_ROOT / directory)]
+    code = f"import sys; sys.path[:0] = {paths!r}; import {module}"
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, cwd=REPO_ROOT
+    )
+    if result.returncode:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    # Lines look like "import time:   self [us] | cumulative | [indent]package"
+    cumulative_us = None
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _self_us, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        loaded.add(name.strip().split('.')[0])
+        # Nested imports are indented; the module itself is the unindented entry
+        if name.strip() == module and not name[1:].startswith(' '):
+            cumulative_us = int(cumulative)
+    return (cumulative_us or 0) / 1000, loaded
+
+def measure_cli(runs):
+    """Fastest wall-clock time of `python az104.py --help`, in milliseconds"""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, str(REPO_ROOT / "az104.py"), '--help'], capture_output=True, check=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time of file-only entry points")
+    parser.add_argument('--budget', type=float, default=100.0, help="milliseconds allowed per module import")
+    parser.add_argument('--cli-budget', type=float, default=150.0, help="milliseconds allowed for az104.py --help")
+    parser.add_argument('--runs', type=int, default=3, help="imports per module; the fastest counts")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<22}{'import ms':>10}  heavy packages")
+    for module, directory in FILE_ONLY_MODULES.items():
+        samples = [measure(module, directory) for _ in range(args.runs)]
+        milliseconds = min(sample[0] for sample in samples)
+        heavy = sorted(set(HEAVY_PACKAGES) & samples[0][1])
+        print(f"{module:<22}{milliseconds:>10.1f}  {', '.join(heavy) or '-'}")
+        if milliseconds > args.budget:
+            failures.append(f"{module} takes {milliseconds:.1f} ms to import (budget {args.budget:.0f} ms)")
+        if heavy:
+            failures.append(f"{module} loads {', '.join(heavy)} at import time")
+
+    cli_ms = measure_cli(args.runs)
+    print(f"{'az104.py --help':<22}{cli_ms:>10.1f}  (wall clock, including interpreter startup)")
+    if cli_ms > args.cli_budget:
+        failures.append(f"az104.py --help takes {cli_ms:.1f} ms (budget {args.cli_budget:.0f} ms)")
+
+    if failures:
+        print("\n❌ Import budget exceeded:")
+        for failure in failures:
+            print(f"   - {failure}")
+        sys.exit(1)
+    print("\n✅ All entry points within the import budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Parity check for in-browser content pruning
+Loads saved unit pages into Chromium, cleans each one with both the Python
+cleaner (content_rules.prune_soup) and the in-page script (PRUNE_CONTENT_JS),
+and reports any difference along with transfer size and parse time savings
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+import time
+from pathlib import Path
+from bs4 import BeautifulSoup
+from playwright.async_api import async_playwright
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "crawlers"))
+
+from content_rules import (
+    CLEANER_UNWANTED, COURSE_CRAWLER_UNWANTED, COURSE_ROOT_SELECTORS, IMAGE_CRAWLER_UNWANTED,
+    UNIT_ROOT_SELECTORS, UNWANTED_TEXT_PATTERNS, prune_args, prune_soup
+)
+from page_scripts import PRUNE_CONTENT_JS
+
+# rule set name -> (root selectors, unwanted selectors, text patterns, drop empty elements)
+RULE_SETS = {
+    'image': (UNIT_ROOT_SELECTORS, IMAGE_CRAWLER_UNWANTED, (), False),
+    'course': (COURSE_ROOT_SELECTORS, COURSE_CRAWLER_UNWANTED, (), False),
+    'cleaner': (UNIT_ROOT_SELECTORS, CLEANER_UNWANTED, UNWANTED_TEXT_PATTERNS, True)
+}
+
+def normalize(html):
+    """Serialize through the same parser and drop inter-tag whitespace so only real differences remain"""
+    return re.sub(r'>\s+<', '><', str(BeautifulSoup(html, 'html.parser'))).strip()
+
+def first_difference(expected, actual, context=80):
+    """Short excerpt around the first position where two strings differ"""
+    index = next((i for i, (a, b) in enumerate(zip(expected, actual)) if a != b), min(len(expected), len(actual)))
+    start = max(0, index - context // 2)
+    return expected[start:start + context], actual[start:start + context]
+
+async def check_page(page, html, rule_set):
+    """Compare both cleaners on one page; returns a result dict"""
+    roots, selectors, patterns, drop_empty = RULE_SETS[rule_set]
+    await page.set_content(html, wait_until='domcontentloaded')
+
+    root = None
+    for selector in roots:
+        root = await page.query_selector(selector)
+        if root:
+            break
+    if not root:
+        return None
+
+    # Python path: transfer everything, then parse and prune
+    full_html = await root.inner_html()
+    start = time.perf_counter()
+    soup = BeautifulSoup(full_html, 'html.parser')
+    prune_soup(soup, selectors, patterns, drop_empty)
+    python_seconds = time.perf_counter() - start
+
+    # Browser path: prune in the page, then parse the remaining fragment
+    pruned = await page.evaluate(PRUNE_CONTENT_JS, prune_args(roots, selectors, patterns, drop_empty))
+    start = time.perf_counter()
+    browser_soup = BeautifulSoup(pruned['html'], 'html.parser')
+    browser_seconds = time.perf_counter() - start
+
+    expected = normalize(str(soup))
+    actual = normalize(str(browser_soup))
+    python_images = [img.get('src') for img in soup.find_all('img')]
+    browser_images = [image['src'] for image in pruned['images']]
+
+    return {
+        'match': expected == actual and python_images == browser_images,
+        'diff': None if expected == actual else first_difference(expected, actual),
+        'images_match': python_images == browser_images,
+        'full_bytes': len(full_html),
+        'pruned_bytes': len(pruned['html']),
+        'python_seconds': python_seconds,
+        'browser_seconds': browser_seconds
+    }
+
+def collect_pages(paths, limit):
+    """HTML files from the given files and directories"""
+    pages = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            pages.extend(sorted(path.rglob("*.html")))
+        elif path.suffix == ".html":
+            pages.append(path)
+    return pages[:limit] if limit else pages
+
+async def run(pages, rule_sets):
+    """Check every page against every rule set; returns the number of mismatches"""
+    mismatches = 0
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        # Saved pages may reference images that don't exist locally
+        await page.route("**/*", lambda route: route.abort() if route.request.resource_type == 'image' else route.continue_())
+
+        for rule_set in rule_sets:
+            totals = {'pages': 0, 'full_bytes': 0, 'pruned_bytes': 0, 'python_seconds': 0.0, 'browser_seconds': 0.0}
+            print(f"\n🔎 Rule set: {rule_set}")
+
+            for page_file in pages:
+                result = await check_page(page, page_file.read_text(encoding='utf-8', errors='replace'), rule_set)
+                if result is None:
+                    continue
+                totals['pages'] += 1
+                for key in ('full_bytes', 'pruned_bytes', 'python_seconds', 'browser_seconds'):
+                    totals[key] += result[key]
+
+                if not result['match']:
+                    mismatches += 1
+                    print(f"❌ Mismatch: {page_file}")
+                    if result['diff']:
+                        print(f"   python:  {result['diff'][0]!r}")
+                        print(f"   browser: {result['diff'][1]!r}")
+                    if not result['images_match']:
+                        print(f"   image lists differ")
+
+            if not totals['pages']:
+                print("⚠️  No page had unit content")
+                continue
+            saved = 1 - totals['pruned_bytes'] / max(1, totals['full_bytes'])
+            print(f"📄 Pages: {totals['pages']}")
+            print(f"📦 Transferred: {totals['full_bytes']:,} → {totals['pruned_bytes']:,} bytes ({saved:.0%} less)")
+            print(f"⏱️  Python-side parse: {totals['python_seconds']:.3f}s → {totals['browser_seconds']:.3f}s")
+
+        await browser.close()
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Check in-browser pruning against the Python cleaner")
+    parser.add_argument('paths', nargs='*', default=["benchmarks/fixtures/pages"],
+                        help="HTML files or directories (default: recorded benchmark pages)")
+    parser.add_argument('--rules', choices=sorted(RULE_SETS), action='append',
+                        help="rule set to check (repeatable, default: all)")
+    parser.add_argument('--limit', type=int, default=0, help="check at most this many pages")
+    args = parser.parse_args()
+
+    pages = collect_pages(args.paths, args.limit)
+    if not pages:
+        print("❌ No HTML pages found (record fixtures first: python benchmarks/record_fixtures.py)")
+        sys.exit(1)
+
+    mismatches = asyncio.run(run(pages, args.rules or sorted(RULE_SETS)))
+    if mismatches:
+        print(f"\n❌ {mismatches} mismatches")
+        sys.exit(1)
+    print(f"\n✅ In-browser pruning matches the Python cleaner")
+
+if __name__ == "__main__":
+    main()
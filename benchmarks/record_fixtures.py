@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Record a fixture corpus for offline crawler benchmarks
+Fetches learning path pages, their unit pages and images once and stores them
+with a manifest that benchmarks/replay_server.py can serve
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+
+SOURCE_BASE = "https://learn.microsoft.com"
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+class FixtureRecorder:
+    """Downloads pages and images into a replayable corpus"""
+
+    def __init__(self, corpus_dir=Path("benchmarks/fixtures"), concurrency=4):
+        self.corpus_dir = Path(corpus_dir)
+        self.concurrency = concurrency
+        self.resources = {}   # url path -> {'file': ..., 'content_type': ...}
+        self.session = None
+
+    def _store(self, url_path, body, content_type, suffix):
+        """Save a response body under a hashed name"""
+        name = hashlib.sha1(url_path.encode()).hexdigest()[:16] + suffix
+        subdir = "pages" if suffix == ".html" else "assets"
+        file_path = self.corpus_dir / subdir / name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(body)
+        self.resources[url_path] = {'file': f"{subdir}/{name}", 'content_type': content_type}
+
+    def _rewrite_page(self, html):
+        """Make a page self-contained for replay: root-relative links, no third-party scripts"""
+        soup = BeautifulSoup(html, 'html.parser')
+        for script in soup.find_all('script'):
+            script.decompose()
+        return str(soup).replace(SOURCE_BASE + "/", "/")
+
+    async def fetch(self, url):
+        """GET a URL, returning (body, content_type) or None"""
+        try:
+            async with self.session.get(url) as response:
+                if response.status != 200:
+                    print(f"❌ HTTP {response.status}: {url}")
+                    return None
+                return await response.read(), response.headers.get('Content-Type', 'application/octet-stream')
+        except Exception as e:
+            print(f"❌ Error fetching {url}: {e}")
+            return None
+
+    async def record_page(self, url, record_images=True):
+        """Record a page and (optionally) the images it references"""
+        url_path = urlparse(url).path
+        if url_path in self.resources:
+            return
+        result = await self.fetch(url)
+        if not result:
+            return
+        body, content_type = result
+        html = body.decode('utf-8', errors='replace')
+        self._store(url_path, self._rewrite_page(html).encode('utf-8'), content_type, ".html")
+        print(f"✅ Recorded page: {url_path}")
+
+        if record_images:
+            image_urls = set()
+            for src in re.findall(r'<img[^>]+src="([^"]+)"', html):
+                if not src.startswith('data:'):
+                    image_urls.add(urljoin(url, src))
+            for image_url in sorted(image_urls):
+                await self.record_image(image_url)
+
+    async def record_image(self, url):
+        """Record a single image"""
+        url_path = urlparse(url).path
+        if url_path in self.resources or urlparse(url).netloc not in ("", urlparse(SOURCE_BASE).netloc):
+            return
+        result = await self.fetch(url)
+        if result:
+            body, content_type = result
+            self._store(url_path, body, content_type, Path(url_path).suffix or ".bin")
+
+    async def record(self, course_structure, path_numbers):
+        """Record the selected learning paths and every unit in them"""
+        self.corpus_dir.mkdir(parents=True, exist_ok=True)
+        self.session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=60), headers={'User-Agent': USER_AGENT}
+        )
+
+        selected = [
+            (number, course_structure['learning_paths'][number - 1])
+            for number in path_numbers
+            if 0 < number <= len(course_structure['learning_paths'])
+        ]
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def record_limited(url, record_images=True):
+            async with semaphore:
+                await self.record_page(url, record_images)
+
+        try:
+            tasks = []
+            for _number, learning_path in selected:
+                tasks.append(record_limited(learning_path['url'], record_images=False))
+                for module in learning_path.get('modules', []):
+                    for unit in module.get('units', []):
+                        tasks.append(record_limited(unit['url']))
+            await asyncio.gather(*tasks)
+        finally:
+            await self.session.close()
+
+        manifest = {
+            'recorded_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'source': SOURCE_BASE,
+            'learning_paths': [
+                {'number': number, 'title': lp['title'], 'path': urlparse(lp['url']).path,
+                 'expected_modules': lp.get('expected_modules')}
+                for number, lp in selected
+            ],
+            # Structure with host-less URLs; the benchmark points it at the replay server
+            'structure': {
+                **{key: value for key, value in course_structure.items() if key != 'learning_paths'},
+                'learning_paths': [lp for _number, lp in selected]
+            },
+            'resources': self.resources
+        }
+        with open(self.corpus_dir / "manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        total_bytes = sum((self.corpus_dir / entry['file']).stat().st_size for entry in self.resources.values())
+        print(f"\n🎉 Recorded {len(self.resources)} resources ({total_bytes / 1024 / 1024:.1f} MB) to {self.corpus_dir}")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Record a fixture corpus for offline benchmarks")
+    parser.add_argument('--structure', default="content/course_structure.json")
+    parser.add_argument('--corpus', default="benchmarks/fixtures")
+    parser.add_argument('--paths', default="1", help="comma-separated learning path numbers to record")
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+
+    with open(args.structure, 'r', encoding='utf-8') as f:
+        course_structure = json.load(f)
+
+    recorder = FixtureRecorder(Path(args.corpus), args.concurrency)
+    await recorder.record(course_structure, [int(n) for n in args.paths.split(',') if n.strip()])
+
+if __name__ == "__main__":
+    asyncio.run(main())
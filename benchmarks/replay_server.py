@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Local replay server for offline crawler benchmarks
+Serves a recorded fixture corpus with configurable latency, bandwidth and error injection
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+class FixtureCorpus:
+    """Recorded pages and images keyed by URL path"""
+
+    def __init__(self, corpus_dir=Path("benchmarks/fixtures")):
+        self.corpus_dir = Path(corpus_dir)
+        manifest_file = self.corpus_dir / "manifest.json"
+        if not manifest_file.exists():
+            raise FileNotFoundError(f"No fixture manifest at {manifest_file}; run benchmarks/record_fixtures.py first")
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+
+    def lookup(self, path):
+        """Return (body, content_type) for a request path, or None"""
+        entry = self.manifest['resources'].get(path)
+        if entry is None and not path.endswith('/'):
+            entry = self.manifest['resources'].get(path + '/')
+        if entry is None:
+            return None
+        return (self.corpus_dir / entry['file']).read_bytes(), entry['content_type']
+
+class ReplayServer:
+    """Threaded HTTP server replaying a fixture corpus"""
+
+    def __init__(self, corpus, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 bandwidth=None, error_rate=0.0, retry_after=None, seed=None):
+        self.corpus = corpus
+        self.latency = latency          # seconds added before each response
+        self.jitter = jitter            # +/- seconds of random latency
+        self.bandwidth = bandwidth      # bytes per second, None for unlimited
+        self.error_rate = error_rate    # fraction of requests answered with 503
+        self.retry_after = retry_after  # Retry-After seconds sent with injected errors
+        self.random = random.Random(seed)
+        self.random_lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors_injected': 0, 'not_found': 0, 'bytes_sent': 0}
+        self.stats_lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """Base URL of the running server"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _count(self, key, value=1):
+        with self.stats_lock:
+            self.stats[key] += value
+
+    def _roll(self):
+        with self.random_lock:
+            return self.random.random(), self.random.uniform(-self.jitter, self.jitter)
+
+    def _handler_class(self):
+        server = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server._count('requests')
+                roll, jitter = server._roll()
+                delay = max(0.0, server.latency + jitter)
+                if delay:
+                    time.sleep(delay)
+
+                if roll < server.error_rate:
+                    server._count('errors_injected')
+                    self.send_response(503)
+                    if server.retry_after is not None:
+                        self.send_header('Retry-After', str(server.retry_after))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                found = server.corpus.lookup(urlparse(self.path).path)
+                if found is None:
+                    server._count('not_found')
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                body, content_type = found
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self._send_throttled(body)
+
+            def _send_throttled(self, body):
+                if not server.bandwidth:
+                    self.wfile.write(body)
+                    server._count('bytes_sent', len(body))
+                    return
+                chunk_size = 16 * 1024
+                for offset in range(0, len(body), chunk_size):
+                    chunk = body[offset:offset + chunk_size]
+                    self.wfile.write(chunk)
+                    server._count('bytes_sent', len(chunk))
+                    time.sleep(len(chunk) / server.bandwidth)
+
+        return ReplayHandler
+
+    def start(self):
+        """Serve in a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Shut the server down"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a recorded fixture corpus")
+    parser.add_argument('--corpus', default="benchmarks/fixtures")
+    parser.add_argument('--port', type=int, default=8104)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random +/- seconds of latency")
+    parser.add_argument('--bandwidth', type=float, default=None, help="KB/s per response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--retry-after', type=int, default=None)
+    args = parser.parse_args()
+
+    server = ReplayServer(
+        FixtureCorpus(args.corpus), port=args.port, latency=args.latency, jitter=args.jitter,
+        bandwidth=args.bandwidth * 1024 if args.bandwidth else None,
+        error_rate=args.error_rate, retry_after=args.retry_after
+    )
+    print(f"🛰️  Replaying {len(server.corpus.manifest['resources'])} resources at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Stopped")
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Offline crawler benchmark
+Runs AZ104ImageCrawler, AZ104Crawler and BatchProcessor against the local replay
+server and reports units/sec, CPU time and peak RSS for each
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+from replay_server import FixtureCorpus, ReplayServer
+
+TARGETS = ("image", "course", "pipeline", "batch")
+UNIT_LIMITED_TARGETS = ("image", "batch")  # course and pipeline crawl every recorded learning path
+
+def localize_structure(structure, server_url):
+    """Point every URL in a course structure at the replay server"""
+    source = "https://learn.microsoft.com"
+    return json.loads(json.dumps(structure).replace(source, server_url))
+
+def usage_snapshot():
+    """CPU seconds and peak RSS (MB) for this process and its children (Chromium)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return {
+        'cpu_seconds': own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime,
+        'peak_rss_mb': own.ru_maxrss / scale,
+        'peak_child_rss_mb': children.ru_maxrss / scale
+    }
+
+async def run_image_crawler(manifest, server_url, unit_limit):
+    """Re-crawl units one by one with AZ104ImageCrawler"""
+    from az104_image_crawler import AZ104ImageCrawler
+
+    crawler = AZ104ImageCrawler()
+    structure = localize_structure(manifest['structure'], server_url)
+    units = [
+        unit
+        for learning_path in structure['learning_paths']
+        for module in learning_path['modules']
+        for unit in module['units']
+    ][:unit_limit]
+    for unit in units:
+        await crawler.recrawl_single_unit(unit['url'], Path("content") / unit['local_file'])
+    await crawler.close_session()
+    return crawler.tracer
+
+async def run_course_crawler(manifest, server_url, unit_limit, pipeline=False):
+    """Crawl the recorded learning paths end to end with AZ104Crawler"""
+    from az104_crawler import AZ104Crawler
+
+    course = {
+        'code': 'az-104',
+        'title': manifest['structure'].get('course_title') or 'AZ-104: Microsoft Azure Administrator',
+        'url': '/en-us/training/courses/az-104t00',
+        'learning_paths': [
+            {'title': lp['title'], 'url': lp['path'], 'expected_modules': lp['expected_modules']}
+            for lp in manifest['learning_paths']
+        ]
+    }
+    crawler = AZ104Crawler(pipeline=pipeline, courses=[course], base_url=server_url)
+    await crawler.crawl_complete_course()
+    return crawler.tracer
+
+async def run_course_pipeline(manifest, server_url, unit_limit):
+    """Crawl the recorded learning paths with AZ104Crawler's staged pipeline"""
+    return await run_course_crawler(manifest, server_url, unit_limit, pipeline=True)
+
+async def run_batch_processor(manifest, server_url, unit_limit):
+    """Re-crawl the recorded units through BatchProcessor"""
+    from batch_processor import BatchProcessor
+
+    structure = localize_structure(manifest['structure'], server_url)
+    remaining = unit_limit
+    for learning_path in structure['learning_paths']:
+        for module in learning_path['modules']:
+            module['units'] = module['units'][:max(0, remaining)]
+            remaining -= len(module['units'])
+
+    Path("content").mkdir(exist_ok=True)
+    with open("content/course_structure.json", 'w', encoding='utf-8') as f:
+        json.dump(structure, f)
+
+    processor = BatchProcessor()
+    await processor.recrawl_all_units()
+    return processor.crawler.tracer
+
+RUNNERS = {
+    'image': run_image_crawler,
+    'course': run_course_crawler,
+    'pipeline': run_course_pipeline,
+    'batch': run_batch_processor
+}
+
+def run_target(target, corpus_dir, server_url, unit_limit, results):
+    """Benchmark one target in a fresh process and scratch directory"""
+    sys.path.insert(0, str(REPO_ROOT / "crawlers"))
+    sys.path.insert(0, str(REPO_ROOT / "scripts"))
+    corpus = FixtureCorpus(corpus_dir)
+
+    scratch = tempfile.mkdtemp(prefix=f"az104-bench-{target}-")
+    os.chdir(scratch)
+
+    before = usage_snapshot()
+    started = time.perf_counter()
+    tracer = asyncio.run(RUNNERS[target](corpus.manifest, server_url, unit_limit))
+    elapsed = time.perf_counter() - started
+    # multiprocessing children skip atexit, so write out queued log records here
+    from crawl_log import stop_logging
+    stop_logging()
+    after = usage_snapshot()
+
+    tracer.export_chrome_trace(Path(scratch) / "trace.json")
+    units_ok = int(tracer.counters.get('units_ok', 0))
+    units_failed = int(tracer.counters.get('units_failed', 0))
+    results.put({
+        'target': target,
+        'wall_seconds': elapsed,
+        'units_ok': units_ok,
+        'units_failed': units_failed,
+        'units_per_second': units_ok / elapsed if elapsed else 0.0,
+        'cpu_seconds': after['cpu_seconds'] - before['cpu_seconds'],
+        'peak_rss_mb': after['peak_rss_mb'],
+        'peak_child_rss_mb': after['peak_child_rss_mb'],
+        'counters': dict(tracer.counters),
+        'scratch_dir': scratch
+    })
+
+def wait_for_result(process, results, timeout):
+    """Result a benchmark process put on its queue, or None if it exited or timed out without one
+    The queue is read before joining: a child that put a large result only exits once it is drained"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                # The result may have arrived between the timeout and the liveness check
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    return None
+            if time.monotonic() > deadline:
+                process.terminate()
+                return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawlers against a local replay server")
+    parser.add_argument('--corpus', default=str(REPO_ROOT / "benchmarks" / "fixtures"))
+    parser.add_argument('--targets', default=",".join(TARGETS), help="comma-separated: image,course,pipeline,batch")
+    parser.add_argument('--units', type=int, default=None, help="units per target (image and batch only; default 10)")
+    parser.add_argument('--timeout', type=float, default=1800, help="seconds before a target's run is abandoned")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--bandwidth', type=float, default=None, help="KB/s per response")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=104)
+    parser.add_argument('--output', default=None, help="write results JSON here")
+    args = parser.parse_args()
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    if args.units is not None:
+        unlimited = [target for target in targets if target in RUNNERS and target not in UNIT_LIMITED_TARGETS]
+        if unlimited:
+            parser.error(f"--units only applies to {', '.join(UNIT_LIMITED_TARGETS)}, not {', '.join(unlimited)}")
+    unit_limit = args.units if args.units is not None else 10
+
+    corpus_dir = Path(args.corpus).resolve()
+    server = ReplayServer(
+        FixtureCorpus(corpus_dir), latency=args.latency, jitter=args.jitter,
+        bandwidth=args.bandwidth * 1024 if args.bandwidth else None,
+        error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed
+    ).start()
+    print(f"🛰️  Replay server at {server.url} (latency={args.latency}s, error_rate={args.error_rate})")
+
+    context = multiprocessing.get_context('spawn')
+    results = []
+    try:
+        for target in targets:
+            if target not in RUNNERS:
+                print(f"❌ Unknown target: {target}")
+                continue
+            print(f"\n{'='*20} {target} {'='*20}")
+            target_results = context.Queue()
+            process = context.Process(
+                target=run_target, args=(target, str(corpus_dir), server.url, unit_limit, target_results)
+            )
+            process.start()
+            result = wait_for_result(process, target_results, args.timeout)
+            process.join()
+            if result is None:
+                print(f"❌ {target} benchmark failed (exit code {process.exitcode})")
+                continue
+            results.append(result)
+    finally:
+        server.stop()
+
+    print(f"\n📊 Benchmark results")
+    print(f"{'target':<10}{'units':>8}{'failed':>8}{'wall s':>10}{'units/s':>10}{'cpu s':>10}{'rss MB':>10}{'child MB':>10}")
+    for result in results:
+        print(
+            f"{result['target']:<10}{result['units_ok']:>8}{result['units_failed']:>8}"
+            f"{result['wall_seconds']:>10.1f}{result['units_per_second']:>10.3f}{result['cpu_seconds']:>10.1f}"
+            f"{result['peak_rss_mb']:>10.0f}{result['peak_child_rss_mb']:>10.0f}"
+        )
+    print(f"🛰️  Server: {server.stats}")
+
+    output = Path(args.output) if args.output else REPO_ROOT / "benchmarks" / "results" / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'settings': vars(args),
+            'server': server.stats,
+            'results': results
+        }, f, indent=2)
+    print(f"💾 Results saved to: {output}")
+
+if __name__ == "__main__":
+    main()
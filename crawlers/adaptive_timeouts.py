@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Adaptive timeouts for AZ-104 crawls
+Latency of every navigation, settle wait and unit is recorded per unit, per
+module and globally in SQLite; timeouts are the p99 of the most specific
+history × a safety factor, so fast pages stop paying worst-case waits and
+slow pages get the time they need
+"""
+
+import sqlite3
+import time
+from collections import deque
+from pathlib import Path
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from crawl_log import get_logger
+from instrumentation import percentile
+from page_scripts import CONTENT_SETTLED_JS
+from unit_urls import canonical_unit_url, module_slug
+
+log = get_logger('timeouts')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS latency_samples (
+    id INTEGER PRIMARY KEY,
+    scope TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_latency_samples_scope ON latency_samples(scope, stage, id);
+"""
+
+# stage -> (default seconds without history, lower bound, upper bound)
+STAGE_LIMITS = {
+    'navigation': (60.0, 10.0, 120.0),
+    'settle': (5.0, 1.0, 30.0),
+    'unit': (120.0, 20.0, 300.0)
+}
+
+# Samples a scope needs before its percentiles are trusted; unit pages are crawled rarely
+MIN_SAMPLES = {'unit': 3, 'module': 5, 'global': 20}
+
+class AdaptiveTimeouts:
+    """Timeouts and hedge delays derived from recorded crawl latency"""
+
+    def __init__(self, db_path=Path("content/course_catalog.db"), factor=3.0, max_samples=200):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.factor = factor            # headroom over the observed p99
+        self.max_samples = max_samples  # most recent samples kept per scope and stage
+        self.samples = {}               # (scope, stage) -> deque of seconds, loaded on first use
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def scopes(self, url):
+        """History scopes for a URL, most specific first"""
+        scopes = [('unit', canonical_unit_url(url))]
+        slug = module_slug(url)
+        if slug:
+            scopes.append(('module', f"module:{slug}"))
+        scopes.append(('global', 'global'))
+        return scopes
+
+    def _history(self, scope, stage):
+        """Recent samples of one scope and stage"""
+        key = (scope, stage)
+        if key not in self.samples:
+            rows = self.conn.execute(
+                "SELECT seconds FROM latency_samples WHERE scope = ? AND stage = ? ORDER BY id DESC LIMIT ?",
+                (scope, stage, self.max_samples)
+            ).fetchall()
+            self.samples[key] = deque(reversed([row[0] for row in rows]), maxlen=self.max_samples)
+        return self.samples[key]
+
+    def record(self, stage, url, seconds):
+        """Add a latency sample to every scope of a URL (timeouts are recorded at the limit that was hit)"""
+        now = time.time()
+        with self.conn:
+            for _level, scope in self.scopes(url):
+                self._history(scope, stage).append(seconds)
+                self.conn.execute(
+                    "INSERT INTO latency_samples (scope, stage, seconds, recorded_at) VALUES (?, ?, ?, ?)",
+                    (scope, stage, seconds, now)
+                )
+                self.conn.execute(
+                    "DELETE FROM latency_samples WHERE scope = ? AND stage = ? AND id NOT IN "
+                    "(SELECT id FROM latency_samples WHERE scope = ? AND stage = ? ORDER BY id DESC LIMIT ?)",
+                    (scope, stage, scope, stage, self.max_samples)
+                )
+
+    def _percentile(self, stage, url, q):
+        """Percentile from the most specific scope with enough history, or None"""
+        for level, scope in self.scopes(url):
+            history = self._history(scope, stage)
+            if len(history) >= MIN_SAMPLES[level]:
+                return percentile(list(history), q)
+        return None
+
+    def timeout(self, stage, url):
+        """Seconds to allow for a stage: p99 × factor within the stage's bounds"""
+        default, lower, upper = STAGE_LIMITS[stage]
+        p99 = self._percentile(stage, url, 99)
+        if p99 is None:
+            return default
+        return min(upper, max(lower, p99 * self.factor))
+
+    def timeout_ms(self, stage, url):
+        """timeout() in milliseconds, for Playwright"""
+        return round(self.timeout(stage, url) * 1000)
+
+    def escalate(self, stage, seconds):
+        """Timeout for the next attempt after one ran out of time"""
+        return min(STAGE_LIMITS[stage][2], seconds * 2)
+
+    async def goto(self, page, url, timeout=None, **kwargs):
+        """page.goto with an adaptive timeout, recording how long it took (or the limit it hit)"""
+        timeout = timeout or self.timeout('navigation', url)
+        start = time.perf_counter()
+        try:
+            response = await page.goto(url, timeout=timeout * 1000, **kwargs)
+        except PlaywrightTimeoutError:
+            self.record('navigation', url, timeout)
+            raise
+        self.record('navigation', url, time.perf_counter() - start)
+        return response
+
+    async def settle(self, page, url, roots):
+        """Wait until the content root and its images have loaded, for at most the settle timeout"""
+        timeout = self.timeout('settle', url)
+        start = time.perf_counter()
+        try:
+            await page.wait_for_function(CONTENT_SETTLED_JS, arg=list(roots), timeout=timeout * 1000)
+        except PlaywrightTimeoutError:
+            self.record('settle', url, timeout)
+            log.warning(f"⚠️  Content still loading after {timeout:.1f}s, continuing anyway...")
+            return False
+        self.record('settle', url, time.perf_counter() - start)
+        return True
+
+    def hedge_delay(self, url):
+        """Seconds after which a unit is slower than 95% of its history and worth a second attempt"""
+        return self._percentile('unit', url, 95)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Mark-and-sweep garbage collection for content/assets
+Marks every asset referenced by an English or Vietnamese unit page, then
+quarantines or deletes the rest. Byte-identical copies can be merged into one
+file (pages are re-pointed first), and near-identical screenshots are
+reported using a perceptual hash when Pillow is installed. Meant to run
+while no crawler is writing to content/
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from asset_index import AssetIndex
+from atomic_io import atomic_write_text
+from course_catalog import CourseCatalog
+from link_checker import LinkChecker, page_files, present_files
+
+try:
+    from PIL import Image
+except ImportError:  # perceptual duplicates are only reported when Pillow is available
+    Image = None
+
+ASSETS_PREFIX = 'assets/'
+QUARANTINE_DIR = '.asset_quarantine'
+LOCK_FILE = '.asset_gc.lock'
+
+# Raster formats worth comparing perceptually; SVGs and icons are left to the byte comparison
+PERCEPTUAL_SUFFIXES = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'}
+
+def file_sha256(path):
+    """sha256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def perceptual_hash(path, size=8):
+    """64-bit difference hash (dHash) of an image, or None without Pillow or for unreadable images"""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            # Via RGBA so palette images with transparency convert cleanly
+            pixels = image.convert('RGBA').convert('L').resize((size + 1, size)).tobytes()
+    except Exception:
+        return None
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            bits = (bits << 1) | (left > pixels[row * (size + 1) + col + 1])
+    return bits
+
+def format_bytes(size):
+    """Human-readable byte count"""
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+class AssetGC:
+    """Finds unreferenced and duplicate assets and sweeps them into quarantine or deletes them"""
+
+    def __init__(self, content_dir=Path("content"), grace_seconds=600, similarity=4, workers=None):
+        self.content_dir = Path(content_dir)
+        self.assets_dir = self.content_dir / "assets"
+        self.grace_seconds = grace_seconds  # files modified this recently are never swept
+        self.similarity = similarity        # max differing dHash bits for "near-identical"
+        self.checker = LinkChecker(self.content_dir, workers)
+
+    def mark(self):
+        """Map each referenced asset (content-relative path) to the (page, attribute value) pairs using it"""
+        references = defaultdict(list)
+        for result in self.checker.scan(page_files(present_files(self.content_dir))):
+            for ref in result['local']:
+                if ref['target'].startswith(ASSETS_PREFIX):
+                    references[ref['target']].append((result['file'], ref['value']))
+        return references
+
+    def asset_files(self):
+        """Asset files (content-relative path -> size), skipping dot files such as in-flight atomic writes"""
+        files = {}
+        for path in self.assets_dir.iterdir():
+            if path.is_file() and not path.name.startswith('.'):
+                files[f"{ASSETS_PREFIX}{path.name}"] = path.stat().st_size
+        return files
+
+    def find_duplicates(self, files, references):
+        """Groups of byte-identical assets, the copy to keep first (most referenced, then by name)"""
+        by_size = defaultdict(list)
+        for path, size in files.items():
+            by_size[size].append(path)
+
+        groups = []
+        for size, paths in by_size.items():
+            if len(paths) < 2 or not size:
+                continue
+            by_hash = defaultdict(list)
+            for path in paths:
+                by_hash[file_sha256(self.content_dir / path)].append(path)
+            for same in by_hash.values():
+                if len(same) > 1:
+                    groups.append(sorted(same, key=lambda path: (-len(references.get(path, ())), path)))
+        return sorted(groups)
+
+    def find_similar(self, files, duplicates):
+        """Groups of perceptually near-identical screenshots (excluding exact copies), or None without Pillow"""
+        if Image is None:
+            return None
+        exact = {path for group in duplicates for path in group[1:]}
+        hashes = []
+        for path in sorted(files):
+            if path in exact or Path(path).suffix.lower() not in PERCEPTUAL_SUFFIXES:
+                continue
+            bits = perceptual_hash(self.content_dir / path)
+            if bits is not None:
+                hashes.append((path, bits))
+
+        # Single-linkage grouping; asset counts are in the hundreds, so pairwise comparison is fine
+        group_of = {}
+        groups = []
+        for i, (path, bits) in enumerate(hashes):
+            for other, other_bits in hashes[:i]:
+                if bin(bits ^ other_bits).count('1') <= self.similarity:
+                    group = group_of[other]
+                    group.append(path)
+                    group_of[path] = group
+                    break
+            else:
+                group_of[path] = [path]
+                groups.append(group_of[path])
+        return [group for group in groups if len(group) > 1]
+
+    def rewrite_references(self, duplicates, references):
+        """Point pages at the kept copy of each duplicate group; returns the number of pages rewritten"""
+        replacements = defaultdict(dict)  # page -> {old attribute value: new attribute value}
+        for keep, *copies in duplicates:
+            keep_name = keep.rsplit('/', 1)[-1]
+            for copy in copies:
+                for page, value in references.get(copy, ()):
+                    replacements[page][value] = f"{value.rsplit('/', 1)[0]}/{keep_name}" if '/' in value else keep_name
+
+        for page, mapping in replacements.items():
+            path = self.content_dir / page
+            pattern = re.compile(r'(?<=["\'\s,])(' + '|'.join(map(re.escape, mapping)) + r')(?=["\'\s,])')
+            html = path.read_text(encoding='utf-8')
+            atomic_write_text(path, pattern.sub(lambda match: mapping[match.group(1)], html))
+        return len(replacements)
+
+    def relink(self, moves):
+        """Update the asset index and catalog after files were merged (old -> kept) or removed (old -> None)"""
+        asset_index = AssetIndex(self.content_dir / "course_catalog.db", self.assets_dir)
+        try:
+            asset_index.relink_files({
+                old.rsplit('/', 1)[-1]: new and new.rsplit('/', 1)[-1] for old, new in moves.items()
+            })
+        finally:
+            asset_index.close()
+
+        merged = {old: new for old, new in moves.items() if new}
+        if merged:
+            catalog = CourseCatalog(self.content_dir / "course_catalog.db")
+            try:
+                catalog.relink_assets({
+                    f"../../../{old}": f"../../../{new}" for old, new in merged.items()
+                })
+            finally:
+                catalog.close()
+
+    def sweep(self, reasons, mode, started):
+        """Quarantine or delete assets (path -> reason); returns (swept paths, bytes reclaimed, quarantine dir or None)"""
+        quarantine = None
+        if mode == 'quarantine':
+            quarantine = self.content_dir / QUARANTINE_DIR / time.strftime('%Y%m%d-%H%M%S')
+            quarantine.mkdir(parents=True, exist_ok=True)
+
+        swept, reclaimed, manifest = [], 0, []
+        for path in sorted(reasons):
+            source = self.content_dir / path
+            try:
+                stat = source.stat()
+            except FileNotFoundError:
+                continue
+            # Anything written after marking started (or just before) may be referenced by a page in flight
+            if stat.st_mtime > started - self.grace_seconds:
+                print(f"⏭️  Skipping recently modified asset: {path}")
+                continue
+            if mode == 'quarantine':
+                shutil.move(str(source), str(quarantine / source.name))
+                manifest.append({'path': path, 'size': stat.st_size, 'reason': reasons[path]})
+            else:
+                source.unlink()
+            swept.append(path)
+            reclaimed += stat.st_size
+
+        if quarantine:
+            atomic_write_text(quarantine / "manifest.json", json.dumps(manifest, indent=2))
+        return swept, reclaimed, quarantine
+
+    def restore(self, quarantine):
+        """Move quarantined assets back into content/assets"""
+        quarantine = Path(quarantine)
+        manifest = json.loads((quarantine / "manifest.json").read_text(encoding='utf-8'))
+        restored = 0
+        for entry in manifest:
+            source = quarantine / Path(entry['path']).name
+            target = self.content_dir / entry['path']
+            if source.exists() and not target.exists():
+                shutil.move(str(source), str(target))
+                restored += 1
+        print(f"♻️  Restored {restored} of {len(manifest)} assets from {quarantine}")
+        return restored
+
+    def run(self, mode='report', merge_duplicates=False):
+        """Mark, find duplicates and near-duplicates, and sweep unless mode is 'report'; returns the report dict"""
+        lock = self.content_dir / LOCK_FILE
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            raise RuntimeError(f"Another asset GC holds {lock}; remove it if that run crashed")
+        os.close(fd)
+
+        try:
+            started = time.time()
+            references = self.mark()
+            files = self.asset_files()
+            duplicates = self.find_duplicates(files, references)
+            similar = self.find_similar(files, duplicates)
+
+            reasons = {path: 'unreferenced' for path in files if path not in references}
+            moves = {}
+            rewritten = 0
+            if merge_duplicates and mode != 'report':
+                rewritten = self.rewrite_references(duplicates, references)
+                for keep, *copies in duplicates:
+                    for copy in copies:
+                        reasons[copy] = f"duplicate of {keep}"
+                        moves[copy] = keep
+
+            swept, reclaimed, quarantine = [], 0, None
+            if mode != 'report':
+                swept, reclaimed, quarantine = self.sweep(reasons, mode, started)
+                moves.update({path: None for path in swept if path not in moves})
+                self.relink({path: moves[path] for path in swept})
+
+            return {
+                'mode': mode,
+                'assets': len(files),
+                'asset_bytes': sum(files.values()),
+                'referenced': len([path for path in files if path in references]),
+                'unreferenced': sorted(path for path, reason in reasons.items() if reason == 'unreferenced'),
+                'unreferenced_bytes': sum(files[path] for path, reason in reasons.items() if reason == 'unreferenced'),
+                'duplicates': duplicates,
+                'duplicate_bytes': sum(files[path] for group in duplicates for path in group[1:]),
+                'similar': similar,
+                'pages_rewritten': rewritten,
+                'swept': swept,
+                'reclaimed_bytes': reclaimed,
+                'quarantine': str(quarantine) if quarantine else None,
+                'seconds': round(time.time() - started, 3)
+            }
+        finally:
+            lock.unlink()
+
+def print_report(report, verbose=False):
+    """Print what was found and what was reclaimed"""
+    print(f"🗂️  Assets: {report['assets']} files, {format_bytes(report['asset_bytes'])}, "
+          f"{report['referenced']} referenced by unit pages")
+    print(f"🗑️  Unreferenced: {len(report['unreferenced'])} files, {format_bytes(report['unreferenced_bytes'])}")
+    if verbose:
+        for path in report['unreferenced']:
+            print(f"   • {path}")
+
+    print(f"👯 Byte-identical groups: {len(report['duplicates'])} "
+          f"({format_bytes(report['duplicate_bytes'])} in extra copies)")
+    for keep, *copies in report['duplicates']:
+        print(f"   • {keep} ← {', '.join(copies)}")
+
+    if report['similar'] is None:
+        print("ℹ️  Install Pillow to find near-identical screenshots")
+    else:
+        print(f"🔍 Near-identical screenshot groups: {len(report['similar'])} (review by hand, never swept)")
+        for group in report['similar']:
+            print(f"   • {', '.join(group)}")
+
+    if report['mode'] == 'report':
+        print("\n📋 Report only; run with --quarantine or --delete to reclaim space")
+        return
+    if report['pages_rewritten']:
+        print(f"✏️  Re-pointed {report['pages_rewritten']} pages to the kept copies")
+    action = "Quarantined" if report['mode'] == 'quarantine' else "Deleted"
+    print(f"\n✅ {action} {len(report['swept'])} assets, reclaimed {format_bytes(report['reclaimed_bytes'])}")
+    if report['quarantine']:
+        print(f"📁 Quarantine: {report['quarantine']} (restore with --restore)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Garbage-collect unreferenced and duplicate assets")
+    parser.add_argument('--content-dir', default="content")
+    sweep = parser.add_mutually_exclusive_group()
+    sweep.add_argument('--quarantine', action='store_true', help="move swept assets to content/.asset_quarantine/")
+    sweep.add_argument('--delete', action='store_true', help="delete swept assets")
+    sweep.add_argument('--restore', metavar='DIR', help="move a quarantine directory's assets back")
+    parser.add_argument('--merge-duplicates', action='store_true',
+                        help="re-point pages at one copy of byte-identical assets and sweep the others")
+    parser.add_argument('--grace', type=int, default=600, help="never sweep assets modified in the last N seconds")
+    parser.add_argument('--similarity', type=int, default=4, help="max differing perceptual hash bits (of 64)")
+    parser.add_argument('--workers', type=int, default=None, help="page scanner processes")
+    parser.add_argument('--json', default=None, help="also write the report to this file")
+    parser.add_argument('--verbose', action='store_true', help="list unreferenced assets")
+    args = parser.parse_args()
+
+    gc = AssetGC(Path(args.content_dir), args.grace, args.similarity, args.workers)
+    if args.restore:
+        gc.restore(args.restore)
+        return
+
+    mode = 'quarantine' if args.quarantine else 'delete' if args.delete else 'report'
+    try:
+        report = gc.run(mode, args.merge_duplicates)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print_report(report, args.verbose)
+    if args.json:
+        atomic_write_text(args.json, json.dumps(report, indent=2))
+        print(f"📝 Report saved to: {args.json}")
+
+if __name__ == "__main__":
+    main()
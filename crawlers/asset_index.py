@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Two-tier cache of downloaded images for AZ-104 crawlers
+A size-capped LRU in memory sits in front of a persistent SQLite index
+(canonical URL → asset file, sha256, size, ETag) shared by every crawler
+and process, so a new run doesn't re-stat files or re-resolve URLs
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from crawl_log import get_logger
+from unit_urls import canonical_asset_url
+
+log = get_logger('asset_index')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS asset_index (
+    url TEXT PRIMARY KEY,
+    local_file TEXT NOT NULL,
+    sha256 TEXT,
+    size INTEGER,
+    etag TEXT,
+    content_type TEXT,
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_asset_index_file ON asset_index(local_file);
+"""
+
+class AssetIndex:
+    """Image URL → saved asset lookups: in-memory LRU backed by a SQLite index"""
+
+    def __init__(self, db_path=Path("content/course_catalog.db"), assets_dir=Path("content/assets"), max_entries=4096):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.assets_dir = Path(assets_dir)
+        self.max_entries = max_entries  # entries kept in memory; the SQLite index has no cap
+        self.memory = OrderedDict()     # canonical url -> entry dict, least recently used first
+        self.url_locks = {}             # canonical url -> [asyncio.Lock, waiting coroutines]
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stale': 0}
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def _remember(self, key, entry):
+        """Put an entry at the most recently used end of the LRU, evicting the oldest past the cap"""
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _forget(self, key):
+        """Drop an entry whose file no longer exists from both tiers"""
+        self.memory.pop(key, None)
+        with self.conn:
+            self.conn.execute("DELETE FROM asset_index WHERE url = ?", (key,))
+
+    def get(self, url):
+        """Saved asset for an image URL, or None; entries whose file is gone are dropped"""
+        key = canonical_asset_url(url)
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return entry
+
+        row = self.conn.execute("SELECT * FROM asset_index WHERE url = ?", (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+
+        # Only the first lookup per process checks the file; later hits come from memory
+        entry = dict(row)
+        if not (self.assets_dir / entry['local_file']).exists():
+            self.stats['stale'] += 1
+            self._forget(key)
+            return None
+        self.stats['disk_hits'] += 1
+        self._remember(key, entry)
+        return entry
+
+    def put(self, url, local_file, body=None, etag=None, content_type=None):
+        """Record a saved asset (body is hashed when given, otherwise the file is read)"""
+        key = canonical_asset_url(url)
+        if body is None:
+            body = (self.assets_dir / local_file).read_bytes()
+        entry = {
+            'url': key,
+            'local_file': local_file,
+            'sha256': hashlib.sha256(body).hexdigest(),
+            'size': len(body),
+            'etag': etag,
+            'content_type': content_type,
+            'updated_at': time.time()
+        }
+        # Another process may have saved the same URL meanwhile; the newest record wins
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO asset_index (url, local_file, sha256, size, etag, content_type, updated_at) "
+                "VALUES (:url, :local_file, :sha256, :size, :etag, :content_type, :updated_at) "
+                "ON CONFLICT(url) DO UPDATE SET local_file=excluded.local_file, sha256=excluded.sha256, "
+                "size=excluded.size, etag=excluded.etag, content_type=excluded.content_type, "
+                "updated_at=excluded.updated_at",
+                entry
+            )
+        self._remember(key, entry)
+        return entry
+
+    def relink_files(self, moves):
+        """Point entries at another asset file (old local_file -> new), or drop them (old -> None)"""
+        with self.conn:
+            for old, new in moves.items():
+                if new:
+                    self.conn.execute("UPDATE asset_index SET local_file = ? WHERE local_file = ?", (new, old))
+                else:
+                    self.conn.execute("DELETE FROM asset_index WHERE local_file = ?", (old,))
+        for key, entry in list(self.memory.items()):
+            if entry['local_file'] in moves:
+                del self.memory[key]
+
+    @asynccontextmanager
+    async def claim(self, url):
+        """Let one coroutine at a time work on a URL, so concurrent units download a shared image once"""
+        key = canonical_asset_url(url)
+        slot = self.url_locks.setdefault(key, [asyncio.Lock(), 0])
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            slot[1] -= 1
+            if not slot[1]:
+                del self.url_locks[key]
+
+    def print_stats(self):
+        """Print hit rates of both tiers"""
+        log.info(f"🗂️  Asset index: {self.stats['memory_hits']} memory hits, {self.stats['disk_hits']} index hits, "
+              f"{self.stats['misses']} misses, {self.stats['stale']} stale, {len(self.memory)} in memory")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Atomic file writes for crawled content
+Data is written to a temp file in the target directory and renamed into place,
+so a crash never leaves a half-written file behind
+"""
+
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+def atomic_write_bytes(path, data):
+    """Write bytes to path atomically (temp file + rename)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # mkstemp creates 0600 files; keep the existing file's mode or use a normal 0644
+    mode = path.stat().st_mode & 0o777 if path.exists() else 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def atomic_write_text(path, text, encoding='utf-8'):
+    """Write text to path atomically (temp file + rename)"""
+    atomic_write_bytes(path, text.encode(encoding))
+
+async def async_atomic_write_bytes(path, data):
+    """Atomic bytes write without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, atomic_write_bytes, path, data)
+
+async def async_atomic_write_text(path, text, encoding='utf-8'):
+    """Atomic text write without blocking the event loop"""
+    await async_atomic_write_bytes(path, text.encode(encoding))
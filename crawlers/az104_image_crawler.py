@@ -5,21 +5,34 @@ Production-ready crawler for Microsoft Learn content with image downloading
 """
 
 import asyncio
-import json
 import re
 import time
 import aiohttp
 import hashlib
 from pathlib import Path
-from playwright.async_api import async_playwright
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError, async_playwright
 from bs4 import BeautifulSoup
-import aiofiles
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urlparse
+from adaptive_timeouts import AdaptiveTimeouts
+from asset_index import AssetIndex
+from atomic_io import async_atomic_write_bytes, async_atomic_write_text
+from content_rules import IMAGE_CRAWLER_UNWANTED, UNIT_ROOT_SELECTORS, prune_args, prune_soup
+from content_validation import ERROR_PAGE_MARKER, OK, ExtractionResult, save_error_page, validate_content
+from course_manifest import load_manifest, select_courses
+from crawl_log import get_logger
+from instrumentation import tracer
+from page_scripts import IMAGE_METADATA_JS, PRUNE_CONTENT_JS
+from response_capture import ImageResponseCapture
+from retry_queue import RetryQueue, CircuitBreaker, CrawlHTTPError, RETRYABLE_STATUS_CODES, parse_retry_after
+from unit_export import build_document, save_unit_document
+from unit_urls import canonical_asset_url
+
+log = get_logger('image_crawler')
 
 class AZ104ImageCrawler:
     """Enhanced crawler with image support for AZ-104 course content"""
     
-    def __init__(self):
+    def __init__(self, prune_in_browser=False):
         self.base_url = "https://learn.microsoft.com"
         self.output_dir = Path("content")
         self.assets_dir = self.output_dir / "assets"
@@ -31,7 +44,22 @@ class AZ104ImageCrawler:
         
         # Image download session
         self.session = None
-        self.downloaded_images = {}  # Cache to avoid re-downloading
+        # Saved images by canonical URL: in-memory LRU over an index shared with other crawlers and runs
+        self.asset_index = AssetIndex(self.output_dir / "course_catalog.db", self.assets_dir)
+        
+        # Optional CourseCatalog for recording which assets each unit uses
+        self.catalog = None
+        
+        # Failed units are queued for backoff retries; a tripped breaker pauses every crawl path
+        self.retry_queue = RetryQueue(self.output_dir / "course_catalog.db")
+        self.circuit_breaker = CircuitBreaker()
+        self.tracer = tracer
+        
+        # Navigation and settle timeouts learned from earlier crawls of the same unit/module
+        self.timeouts = AdaptiveTimeouts(self.output_dir / "course_catalog.db")
+        
+        # Prune unwanted elements in the page and transfer only the remaining fragment
+        self.prune_in_browser = prune_in_browser
         
     async def init_session(self):
         """Initialize HTTP session for image downloads"""
@@ -63,99 +91,150 @@ class AZ104ImageCrawler:
         filename = re.sub(r'\s+', '_', filename)
         return filename[:100]
     
-    async def get_actual_image_urls(self, page):
+    def record_failure(self, unit_url, output_path, error, unit_title=None):
+        """Queue a failed unit for a backoff retry"""
+        retry_after = getattr(error, 'retry_after', None)
+        next_eligible = self.retry_queue.record_failure(unit_url, output_path, error, unit_title, retry_after)
+        entry = self.retry_queue.get(unit_url)
+        log.info(f"📥 Queued for retry after {time.strftime('%H:%M:%S', time.localtime(next_eligible))}: {unit_url}",
+                 extra={'unit': unit_url, 'stage': 'retry_queue', 'attempt': entry['attempts'] if entry else None,
+                        'status': getattr(error, 'status', None)})
+    
+    async def wait_for_network_idle(self, page, unit_url):
+        """Wait for images to finish loading, giving up after two timeouts"""
+        for attempt in range(2):
+            try:
+                await page.wait_for_load_state('networkidle', timeout=self.timeouts.timeout_ms('settle', unit_url))
+                break
+            except Exception as e:
+                if attempt == 1:
+                    log.warning(f"⚠️  Load state timeout, continuing anyway...")
+                    break
+                await asyncio.sleep(2)
+    
+    def image_url_map(self, images):
+        """Map each image's src attribute to the URL the browser actually loaded"""
+        image_urls = {}
+        for image in images:
+            src = image['src']
+            if src and not src.startswith('data:'):
+                # currentSrc is the candidate the browser actually loaded (srcset aware)
+                image_urls[src] = image['currentSrc'] or image['resolvedSrc'] or src
+        return image_urls
+    
+    async def get_actual_image_urls(self, page, unit_url):
         """Get actual image URLs from the page using Playwright"""
         try:
-            # Wait with timeout and retry
-            for attempt in range(2):
-                try:
-                    await page.wait_for_load_state('networkidle', timeout=30000)
-                    break
-                except Exception as e:
-                    if attempt == 1:
-                        print(f"⚠️  Load state timeout, continuing anyway...")
-                        break
-                    await asyncio.sleep(2)
-            
-            image_elements = await page.query_selector_all('img')
-            image_urls = {}
-            
-            for img_element in image_elements:
-                try:
-                    src = await img_element.get_attribute('src')
-                    if src and not src.startswith('data:'):
-                        actual_url = await page.evaluate('(img) => img.src', img_element)
-                        image_urls[src] = actual_url if actual_url != src else src
-                except:
-                    continue
+            await self.wait_for_network_idle(page, unit_url)
             
-            return image_urls
+            # One round trip for every image instead of two per image
+            images = await page.eval_on_selector_all('img', IMAGE_METADATA_JS)
+            return self.image_url_map(images)
         except Exception as e:
-            print(f"⚠️  Error getting actual image URLs: {e}")
+            log.warning(f"⚠️  Error getting actual image URLs: {e}")
             return {}
 
-    async def download_image_direct(self, img_url):
-        """Download image directly using the actual URL"""
+    async def save_captured_image(self, cache_key, local_path, local_filename, captured):
+        """Save an image body the browser already loaded"""
+        body, content_type = captured
+        await async_atomic_write_bytes(local_path, body)
+        self.asset_index.put(cache_key, local_filename, body, content_type=content_type)
+        self.tracer.count('images_captured')
+        self.tracer.count('captured_bytes', len(body))
+        
+        log.info(f"✅ Saved from browser: {local_filename}", extra={'sample': 'image', 'stage': 'image', 'url': cache_key})
+        return f"../../../assets/{local_filename}"
+    
+    async def download_image_direct(self, img_url, capture=None):
+        """Save an image, reusing the browser's response when available, else download it"""
+        if img_url.startswith('data:'):
+            return img_url
+        
+        # Tracking parameters don't change the image, so they don't get their own copy
+        cache_key = canonical_asset_url(img_url)
+        async with self.asset_index.claim(cache_key):
+            return await self._download_image(img_url, cache_key, capture)
+    
+    async def _download_image(self, img_url, cache_key, capture):
+        """Download one image unless the asset index already has it (caller holds the URL's claim)"""
         try:
             await self.init_session()
             
-            if img_url in self.downloaded_images:
-                return self.downloaded_images[img_url]
-            
-            if img_url.startswith('data:'):
-                return img_url
+            entry = self.asset_index.get(cache_key)
+            if entry:
+                self.tracer.count('images_cached')
+                return f"../../../assets/{entry['local_file']}"
             
             parsed_url = urlparse(img_url)
             original_name = Path(parsed_url.path).name or "image"
             
-            url_hash = hashlib.md5(img_url.encode()).hexdigest()[:8]
+            url_hash = hashlib.md5(cache_key.encode()).hexdigest()[:8]
             file_ext = Path(original_name).suffix or '.png'
             local_filename = f"{Path(original_name).stem}_{url_hash}{file_ext}"
             local_path = self.assets_dir / local_filename
             
-            # Skip if already exists
+            # Saved by a run that predates the index
             if local_path.exists():
-                relative_path = f"../../../assets/{local_filename}"
-                self.downloaded_images[img_url] = relative_path
-                return relative_path
+                self.asset_index.put(cache_key, local_filename)
+                self.tracer.count('images_cached')
+                return f"../../../assets/{local_filename}"
             
-            print(f"📷 Downloading image: {img_url}")
+            captured = capture.get(img_url) if capture else None
+            if captured:
+                return await self.save_captured_image(cache_key, local_path, local_filename, captured)
+            
+            log.info(f"📷 Downloading image: {img_url}", extra={'sample': 'image', 'stage': 'image', 'url': img_url})
             
             # Retry logic for image download
+            await self.circuit_breaker.wait_if_open(img_url)
             for attempt in range(3):
                 try:
                     async with self.session.get(img_url, timeout=30) as response:
+                        if response.status == 200 or response.status in RETRYABLE_STATUS_CODES:
+                            self.circuit_breaker.record(
+                                img_url, response.status == 200,
+                                parse_retry_after(response.headers.get('Retry-After'))
+                            )
                         if response.status == 200:
                             content = await response.read()
-                            async with aiofiles.open(local_path, 'wb') as f:
-                                await f.write(content)
+                            await async_atomic_write_bytes(local_path, content)
+                            self.asset_index.put(
+                                cache_key, local_filename, content,
+                                etag=response.headers.get('ETag'),
+                                content_type=response.headers.get('Content-Type')
+                            )
+                            self.tracer.count('images_downloaded')
+                            self.tracer.count('image_bytes', len(content))
                             
-                            relative_path = f"../../../assets/{local_filename}"
-                            self.downloaded_images[img_url] = relative_path
-                            print(f"✅ Downloaded: {local_filename}")
-                            return relative_path
+                            log.info(f"✅ Downloaded: {local_filename}", extra={'sample': 'image', 'stage': 'image', 'url': img_url})
+                            return f"../../../assets/{local_filename}"
                         else:
-                            print(f"❌ Failed to download {img_url}: HTTP {response.status}")
+                            log.error(f"❌ Failed to download {img_url}: HTTP {response.status}",
+                                      extra={'stage': 'image', 'url': img_url, 'attempt': attempt + 1})
                             return img_url
                 except Exception as e:
                     if attempt == 2:
-                        print(f"❌ Error downloading {img_url} after 3 attempts: {e}")
+                        log.error(f"❌ Error downloading {img_url} after 3 attempts: {e}",
+                                  extra={'stage': 'image', 'url': img_url, 'attempt': attempt + 1})
+                        self.tracer.count('images_failed')
                         return img_url
-                    print(f"⚠️  Download attempt {attempt + 1} failed, retrying...")
+                    self.tracer.count('retries')
+                    log.warning(f"⚠️  Download attempt {attempt + 1} failed, retrying...",
+                                extra={'stage': 'image', 'url': img_url, 'attempt': attempt + 1})
                     await asyncio.sleep(2)
                     
         except Exception as e:
-            print(f"❌ Error downloading {img_url}: {e}")
+            log.error(f"❌ Error downloading {img_url}: {e}")
             return img_url
 
-    async def process_images_with_actual_urls(self, soup, actual_image_urls):
+    async def process_images_with_actual_urls(self, soup, actual_image_urls, unit_url=None, capture=None):
         """Process and download all images using actual URLs from the page"""
         images = soup.find_all('img')
         if not images:
-            print("📷 No images found in content")
+            log.info("📷 No images found in content")
             return soup
         
-        print(f"📷 Processing {len(images)} images...")
+        log.info(f"📷 Processing {len(images)} images...")
         
         for img in images:
             src = img.get('src')
@@ -163,8 +242,11 @@ class AZ104ImageCrawler:
                 continue
             
             actual_url = actual_image_urls.get(src, src)
-            local_path = await self.download_image_direct(actual_url)
+            with self.tracer.span('image_download', unit_url, image=actual_url):
+                local_path = await self.download_image_direct(actual_url, capture)
             img['src'] = local_path
+            if self.catalog and unit_url and local_path != actual_url:
+                self.catalog.record_asset(unit_url, actual_url, local_path)
             
             if not img.get('alt'):
                 img['alt'] = "Course content image"
@@ -173,65 +255,111 @@ class AZ104ImageCrawler:
         
         return soup
 
-    async def extract_content_with_images(self, page, unit_url, unit_title):
-        """Extract content including images from a unit page"""
-        print(f"📖 Extracting: {unit_title}")
+    async def extract_parsed_content(self, page, unit_url, capture):
+        """Transfer the whole unit content and clean it with BeautifulSoup"""
+        with self.tracer.span('image_urls', unit_url):
+            actual_image_urls = await self.get_actual_image_urls(page, unit_url)
+            await capture.drain()
+        
+        main_content = None
+        for selector in UNIT_ROOT_SELECTORS:
+            main_content = await page.query_selector(selector)
+            if main_content:
+                break
+        if not main_content:
+            return None, actual_image_urls
+        
+        with self.tracer.span('extract_html', unit_url):
+            content_html = await main_content.inner_html()
+        self.tracer.count('html_bytes', len(content_html))
+        
+        with self.tracer.span('parse', unit_url):
+            soup = BeautifulSoup(content_html, 'html.parser')
+            prune_soup(soup, IMAGE_CRAWLER_UNWANTED)
+        return soup, actual_image_urls
+    
+    async def extract_pruned_content(self, page, unit_url):
+        """Prune the unit content in the browser and parse only what is left"""
+        with self.tracer.span('image_urls', unit_url):
+            await self.wait_for_network_idle(page, unit_url)
+        
+        with self.tracer.span('extract_html', unit_url):
+            pruned = await page.evaluate(PRUNE_CONTENT_JS, prune_args(UNIT_ROOT_SELECTORS, IMAGE_CRAWLER_UNWANTED))
+        if not pruned:
+            return None, {}
+        self.tracer.count('html_bytes', len(pruned['html']))
+        
+        with self.tracer.span('parse', unit_url):
+            soup = BeautifulSoup(pruned['html'], 'html.parser')
+        return soup, self.image_url_map(pruned['images'])
+    
+    async def extract_content_with_images(self, page, unit_url, unit_title, course_title):
+        """Extract content including images from a unit page, as an ExtractionResult"""
+        log.info(f"📖 Extracting: {unit_title}")
         
+        # Keep the images Chromium loads so they don't have to be downloaded again
+        capture = ImageResponseCapture(page).attach()
         try:
-            # Increase timeout and add retry logic
-            for attempt in range(3):
-                try:
-                    await page.goto(unit_url, wait_until='networkidle', timeout=60000)
-                    break
-                except Exception as e:
-                    if attempt == 2:
-                        raise e
-                    print(f"⚠️  Attempt {attempt + 1} failed, retrying...")
-                    await asyncio.sleep(5)
+            # Timeout from this unit's (or module's) navigation history, doubled after each timeout
+            await self.circuit_breaker.wait_if_open(unit_url)
+            navigation_timeout = self.timeouts.timeout('navigation', unit_url)
+            with self.tracer.span('navigation', unit_url):
+                for attempt in range(3):
+                    try:
+                        response = await self.timeouts.goto(page, unit_url, navigation_timeout, wait_until='networkidle')
+                        if response and response.status in RETRYABLE_STATUS_CODES:
+                            raise CrawlHTTPError(
+                                unit_url, response.status, parse_retry_after(response.headers.get('retry-after'))
+                            )
+                        self.circuit_breaker.record(unit_url, True)
+                        break
+                    except CrawlHTTPError as e:
+                        # Throttled or server error: leave it to the retry queue instead of hammering
+                        self.circuit_breaker.record(unit_url, False, e.retry_after)
+                        raise
+                    except Exception as e:
+                        self.circuit_breaker.record(unit_url, False)
+                        self.tracer.count('retries')
+                        if attempt == 2:
+                            raise e
+                        if isinstance(e, PlaywrightTimeoutError):
+                            navigation_timeout = self.timeouts.escalate('navigation', navigation_timeout)
+                        log.warning(f"⚠️  Attempt {attempt + 1} failed, retrying...",
+                                    extra={'unit': unit_url, 'stage': 'navigation', 'attempt': attempt + 1})
+                        await asyncio.sleep(5)
+                        await self.circuit_breaker.wait_if_open(unit_url)
             
-            await page.wait_for_timeout(5000)  # Increased wait time
+            with self.tracer.span('settle', unit_url):
+                await self.timeouts.settle(page, unit_url, UNIT_ROOT_SELECTORS)
             
             page_title = await page.title()
-            actual_image_urls = await self.get_actual_image_urls(page)
-            print(f"🔍 Found {len(actual_image_urls)} images with actual URLs")
+            if self.prune_in_browser:
+                soup, actual_image_urls = await self.extract_pruned_content(page, unit_url)
+                await capture.drain()
+            else:
+                soup, actual_image_urls = await self.extract_parsed_content(page, unit_url, capture)
+            log.info(f"🔍 Found {len(actual_image_urls)} images with actual URLs")
             
-            main_content = await page.query_selector('#module-unit-content')
-            if not main_content:
-                main_content = await page.query_selector('main')
-                if not main_content:
-                    main_content = await page.query_selector('[data-bi-name="content"]')
+            # Checked before images are processed so the soft 404 illustration isn't downloaded
+            problem = validate_content(soup, page_title)
+            if problem:
+                log.warning(f"⚠️  {problem.status}: {problem} ({unit_url})",
+                            extra={'unit': unit_url, 'stage': 'validate', 'status': problem.status})
+                return ExtractionResult.failed(problem, self._create_error_html(unit_url, str(problem)))
             
-            if main_content:
-                content_html = await main_content.inner_html()
-                soup = BeautifulSoup(content_html, 'html.parser')
-                
-                # Remove unwanted elements
-                unwanted_selectors = [
-                    '.xp-tag', '.metadata', '.page-metadata',
-                    '[data-progress-uid]', '[data-bi-name="feedback"]',
-                    '.visually-hidden', '.docon', 
-                    'button', '.button', '[role="button"]',
-                    '.feedback', '.rating', '.helpful',
-                    '.navigation', '.breadcrumb',
-                    '.next-unit', '.prev-unit'
-                ]
-                
-                for selector in unwanted_selectors:
-                    for element in soup.select(selector):
-                        element.decompose()
-                
-                soup = await self.process_images_with_actual_urls(soup, actual_image_urls)
-                clean_html = self._create_clean_html_with_css(page_title, unit_title, unit_url, soup)
-                return clean_html
-            else:
-                print(f"⚠️  No main content found for {unit_url}")
-                return self._create_error_html(unit_url, "No main content found")
+            soup = await self.process_images_with_actual_urls(soup, actual_image_urls, unit_url, capture)
+            with self.tracer.span('render', unit_url):
+                clean_html = self._create_clean_html_with_css(page_title, unit_title, unit_url, course_title, soup)
+                document = build_document(soup, {'title': unit_title, 'url': unit_url, 'page_title': page_title})
+            return ExtractionResult(OK, clean_html, document=document)
             
         except Exception as e:
-            print(f"❌ Error extracting content from {unit_url}: {e}")
-            return self._create_error_html(unit_url, str(e))
+            log.error(f"❌ Error extracting content from {unit_url}: {e}", extra={'unit': unit_url, 'stage': 'extract'})
+            return ExtractionResult.failed(e, self._create_error_html(unit_url, str(e)))
+        finally:
+            capture.detach()
 
-    def _create_clean_html_with_css(self, page_title, unit_title, unit_url, content_soup):
+    def _create_clean_html_with_css(self, page_title, unit_title, unit_url, course_title, content_soup):
         """Create clean HTML with embedded CSS and proper image styling"""
         return f"""<!DOCTYPE html>
 <html lang="en">
@@ -433,7 +561,7 @@ class AZ104ImageCrawler:
         <h2>📚 Course Information</h2>
         <p><strong>Unit:</strong> {unit_title}</p>
         <p><strong>Source:</strong> <a href="{unit_url}" target="_blank">{unit_url}</a></p>
-        <p><strong>Course:</strong> AZ-104: Microsoft Azure Administrator</p>
+        <p><strong>Course:</strong> {course_title}</p>
     </div>
     
     <div class="main-content">
@@ -452,7 +580,7 @@ class AZ104ImageCrawler:
         """Create error HTML"""
         return f"""<!DOCTYPE html>
 <html>
-<head><title>Error</title></head>
+<head><title>Error</title>{ERROR_PAGE_MARKER}</head>
 <body>
     <h1>Error Extracting Content</h1>
     <p>Could not extract content from: <a href="{url}">{url}</a></p>
@@ -460,38 +588,98 @@ class AZ104ImageCrawler:
 </body>
 </html>"""
     
+    async def open_unit_page(self, browser, unit_url):
+        """New browser page with the crawler's headers and timeouts suited to this unit"""
+        page = await browser.new_page()
+        page.set_default_timeout(self.timeouts.timeout_ms('navigation', unit_url))
+        page.set_default_navigation_timeout(self.timeouts.timeout_ms('navigation', unit_url))
+        
+        await page.set_extra_http_headers({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        })
+        return page
+    
+    def course_title(self, unit_url):
+        """Title of the first course that includes a unit, from the catalog; the manifest's default course otherwise"""
+        titles = self.catalog.unit_course_titles(unit_url) if self.catalog else []
+        return titles[0] if titles else select_courses(load_manifest()['courses'])[0]['title']
+    
+    async def extract_hedged(self, browser, page, unit_url, unit_title, course_title):
+        """Extract a unit; once it is slower than 95% of its history, race a second attempt on a new page"""
+        first = asyncio.create_task(self.extract_content_with_images(page, unit_url, unit_title, course_title))
+        hedge_delay = self.timeouts.hedge_delay(unit_url)
+        if hedge_delay is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=hedge_delay)
+        if done:
+            return first.result()
+        
+        log.info(f"🪝 Still loading after {hedge_delay:.1f}s (p95), starting a hedged attempt")
+        self.tracer.count('hedged_attempts')
+        hedge_page = await self.open_unit_page(browser, unit_url)
+        hedge = asyncio.create_task(self.extract_content_with_images(hedge_page, unit_url, unit_title, course_title))
+        pending = {first, hedge}
+        result = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = task.result()
+                    if result.ok:
+                        if task is hedge:
+                            self.tracer.count('hedged_wins')
+                        return result
+            # Both attempts failed: report the last error
+            return result
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            await hedge_page.close()
+    
     async def recrawl_single_unit(self, unit_url, output_path):
         """Re-crawl a single unit with image support"""
-        print(f"🔄 Re-crawling unit: {unit_url}")
+        log.info(f"🔄 Re-crawling unit: {unit_url}")
         
         async with async_playwright() as p:
-            browser = await p.chromium.launch(
-                headless=True,
-                args=['--no-sandbox', '--disable-dev-shm-usage']
-            )
-            page = await browser.new_page()
-            
-            # Set longer timeouts
-            page.set_default_timeout(90000)
-            page.set_default_navigation_timeout(90000)
-            
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            })
+            with self.tracer.span('browser_launch', unit_url):
+                browser = await p.chromium.launch(
+                    headless=True,
+                    args=['--no-sandbox', '--disable-dev-shm-usage']
+                )
+                page = await self.open_unit_page(browser, unit_url)
             
+            unit_title = unit_url.split('/')[-2].replace('-', ' ').title()
             try:
-                unit_title = unit_url.split('/')[-2].replace('-', ' ').title()
-                content = await self.extract_content_with_images(page, unit_url, unit_title)
+                start = time.perf_counter()
+                result = await self.extract_hedged(browser, page, unit_url, unit_title, self.course_title(unit_url))
+                unit_seconds = time.perf_counter() - start
+                
+                if not result.ok:
+                    # The error page only fills a gap; a unit saved by an earlier crawl stays in place
+                    await save_error_page(output_path, result.html)
+                    self.record_failure(unit_url, output_path, result.error, unit_title)
+                    self.tracer.count('units_failed')
+                    self.tracer.count(f'units_{result.status}')
+                    return False
                 
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                async with aiofiles.open(output_path, 'w', encoding='utf-8') as f:
-                    await f.write(content)
+                with self.tracer.span('write', unit_url):
+                    await async_atomic_write_text(output_path, result.html)
+                    await save_unit_document(result.document, output_path,
+                                             hashlib.sha256(result.html.encode('utf-8')).hexdigest())
+                self.tracer.count('bytes_written', len(result.html.encode('utf-8')))
                 
-                print(f"✅ Successfully re-crawled: {output_path.name}")
+                self.timeouts.record('unit', unit_url, unit_seconds)
+                self.retry_queue.record_success(unit_url)
+                self.tracer.count('units_ok')
+                log.info(f"✅ Successfully re-crawled: {output_path.name}",
+                         extra={'unit': unit_url, 'stage': 'unit', 'duration': round(unit_seconds, 3), 'status': result.status})
                 return True
                 
             except Exception as e:
-                print(f"❌ Error re-crawling {unit_url}: {e}")
+                log.error(f"❌ Error re-crawling {unit_url}: {e}", extra={'unit': unit_url, 'stage': 'unit'})
+                self.record_failure(unit_url, output_path, e, unit_title)
+                self.tracer.count('units_failed')
                 return False
             finally:
                 await browser.close()
@@ -505,13 +693,15 @@ async def main():
     output_path = Path("content/english/01_AZ-104-_Prerequisites_for_Azure_administrators/01_Tour_Azure_Portal/02_Azure_management_options.html")
     
     success = await crawler.recrawl_single_unit(test_url, output_path)
+    await crawler.close_session()
+    crawler.tracer.report(crawler.output_dir / "metrics", "single_unit")
     
     if success:
-        print("🎉 Test crawl completed successfully!")
-        print(f"📁 Check the updated file: {output_path}")
-        print(f"🖼️  Images saved to: {crawler.assets_dir}")
+        log.info("🎉 Test crawl completed successfully!")
+        log.info(f"📁 Check the updated file: {output_path}")
+        log.info(f"🖼️  Images saved to: {crawler.assets_dir}")
     else:
-        print("❌ Test crawl failed")
+        log.error("❌ Test crawl failed")
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -1,53 +1,87 @@
 #!/usr/bin/env python3
 """
 Batch processor for AZ-104 content with various utilities
+Full re-crawls can be sharded: a coordinator leases shards of units to worker
+processes on this host and merges their results
 """
 
+import argparse
 import asyncio
 import json
+import sys
+import time
 from pathlib import Path
-from az104_image_crawler import AZ104ImageCrawler
+from course_catalog import CourseCatalog, file_hash
+from crawl_log import add_logging_args, flush_logs, get_logger, log_summary, setup_logging_from_args
+from lease_queue import LeaseQueue, worker_name
+from unit_urls import canonical_unit_url
+
+log = get_logger('batch')
 
 class BatchProcessor:
     """Batch processing utilities for AZ-104 content"""
     
-    def __init__(self):
-        self.crawler = AZ104ImageCrawler()
+    def __init__(self, lease_seconds=300, retry_rounds=2, max_retry_wait=300):
+        self._crawler = None
         self.course_structure_file = Path("content/course_structure.json")
+        self.catalog = CourseCatalog()
+        self.leases = LeaseQueue(Path("content/crawl_leases.db"), lease_seconds)
         self.processed_count = 0
         self.failed_count = 0
+        # Failed units are retried at the end of a full re-crawl once their backoff is
+        # over, as long as that is at most max_retry_wait seconds away
+        self.retry_rounds = retry_rounds
+        self.max_retry_wait = max_retry_wait
         
+    @property
+    def crawler(self):
+        """Image crawler, created on first use so file-only tasks don't load Playwright and aiohttp"""
+        if self._crawler is None:
+            from az104_image_crawler import AZ104ImageCrawler
+            self._crawler = AZ104ImageCrawler()
+            self._crawler.catalog = self.catalog
+        return self._crawler
+    
     async def load_course_structure(self):
-        """Load the existing course structure"""
-        if not self.course_structure_file.exists():
-            print("❌ Course structure file not found!")
-            return None
+        """Load the course structure from the catalog, seeding it from JSON on first use"""
+        if self.catalog.is_empty():
+            if not self.course_structure_file.exists():
+                log.error("❌ Course structure file not found!")
+                return None
+            
+            with open(self.course_structure_file, 'r', encoding='utf-8') as f:
+                imported = self.catalog.import_structure(json.load(f))
+            log.info(f"🗃️  Imported {imported} units into catalog: {self.catalog.db_path}")
         
-        with open(self.course_structure_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return self.catalog.export_structure()
     
     async def recrawl_all_units(self):
         """Re-crawl all units with image support"""
-        print("🚀 Starting batch re-crawl with image support")
-        print("=" * 60)
+        log.info("🚀 Starting batch re-crawl with image support")
+        log.info("=" * 60)
         
         course_structure = await self.load_course_structure()
         if not course_structure:
             return
         
-        total_units = sum(
-            len(module.get('units', []))
+        # Units shared by several learning paths are listed under each of them but crawled once
+        total_units = len({
+            canonical_unit_url(unit['url'])
             for learning_path in course_structure.get('learning_paths', [])
             for module in learning_path.get('modules', [])
-        )
+            for unit in module.get('units', [])
+            if unit.get('url')
+        })
+        seen_units = set()
+        failed_units = []
         
-        print(f"📊 Found {total_units} units to re-crawl")
+        log.info(f"📊 Found {total_units} units to re-crawl")
         
         for lp_index, learning_path in enumerate(course_structure.get('learning_paths', []), 1):
-            print(f"\n🎯 Processing Learning Path {lp_index}: {learning_path.get('title', 'Unknown')}")
+            log.info(f"\n🎯 Processing Learning Path {lp_index}: {learning_path.get('title', 'Unknown')}")
             
             for module_index, module in enumerate(learning_path.get('modules', []), 1):
-                print(f"\n📁 Module {module_index}: {module.get('title', 'Unknown')}")
+                log.info(f"\n📁 Module {module_index}: {module.get('title', 'Unknown')}")
                 
                 units = module.get('units', [])
                 batch_size = 5
@@ -55,90 +89,305 @@ class BatchProcessor:
                 for i in range(0, len(units), batch_size):
                     batch = units[i:i + batch_size]
                     tasks = []
+                    task_units = []
                     
                     for unit in batch:
                         unit_url = unit.get('url')
                         local_file = unit.get('local_file')
                         
+                        if unit_url and canonical_unit_url(unit_url) in seen_units:
+                            continue
                         if unit_url and local_file:
+                            seen_units.add(canonical_unit_url(unit_url))
                             output_path = Path("content") / local_file
                             tasks.append(self.recrawl_unit_safe(unit_url, output_path, unit.get('title', 'Unknown')))
+                            task_units.append((unit_url, output_path, unit.get('title', 'Unknown')))
                     
                     if tasks:
                         results = await asyncio.gather(*tasks, return_exceptions=True)
                         
-                        for result in results:
+                        for task_unit, result in zip(task_units, results):
                             if result is True:
                                 self.processed_count += 1
                             else:
                                 self.failed_count += 1
+                                failed_units.append(task_unit)
                         
-                        print(f"📊 Progress: {self.processed_count} success, {self.failed_count} failed")
-                        await asyncio.sleep(2)
+                        log.info(f"📊 Progress: {self.processed_count} success, {self.failed_count} failed")
+                        with self.crawler.tracer.span('batch_pause'):
+                            await asyncio.sleep(2)
+        
+        await self.retry_failed_pass(failed_units)
         
-        print(f"\n🎉 Batch re-crawl completed!")
-        print(f"✅ Successfully processed: {self.processed_count} units")
-        print(f"❌ Failed: {self.failed_count} units")
-        print(f"📊 Total: {self.processed_count + self.failed_count} units")
+        log.info(f"\n🎉 Batch re-crawl completed!")
+        log_summary(log, self.processed_count, self.failed_count)
+        log.info(f"📊 Total: {self.processed_count + self.failed_count} units")
         
+        self.catalog.export_json(self.course_structure_file)
         await self.crawler.close_session()
+        self.crawler.asset_index.print_stats()
+        self.crawler.tracer.report(Path("content/metrics"), "batch_recrawl")
+    
+    async def retry_failed_pass(self, failed_units, batch_size=5):
+        """Retry units that failed in this run once their backoff in the retry queue is over"""
+        retry_queue = self.crawler.retry_queue
+        for retry_round in range(1, self.retry_rounds + 1):
+            # Units that gave up (dead) or whose backoff runs past max_retry_wait stay in the queue for later
+            due = []
+            for unit in failed_units:
+                entry = retry_queue.get(unit[0])
+                if entry and entry['status'] == 'pending' and entry['next_eligible'] - time.time() <= self.max_retry_wait:
+                    due.append((entry['next_eligible'], unit))
+            if not due:
+                break
+            
+            wait = max(0.0, max(next_eligible for next_eligible, _unit in due) - time.time())
+            log.info(f"\n🔁 Retry round {retry_round}: {len(due)} failed units, starting in {wait:.0f}s")
+            with self.crawler.tracer.span('retry_wait'):
+                await asyncio.sleep(wait)
+            
+            retried = [unit for _next_eligible, unit in due]
+            failed_units = [unit for unit in failed_units if unit not in retried]
+            for i in range(0, len(retried), batch_size):
+                batch = retried[i:i + batch_size]
+                results = await asyncio.gather(
+                    *(self.recrawl_unit_safe(*unit) for unit in batch), return_exceptions=True
+                )
+                for unit, result in zip(batch, results):
+                    if result is True:
+                        self.processed_count += 1
+                        self.failed_count -= 1
+                    else:
+                        failed_units.append(unit)
+            log.info(f"📊 After retry round {retry_round}: {self.processed_count} success, {self.failed_count} failed")
+        
+        waiting = [unit for unit in failed_units if (retry_queue.get(unit[0]) or {}).get('status') == 'pending']
+        if waiting:
+            log.info(f"⏳ {len(waiting)} units stay in the retry queue for retry_failed_units.py")
+    
+    async def recrawl_unit(self, unit_url, output_path, unit_title):
+        """Re-crawl a single unit; returns (success, error message)"""
+        try:
+            log.info(f"🔄 Re-crawling: {unit_title}")
+            with self.crawler.tracer.span('unit', unit_url, title=unit_title):
+                success = await self.crawler.recrawl_single_unit(unit_url, output_path)
+            return success, None if success else "recrawl failed"
+        except Exception as e:
+            log.error(f"❌ Error re-crawling {unit_title}: {e}")
+            return False, str(e)
     
     async def recrawl_unit_safe(self, unit_url, output_path, unit_title):
         """Safely re-crawl a single unit with error handling"""
+        success, error = await self.recrawl_unit(unit_url, output_path, unit_title)
+        self.catalog.record_attempt(
+            unit_url, success, error=error, content_hash=file_hash(output_path) if success else None
+        )
+        return success
+    
+    def unique_units(self, course_structure):
+        """Units with a local file, each unit shared by several learning paths listed once"""
+        units = {}
+        for learning_path in course_structure.get('learning_paths', []):
+            for module in learning_path.get('modules', []):
+                for unit in module.get('units', []):
+                    if unit.get('url') and unit.get('local_file'):
+                        units.setdefault(canonical_unit_url(unit['url']), {
+                            'url': unit['url'],
+                            'title': unit.get('title', 'Unknown'),
+                            'local_file': unit['local_file']
+                        })
+        return list(units.values())
+    
+    async def create_leases(self, shard_size=10):
+        """Coordinator: split every unit into shards in the lease queue and return the run id"""
+        course_structure = await self.load_course_structure()
+        if not course_structure:
+            return None
+        
+        units = self.unique_units(course_structure)
+        run_id = self.leases.create_run(units, shard_size)
+        shards = (len(units) + shard_size - 1) // shard_size
+        log.info(f"🗂️  Run {run_id}: {len(units)} units in {shards} shards of up to {shard_size}")
+        return run_id
+    
+    async def run_worker(self, run_id=None, poll_interval=10):
+        """Worker: lease shards and re-crawl their units until the run has no open shards"""
+        run_id = run_id or self.leases.latest_run()
+        if not run_id:
+            log.error("❌ No sharded run found, start one with --coordinate")
+            return
+        
+        worker = worker_name()
+        log.info(f"👷 Worker {worker} joined run {run_id}", extra={'worker': worker, 'run_id': run_id})
         try:
-            print(f"🔄 Re-crawling: {unit_title}")
-            return await self.crawler.recrawl_single_unit(unit_url, output_path)
-        except Exception as e:
-            print(f"❌ Error re-crawling {unit_title}: {e}")
-            return False
-
-    async def fix_source_urls(self):
-        """Fix source URLs in existing HTML files"""
-        print("🔧 Fixing source URLs in HTML files...")
+            while True:
+                lease = self.leases.claim(run_id, worker)
+                if lease:
+                    await self.process_lease(run_id, lease, worker)
+                    continue
+                if not self.leases.open_count(run_id):
+                    break
+                # Other workers hold the remaining shards; wait in case one of them dies
+                await asyncio.sleep(poll_interval)
+        finally:
+            await self.crawler.close_session()
+            self.crawler.tracer.report(Path("content/metrics"), f"batch_worker_{worker}")
         
-        html_files = list(Path("content/english").rglob("*.html"))
-        print(f"📁 Found {len(html_files)} HTML files to process")
+        log.info(f"\n✅ Worker {worker} finished: {self.processed_count} success, {self.failed_count} failed",
+                 extra={'worker': worker, 'run_id': run_id})
+    
+    async def process_lease(self, run_id, lease, worker):
+        """Re-crawl one shard while a heartbeat keeps its lease alive"""
+        log.info(f"\n📦 Shard {lease['shard']}: {len(lease['units'])} units", extra={'worker': worker, 'run_id': run_id})
+        lost = asyncio.Event()
+        
+        async def keep_alive():
+            while True:
+                await asyncio.sleep(self.leases.lease_seconds / 3)
+                if not self.leases.heartbeat(lease['id'], worker):
+                    lost.set()
+                    return
         
-        fixed_count = 0
-        for file_path in html_files:
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
+        heartbeat = asyncio.create_task(keep_alive())
+        try:
+            # A reassigned shard only redoes the units its previous worker didn't finish
+            done = self.leases.succeeded_urls(run_id)
+            units = [unit for unit in lease['units'] if canonical_unit_url(unit['url']) not in done]
+            batch_size = 5
+            
+            for i in range(0, len(units), batch_size):
+                if lost.is_set():
+                    log.warning(f"⚠️  Lease on shard {lease['shard']} expired, leaving it to its new worker",
+                                extra={'worker': worker, 'run_id': run_id})
+                    return
+                batch = units[i:i + batch_size]
+                results = await asyncio.gather(*[
+                    self.recrawl_unit(unit['url'], Path("content") / unit['local_file'], unit['title'])
+                    for unit in batch
+                ])
                 
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(content, 'html.parser')
+                for unit, (success, error) in zip(batch, results):
+                    output_path = Path("content") / unit['local_file']
+                    self.leases.record_result(
+                        run_id, unit['url'], success, worker,
+                        content_hash=file_hash(output_path) if success else None, error=error
+                    )
+                    if success:
+                        self.processed_count += 1
+                    else:
+                        self.failed_count += 1
                 
-                source_info = soup.find('div', class_='source-info')
-                if source_info:
-                    paragraphs = source_info.find_all('p')
-                    for p in paragraphs:
-                        if p.get_text() and 'Source:' in p.get_text():
-                            link = p.find('a')
-                            if link and link.get('href'):
-                                url = link.get('href')
-                                link.string = url
-                                
-                                with open(file_path, 'w', encoding='utf-8') as f:
-                                    f.write(str(soup))
-                                
-                                fixed_count += 1
-                                break
-            except Exception as e:
-                print(f"❌ Error fixing {file_path}: {e}")
-        
-        print(f"✅ Fixed {fixed_count} files")
+                log.info(f"📊 Progress: {self.processed_count} success, {self.failed_count} failed")
+                with self.crawler.tracer.span('batch_pause'):
+                    await asyncio.sleep(2)
+            
+            if not self.leases.complete(lease['id'], worker):
+                log.warning(f"⚠️  Shard {lease['shard']} was reassigned before it finished")
+        finally:
+            heartbeat.cancel()
+    
+    def merge_run(self, run_id=None):
+        """Apply a sharded run's results to the catalog and write a single course_structure.json"""
+        run_id = run_id or self.leases.latest_run()
+        if not run_id:
+            log.error("❌ No sharded run found")
+            return None
+        
+        results = {result['url']: result for result in self.leases.results(run_id)}
+        for result in results.values():
+            self.catalog.record_attempt(
+                result['url'], bool(result['success']), error=result['error'], content_hash=result['content_hash']
+            )
+        structure_file = self.catalog.export_json(self.course_structure_file)
+        
+        missing = [unit for unit in self.leases.run_units(run_id) if canonical_unit_url(unit['url']) not in results]
+        succeeded = sum(1 for result in results.values() if result['success'])
+        
+        log.info(f"\n🧩 Merged run {run_id}")
+        log_summary(log, succeeded, len(results) - succeeded)
+        if missing:
+            shards = ', '.join(f"{status}={count}" for status, count in sorted(self.leases.status_counts(run_id).items()))
+            log.warning(f"⚠️  No result for {len(missing)} units (shards: {shards})")
+            for unit in missing[:10]:
+                log.info(f"   - {unit['title']}: {unit['url']}")
+        log.info(f"📊 Structure saved to: {structure_file}")
+        return {'succeeded': succeeded, 'failed': len(results) - succeeded, 'missing': len(missing)}
+    
+    async def coordinate(self, workers=2, shard_size=10):
+        """Create a sharded run, run local worker processes on it and merge their results"""
+        run_id = await self.create_leases(shard_size)
+        if not run_id:
+            return
+        
+        log.info(f"🚀 Starting {workers} local workers")
+        log.info(f"💡 More workers on this host can join: python crawlers/batch_processor.py --worker --run {run_id}")
+        processes = [
+            await asyncio.create_subprocess_exec(
+                sys.executable, str(Path(__file__).resolve()), '--worker', '--run', run_id,
+                '--lease-seconds', str(self.leases.lease_seconds)
+            )
+            for _ in range(workers)
+        ]
+        exit_codes = await asyncio.gather(*[process.wait() for process in processes])
+        if any(exit_codes):
+            log.warning(f"⚠️  {sum(1 for code in exit_codes if code)} workers exited with an error")
+        
+        self.merge_run(run_id)
+
+    async def fix_source_urls(self, dry_run=False):
+        """Fix source URLs in existing HTML files"""
+        log.info("🔧 Fixing source URLs in HTML files...")
+        
+        # One tokenizer pass per page in a process pool; pages that are already right are not rewritten
+        from html_rewrite import BulkRewriter
+        rewriter = BulkRewriter(['source-link-text'], dry_run=dry_run)
+        report = await asyncio.to_thread(rewriter.run, ('english',))
+        
+        for result in report['errors']:
+            log.error(f"❌ Error fixing {result['file']}: {result['error']}")
+        verb = "Would fix" if dry_run else "Fixed"
+        log.info(f"✅ {verb} {len(report['changed'])} of {report['pages']} files in {report['seconds']:.2f}s")
 
 async def main():
     """Main function for batch processing"""
-    processor = BatchProcessor()
+    parser = argparse.ArgumentParser(description="AZ-104 batch processor (interactive menu without options)")
+    parser.add_argument('--coordinate', action='store_true', help="shard a full re-crawl and run local workers on it")
+    parser.add_argument('--worker', action='store_true', help="work on a sharded re-crawl")
+    parser.add_argument('--merge', action='store_true', help="merge a sharded re-crawl into the catalog")
+    parser.add_argument('--fix-source-urls', action='store_true', help="fix source links in saved unit pages")
+    parser.add_argument('--dry-run', action='store_true', help="with --fix-source-urls: report without writing")
+    parser.add_argument('--run', help="sharded run id (default: the latest run)")
+    parser.add_argument('--workers', type=int, default=2, help="local worker processes (--coordinate)")
+    parser.add_argument('--shard-size', type=int, default=10, help="units per lease (--coordinate)")
+    parser.add_argument('--lease-seconds', type=float, default=300,
+                        help="lease lifetime without a heartbeat before it is reassigned")
+    add_logging_args(parser)
+    args = parser.parse_args()
+    setup_logging_from_args(args)
     
+    processor = BatchProcessor(lease_seconds=args.lease_seconds)
+    if args.coordinate:
+        await processor.coordinate(args.workers, args.shard_size)
+        return
+    if args.worker:
+        await processor.run_worker(args.run)
+        return
+    if args.merge:
+        processor.merge_run(args.run)
+        return
+    if args.fix_source_urls:
+        await processor.fix_source_urls(args.dry_run)
+        return
+    
+    flush_logs()
     print("AZ-104 Batch Processor")
     print("=" * 30)
     print("1. Re-crawl all units with images")
     print("2. Fix source URLs")
-    print("3. Exit")
+    print("3. Sharded re-crawl with local worker processes")
+    print("4. Exit")
     
-    choice = input("\nSelect option (1-3): ").strip()
+    choice = input("\nSelect option (1-4): ").strip()
     
     if choice == "1":
         print("\n⚠️  This will re-crawl ALL 260 units with image support.")
@@ -154,6 +403,10 @@ async def main():
         await processor.fix_source_urls()
     
     elif choice == "3":
+        workers = input("Number of worker processes (default 2): ").strip()
+        await processor.coordinate(int(workers) if workers.isdigit() else 2)
+    
+    elif choice == "4":
         print("👋 Goodbye!")
     
     else:
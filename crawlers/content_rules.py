@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Shared content cleaning rules for AZ-104 pages
+The same selector and text-pattern lists drive both the Python cleaner
+(prune_soup) and the in-browser pruning script (page_scripts.PRUNE_CONTENT_JS)
+"""
+
+import re
+
+# Where the unit content lives, tried in order
+UNIT_ROOT_SELECTORS = ['#module-unit-content', 'main', '[data-bi-name="content"]']
+COURSE_ROOT_SELECTORS = ['#module-unit-content', 'main']
+
+# Elements removed by the image crawler
+IMAGE_CRAWLER_UNWANTED = [
+    '.xp-tag', '.metadata', '.page-metadata',
+    '[data-progress-uid]', '[data-bi-name="feedback"]',
+    '.visually-hidden', '.docon',
+    'button', '.button', '[role="button"]',
+    '.feedback', '.rating', '.helpful',
+    '.navigation', '.breadcrumb',
+    '.next-unit', '.prev-unit'
+]
+
+# Elements removed by the full-course crawler
+COURSE_CRAWLER_UNWANTED = [
+    '.xp-tag', '.metadata', '.page-metadata',
+    '[data-progress-uid]', '[data-bi-name]',
+    '.visually-hidden', '.docon',
+    'button', '.button', '[role="button"]',
+    '.feedback', '.rating', '.helpful',
+    '.navigation', '.breadcrumb'
+]
+
+# Elements removed by the content cleaner
+CLEANER_UNWANTED = [
+    '.xp-tag', '.metadata', '.page-metadata',
+    '[data-progress-uid]', '[data-bi-name]',
+    '.visually-hidden', '.docon',
+    'button', '.button', '[role="button"]',
+    '.feedback', '.rating', '.helpful',
+    '.navigation', '.breadcrumb', '.uhf-container',
+    '[data-test-id]', '.site-header',
+    '.module-progress', '.completion',
+    '.cta', '.call-to-action', '.promo',
+    '.ad', '.advertisement'
+]
+
+# Text whose parent element is removed (matched case-insensitively, dot matches newlines)
+UNWANTED_TEXT_PATTERNS = [
+    r'Get started with Azure.*?Sign up\.',
+    r'Choose the Azure account.*?Sign up\.',
+    r'Pay as you go or try Azure free.*?Sign up\.',
+    r'Module incomplete:.*?Previous Go back to finish',
+    r'Need help\? See our troubleshooting guide.*?reporting an issue\.',
+    r'Feedback\s*Was this page helpful\?\s*Yes\s*No',
+    r'Was this page helpful\?\s*Yes\s*No',
+    r'Sign in to save your progress',
+    r'Complete the module to unlock',
+    r'XP\s*\d+\s*minutes?',
+    r'Completed\s*\d+\s*XP',
+    r'Unit \d+ of \d+',
+    r'Previous\s*Next',
+    r'Continue\s*Next unit:',
+    r'Ask Learn',
+    r'Browse all courses',
+    r'Start learning path',
+    r'Add to collection',
+    r'Share this page'
+]
+
+# Elements kept even when they have no text
+KEEP_EMPTY_TAGS = ['br', 'hr']
+
+def prune_soup(root, selectors, patterns=(), drop_empty=False):
+    """Remove unwanted elements, pattern-matching text and (optionally) empty elements in place"""
+    for selector in selectors:
+        for element in root.select(selector):
+            element.decompose()
+
+    compiled = [re.compile(pattern, re.IGNORECASE | re.DOTALL) for pattern in patterns]
+    if compiled:
+        for text_node in root.find_all(string=True):
+            text = text_node.strip()
+            for pattern in compiled:
+                if pattern.search(text):
+                    parent = text_node.parent
+                    if parent:
+                        parent.decompose()
+                    break
+
+    if drop_empty:
+        for element in root.find_all():
+            if not element.get_text(strip=True) and not element.find('img') and element.name not in KEEP_EMPTY_TAGS:
+                element.decompose()
+
+    return root
+
+def prune_args(roots, selectors, patterns=(), drop_empty=False):
+    """Argument object for PRUNE_CONTENT_JS matching a prune_soup call"""
+    return {
+        'roots': list(roots),
+        'selectors': list(selectors),
+        'patterns': list(patterns),
+        'dropEmpty': drop_empty,
+        'keepEmpty': KEEP_EMPTY_TAGS
+    }
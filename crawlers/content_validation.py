@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Extraction results and content validation for AZ-104 crawlers
+Every unit extraction ends as ok, empty, error or not_found (Learn's soft 404
+page); only ok results are saved as content, and an error page never
+replaces a unit page saved by an earlier crawl
+"""
+
+import re
+from pathlib import Path
+from atomic_io import async_atomic_write_text
+from crawl_log import get_logger
+
+log = get_logger('validation')
+
+OK = 'ok'
+EMPTY = 'empty'
+ERROR = 'error'
+NOT_FOUND = 'not_found'
+
+# Unit content shorter than this (visible text) is a failed load, not a real unit
+MIN_TEXT_LENGTH = 200
+
+# Learn serves missing pages with status 200 and this illustration
+SOFT_404_IMAGES = ('learn-not-found-light-mode', 'learn-not-found-dark-mode')
+SOFT_404_TITLE = re.compile(r'\b(404|page not found|content not found)\b', re.IGNORECASE)
+
+# Marks pages written by _create_error_html so they are never mistaken for content
+ERROR_PAGE_MARKER = '<meta name="crawl-status" content="error">'
+LEGACY_ERROR_HEADING = '<h1>Error Extracting Content</h1>'
+
+class InvalidContentError(Exception):
+    """Unit page that loaded but has no usable content"""
+    status = ERROR
+
+class EmptyContentError(InvalidContentError):
+    """Unit content is missing, too short or has no headings or paragraphs"""
+    status = EMPTY
+
+class SoftNotFoundError(InvalidContentError):
+    """Learn answered with its 'page not found' page instead of the unit"""
+    status = NOT_FOUND
+
+class ExtractionResult:
+    """Outcome of extracting one unit: status, the HTML to save and the error behind a failure
+    Successful extractions also carry the unit's structured document (unit_export.build_document)"""
+
+    def __init__(self, status, html, error=None, document=None):
+        self.status = status
+        self.html = html
+        self.error = error
+        self.document = document
+
+    @property
+    def ok(self):
+        return self.status == OK
+
+    @classmethod
+    def failed(cls, error, html):
+        """Result for a failed extraction, typed by the error"""
+        return cls(getattr(error, 'status', ERROR), html, error)
+
+def validate_content(soup, page_title=''):
+    """Problem with extracted unit content as an InvalidContentError, or None when it looks like a unit"""
+    if soup is None:
+        return EmptyContentError("No main content found")
+
+    for img in soup.find_all('img'):
+        sources = f"{img.get('src') or ''} {img.get('srcset') or ''}"
+        if any(marker in sources for marker in SOFT_404_IMAGES):
+            return SoftNotFoundError("Learn returned its 'page not found' page")
+    if page_title and SOFT_404_TITLE.search(page_title):
+        return SoftNotFoundError(f"Page title looks like a 404: {page_title}")
+
+    text_length = len(soup.get_text(" ", strip=True))
+    if text_length < MIN_TEXT_LENGTH:
+        return EmptyContentError(f"Only {text_length} characters of text (expected at least {MIN_TEXT_LENGTH})")
+    if not soup.find(['h1', 'h2', 'h3', 'p', 'li']):
+        return EmptyContentError("No headings, paragraphs or list items in the content")
+    return None
+
+def is_error_page(html):
+    """True for pages written by _create_error_html (current or older format)"""
+    return ERROR_PAGE_MARKER in html or LEGACY_ERROR_HEADING in html
+
+def has_good_content(path):
+    """True when path holds a saved unit page rather than nothing or an error page"""
+    path = Path(path)
+    if not path.exists():
+        return False
+    return not is_error_page(path.read_text(encoding='utf-8', errors='replace'))
+
+async def save_error_page(path, html):
+    """Write an error page unless it would replace good content; returns whether it was written"""
+    if has_good_content(path):
+        log.info(f"🛡️  Keeping previously crawled content: {Path(path).name}")
+        return False
+    await async_atomic_write_text(path, html)
+    return True
@@ -0,0 +1,555 @@
+#!/usr/bin/env python3
+"""
+SQLite course catalog for AZ-104 content
+Tracks learning paths, modules, units, assets, crawl attempts and translation status
+Units are keyed by canonical URL and stored once; module_units places a unit in
+every module (across learning paths) that includes it, and course_paths places a
+learning path in every course that includes it
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from atomic_io import atomic_write_text
+from crawl_log import flush_logs, get_logger
+from unit_urls import canonical_asset_url, canonical_unit_url
+
+log = get_logger('catalog')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS course (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    title TEXT,
+    url TEXT,
+    crawl_timestamp TEXT
+);
+
+CREATE TABLE IF NOT EXISTS courses (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    title TEXT,
+    url TEXT,
+    crawl_timestamp TEXT
+);
+
+CREATE TABLE IF NOT EXISTS learning_paths (
+    id INTEGER PRIMARY KEY,
+    path_index INTEGER NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    url TEXT,
+    expected_modules INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS course_paths (
+    course_id INTEGER NOT NULL REFERENCES courses(id) ON DELETE CASCADE,
+    path_order INTEGER NOT NULL,
+    path_id INTEGER NOT NULL REFERENCES learning_paths(id) ON DELETE CASCADE,
+    PRIMARY KEY (course_id, path_order)
+);
+
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY,
+    path_id INTEGER NOT NULL REFERENCES learning_paths(id) ON DELETE CASCADE,
+    module_index INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    UNIQUE (path_id, module_index)
+);
+
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    unit_index INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL UNIQUE,
+    local_file TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    content_hash TEXT,
+    last_error TEXT,
+    crawled_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS module_units (
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    unit_index INTEGER NOT NULL,
+    unit_id INTEGER NOT NULL REFERENCES units(id) ON DELETE CASCADE,
+    PRIMARY KEY (module_id, unit_index)
+);
+
+CREATE TABLE IF NOT EXISTS assets (
+    id INTEGER PRIMARY KEY,
+    unit_id INTEGER NOT NULL REFERENCES units(id) ON DELETE CASCADE,
+    source_url TEXT NOT NULL,
+    local_path TEXT NOT NULL,
+    UNIQUE (unit_id, source_url)
+);
+
+CREATE TABLE IF NOT EXISTS crawl_attempts (
+    id INTEGER PRIMARY KEY,
+    unit_id INTEGER NOT NULL REFERENCES units(id) ON DELETE CASCADE,
+    attempted_at TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    error TEXT
+);
+
+CREATE TABLE IF NOT EXISTS translations (
+    unit_id INTEGER PRIMARY KEY REFERENCES units(id) ON DELETE CASCADE,
+    local_file TEXT NOT NULL,
+    status TEXT NOT NULL,
+    source_hash TEXT,
+    updated_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_course_paths_path ON course_paths(path_id);
+CREATE INDEX IF NOT EXISTS idx_modules_path ON modules(path_id);
+CREATE INDEX IF NOT EXISTS idx_units_module ON units(module_id);
+CREATE INDEX IF NOT EXISTS idx_units_status ON units(status);
+CREATE INDEX IF NOT EXISTS idx_units_local_file ON units(local_file);
+CREATE INDEX IF NOT EXISTS idx_module_units_unit ON module_units(unit_id);
+CREATE INDEX IF NOT EXISTS idx_assets_unit ON assets(unit_id);
+CREATE INDEX IF NOT EXISTS idx_attempts_unit ON crawl_attempts(unit_id);
+CREATE INDEX IF NOT EXISTS idx_translations_status ON translations(status);
+"""
+
+def file_hash(file_path):
+    """Return the sha256 hex digest of a file, or None if it does not exist"""
+    file_path = Path(file_path)
+    if not file_path.exists():
+        return None
+    return hashlib.sha256(file_path.read_bytes()).hexdigest()
+
+class CourseCatalog:
+    """SQLite-backed catalog of the course structure and crawl state"""
+
+    def __init__(self, db_path=Path("content/course_catalog.db")):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Canonicalize unit URLs from older catalogs, merging units stored under several URLs"""
+        with self.transaction() as conn:
+            # Every unit appears at least in its home module
+            conn.execute(
+                "INSERT OR IGNORE INTO module_units (module_id, unit_index, unit_id) "
+                "SELECT module_id, unit_index, id FROM units"
+            )
+            for row in conn.execute("SELECT id, url FROM units").fetchall():
+                url = canonical_unit_url(row['url'])
+                if url == row['url']:
+                    continue
+                existing = conn.execute("SELECT id FROM units WHERE url = ?", (url,)).fetchone()
+                if not existing:
+                    conn.execute("UPDATE units SET url = ? WHERE id = ?", (url, row['id']))
+                    continue
+                for table in ('module_units', 'assets', 'crawl_attempts', 'translations'):
+                    conn.execute(f"UPDATE OR IGNORE {table} SET unit_id = ? WHERE unit_id = ?", (existing['id'], row['id']))
+                conn.execute("DELETE FROM units WHERE id = ?", (row['id'],))
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of statements in a single transaction"""
+        with self.conn:
+            yield self.conn
+
+    def is_empty(self):
+        """Check whether any units have been cataloged yet"""
+        return self.conn.execute("SELECT 1 FROM units LIMIT 1").fetchone() is None
+
+    def set_course(self, title, url, crawl_timestamp=None):
+        """Store the course-level metadata"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO course (id, title, url, crawl_timestamp) VALUES (1, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title=excluded.title, url=excluded.url, "
+                "crawl_timestamp=excluded.crawl_timestamp",
+                (title, url, crawl_timestamp or time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+
+    def upsert_course(self, code, title, url, crawl_timestamp=None):
+        """Insert or update one course of a multi-course catalog and return its id"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO courses (code, title, url, crawl_timestamp) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(code) DO UPDATE SET title=excluded.title, url=excluded.url, "
+                "crawl_timestamp=excluded.crawl_timestamp",
+                (code.lower(), title, url, crawl_timestamp or time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            row = conn.execute("SELECT id FROM courses WHERE code = ?", (code.lower(),)).fetchone()
+        return row['id']
+
+    def set_course_paths(self, course_id, path_urls):
+        """Set a course's learning paths, in course order, from their URLs"""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM course_paths WHERE course_id = ?", (course_id,))
+            path_order = 0
+            for url in path_urls:
+                row = conn.execute("SELECT id FROM learning_paths WHERE url = ?", (url,)).fetchone()
+                if row:
+                    path_order += 1
+                    conn.execute(
+                        "INSERT INTO course_paths (course_id, path_order, path_id) VALUES (?, ?, ?)",
+                        (course_id, path_order, row['id'])
+                    )
+
+    def path_index_for(self, url):
+        """Storage index of a learning path: its existing index, or the next free one"""
+        # Indexes are global rather than per course, so paths of different courses never share a folder
+        row = self.conn.execute("SELECT path_index FROM learning_paths WHERE url = ?", (url,)).fetchone()
+        if row:
+            return row['path_index']
+        row = self.conn.execute("SELECT MAX(path_index) AS last FROM learning_paths").fetchone()
+        return (row['last'] or 0) + 1
+
+    def upsert_learning_path(self, path_index, title, url=None, expected_modules=None):
+        """Insert or update a learning path and return its id"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO learning_paths (path_index, title, url, expected_modules) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(path_index) DO UPDATE SET title=excluded.title, url=excluded.url, "
+                "expected_modules=excluded.expected_modules",
+                (path_index, title, url, expected_modules)
+            )
+            row = conn.execute("SELECT id FROM learning_paths WHERE path_index = ?", (path_index,)).fetchone()
+        return row['id']
+
+    def upsert_module(self, path_id, module_index, title):
+        """Insert or update a module and return its id"""
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO modules (path_id, module_index, title) VALUES (?, ?, ?) "
+                "ON CONFLICT(path_id, module_index) DO UPDATE SET title=excluded.title",
+                (path_id, module_index, title)
+            )
+            row = conn.execute(
+                "SELECT id FROM modules WHERE path_id = ? AND module_index = ?",
+                (path_id, module_index)
+            ).fetchone()
+        return row['id']
+
+    def _upsert_unit(self, conn, module_id, unit_index, title, url, local_file):
+        """Insert or update a unit row and its place in a module inside an open transaction"""
+        url = canonical_unit_url(url)
+        # A unit shared by several modules keeps the position and file of the module that added it first
+        conn.execute(
+            "INSERT INTO units (module_id, unit_index, title, url, local_file) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET title=excluded.title, "
+            "unit_index=CASE WHEN units.module_id = excluded.module_id THEN excluded.unit_index ELSE units.unit_index END, "
+            "local_file=CASE WHEN units.module_id = excluded.module_id OR units.local_file IS NULL "
+            "THEN COALESCE(excluded.local_file, units.local_file) ELSE units.local_file END",
+            (module_id, unit_index, title, url, local_file)
+        )
+        unit_id = conn.execute("SELECT id FROM units WHERE url = ?", (url,)).fetchone()['id']
+        conn.execute(
+            "INSERT INTO module_units (module_id, unit_index, unit_id) VALUES (?, ?, ?) "
+            "ON CONFLICT(module_id, unit_index) DO UPDATE SET unit_id=excluded.unit_id",
+            (module_id, unit_index, unit_id)
+        )
+        return unit_id
+
+    def upsert_unit(self, module_id, unit_index, title, url, local_file=None):
+        """Insert or update a unit without touching its crawl status"""
+        with self.transaction() as conn:
+            return self._upsert_unit(conn, module_id, unit_index, title, url, local_file)
+
+    def record_unit_result(self, module_id, unit_index, title, url, local_file, success,
+                           content_hash=None, error=None):
+        """Atomically store a unit and the outcome of crawling it"""
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        with self.transaction() as conn:
+            unit_id = self._upsert_unit(conn, module_id, unit_index, title, url, local_file)
+            if success:
+                conn.execute(
+                    "UPDATE units SET status='ok', content_hash=?, last_error=NULL, crawled_at=? WHERE id=?",
+                    (content_hash, now, unit_id)
+                )
+            else:
+                conn.execute(
+                    "UPDATE units SET status='failed', last_error=? WHERE id=?",
+                    (error, unit_id)
+                )
+            conn.execute(
+                "INSERT INTO crawl_attempts (unit_id, attempted_at, success, error) VALUES (?, ?, ?, ?)",
+                (unit_id, now, 1 if success else 0, error)
+            )
+        return unit_id
+
+    def record_attempt(self, unit_url, success, error=None, content_hash=None):
+        """Record a crawl attempt for an already cataloged unit"""
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id FROM units WHERE url = ?", (canonical_unit_url(unit_url),)).fetchone()
+            if not row:
+                return False
+            if success:
+                conn.execute(
+                    "UPDATE units SET status='ok', content_hash=COALESCE(?, content_hash), "
+                    "last_error=NULL, crawled_at=? WHERE id=?",
+                    (content_hash, now, row['id'])
+                )
+            else:
+                conn.execute("UPDATE units SET status='failed', last_error=? WHERE id=?", (error, row['id']))
+            conn.execute(
+                "INSERT INTO crawl_attempts (unit_id, attempted_at, success, error) VALUES (?, ?, ?, ?)",
+                (row['id'], now, 1 if success else 0, error)
+            )
+        return True
+
+    def record_asset(self, unit_url, source_url, local_path):
+        """Record an image referenced by a unit"""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT id FROM units WHERE url = ?", (canonical_unit_url(unit_url),)).fetchone()
+            if not row:
+                return False
+            conn.execute(
+                "INSERT INTO assets (unit_id, source_url, local_path) VALUES (?, ?, ?) "
+                "ON CONFLICT(unit_id, source_url) DO UPDATE SET local_path=excluded.local_path",
+                (row['id'], canonical_asset_url(source_url), local_path)
+            )
+        return True
+
+    def relink_assets(self, moves):
+        """Point asset records at another local path (old local_path -> new), e.g. after duplicates were merged"""
+        with self.transaction() as conn:
+            for old, new in moves.items():
+                conn.execute("UPDATE assets SET local_path = ? WHERE local_path = ?", (new, old))
+
+    def set_translation_status(self, english_local_file, vietnamese_local_file, status, source_hash=None):
+        """Record the translation state of a unit, keyed by its English local file"""
+        now = time.strftime('%Y-%m-%d %H:%M:%S')
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT id FROM units WHERE local_file = ?", (english_local_file,)
+            ).fetchone()
+            if not row:
+                return False
+            conn.execute(
+                "INSERT INTO translations (unit_id, local_file, status, source_hash, updated_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(unit_id) DO UPDATE SET local_file=excluded.local_file, "
+                "status=excluded.status, source_hash=excluded.source_hash, updated_at=excluded.updated_at",
+                (row['id'], vietnamese_local_file, status, source_hash, now)
+            )
+        return True
+
+    def unit_by_url(self, unit_url):
+        """Return a single unit row as a dict, or None"""
+        row = self.conn.execute("SELECT * FROM units WHERE url = ?", (canonical_unit_url(unit_url),)).fetchone()
+        return dict(row) if row else None
+
+    def unit_course_titles(self, unit_url):
+        """Titles of the courses whose learning paths include a unit, in the order they were added"""
+        return [row['title'] for row in self.conn.execute(
+            "SELECT DISTINCT c.id, c.title FROM units u "
+            "JOIN module_units mu ON mu.unit_id = u.id "
+            "JOIN modules m ON m.id = mu.module_id "
+            "JOIN course_paths cp ON cp.path_id = m.path_id "
+            "JOIN courses c ON c.id = cp.course_id "
+            "WHERE u.url = ? ORDER BY c.id", (canonical_unit_url(unit_url),)
+        )]
+
+    def units(self, path_index=None, status=None):
+        """List units, optionally filtered by learning path index and status"""
+        query = (
+            "SELECT u.*, m.title AS module_title, m.module_index, lp.path_index, lp.title AS path_title "
+            "FROM units u JOIN modules m ON u.module_id = m.id "
+            "JOIN learning_paths lp ON m.path_id = lp.id WHERE 1=1"
+        )
+        params = []
+        if path_index is not None:
+            query += " AND lp.path_index = ?"
+            params.append(path_index)
+        if status is not None:
+            query += " AND u.status = ?"
+            params.append(status)
+        query += " ORDER BY lp.path_index, m.module_index, u.unit_index"
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def failed_units(self, path_index=None):
+        """List units whose last crawl attempt failed"""
+        return self.units(path_index=path_index, status='failed')
+
+    def stale_translations(self):
+        """List translations whose English source changed after they were made"""
+        query = (
+            "SELECT u.title, u.url, u.local_file, t.local_file AS translation_file, t.status, "
+            "t.source_hash, u.content_hash, t.updated_at "
+            "FROM translations t JOIN units u ON t.unit_id = u.id "
+            "WHERE u.content_hash IS NOT NULL AND (t.source_hash IS NULL OR t.source_hash != u.content_hash) "
+            "ORDER BY u.local_file"
+        )
+        return [dict(row) for row in self.conn.execute(query)]
+
+    def import_structure(self, course_structure, content_dir=Path("content")):
+        """Load a course_structure.json dict into the catalog"""
+        self.set_course(
+            course_structure.get('course_title'),
+            course_structure.get('course_url'),
+            course_structure.get('crawl_timestamp')
+        )
+
+        imported = 0
+        for position, learning_path in enumerate(course_structure.get('learning_paths', []), 1):
+            path_id = self.upsert_learning_path(
+                self.path_index_for(learning_path['url']) if learning_path.get('url') else position,
+                learning_path.get('title', 'Unknown'),
+                learning_path.get('url'),
+                learning_path.get('expected_modules')
+            )
+            for module_index, module in enumerate(learning_path.get('modules', []), 1):
+                module_id = self.upsert_module(path_id, module_index, module.get('title', 'Unknown'))
+                with self.transaction() as conn:
+                    for unit_index, unit in enumerate(module.get('units', []), 1):
+                        if not unit.get('url'):
+                            continue
+                        local_file = unit.get('local_file')
+                        unit_id = self._upsert_unit(
+                            conn, module_id, unit_index, unit.get('title', 'Unknown'), unit['url'], local_file
+                        )
+                        content_hash = file_hash(Path(content_dir) / local_file) if local_file else None
+                        if content_hash:
+                            conn.execute(
+                                "UPDATE units SET status='ok', content_hash=? WHERE id=? AND status='pending'",
+                                (content_hash, unit_id)
+                            )
+                        imported += 1
+        return imported
+
+    def export_structure(self, course_code=None):
+        """Build a course_structure.json compatible dict for one course, or for every crawled path"""
+        if course_code:
+            course = self.conn.execute("SELECT * FROM courses WHERE code = ?", (course_code.lower(),)).fetchone()
+            paths = self.conn.execute(
+                "SELECT lp.* FROM course_paths cp JOIN learning_paths lp ON cp.path_id = lp.id "
+                "WHERE cp.course_id = ? ORDER BY cp.path_order",
+                (course['id'] if course else None,)
+            ).fetchall()
+        else:
+            course = self.conn.execute("SELECT * FROM course WHERE id = 1").fetchone()
+            paths = self.conn.execute("SELECT * FROM learning_paths ORDER BY path_index").fetchall()
+
+        structure = {
+            'course_title': course['title'] if course else None,
+            'course_url': course['url'] if course else None,
+            'crawl_timestamp': course['crawl_timestamp'] if course else None,
+            'total_learning_paths': len(paths),
+            'learning_paths': []
+        }
+
+        for path in paths:
+            modules = self.conn.execute(
+                "SELECT * FROM modules WHERE path_id = ? ORDER BY module_index", (path['id'],)
+            ).fetchall()
+            path_structure = {
+                'title': path['title'],
+                'url': path['url'],
+                'expected_modules': path['expected_modules'],
+                'actual_modules': len(modules),
+                'modules': []
+            }
+            for module in modules:
+                units = self.conn.execute(
+                    "SELECT u.title, u.url, u.local_file FROM module_units mu JOIN units u ON mu.unit_id = u.id "
+                    "WHERE mu.module_id = ? ORDER BY mu.unit_index",
+                    (module['id'],)
+                ).fetchall()
+                path_structure['modules'].append({
+                    'title': module['title'],
+                    'units': [
+                        {'title': unit['title'], 'url': unit['url'], 'local_file': unit['local_file']}
+                        for unit in units
+                    ]
+                })
+            structure['learning_paths'].append(path_structure)
+
+        if not course_code:
+            courses = self.conn.execute("SELECT * FROM courses ORDER BY id").fetchall()
+            if courses:
+                structure['courses'] = [
+                    {
+                        'code': course['code'],
+                        'title': course['title'],
+                        'url': course['url'],
+                        'learning_paths': [
+                            row['url'] for row in self.conn.execute(
+                                "SELECT lp.url FROM course_paths cp JOIN learning_paths lp ON cp.path_id = lp.id "
+                                "WHERE cp.course_id = ? ORDER BY cp.path_order",
+                                (course['id'],)
+                            )
+                        ]
+                    }
+                    for course in courses
+                ]
+
+        return structure
+
+    def export_json(self, json_path=Path("content/course_structure.json"), course_code=None):
+        """Write the catalog (or one course of it) out as course_structure.json for compatibility"""
+        json_path = Path(json_path)
+        atomic_write_text(json_path, json.dumps(self.export_structure(course_code), indent=2, ensure_ascii=False))
+        return json_path
+
+def main():
+    """Main function for catalog maintenance"""
+    catalog = CourseCatalog()
+    structure_file = Path("content/course_structure.json")
+
+    flush_logs()
+    print("AZ-104 Course Catalog")
+    print("=" * 30)
+    print("1. Import course_structure.json")
+    print("2. Export course_structure.json")
+    print("3. List failed units")
+    print("4. List stale translations")
+    print("5. Exit")
+
+    choice = input("\nSelect option (1-5): ").strip()
+
+    if choice == "1":
+        if not structure_file.exists():
+            print("❌ Course structure file not found!")
+        else:
+            with open(structure_file, 'r', encoding='utf-8') as f:
+                imported = catalog.import_structure(json.load(f))
+            print(f"✅ Imported {imported} units into {catalog.db_path}")
+
+    elif choice == "2":
+        print(f"✅ Exported catalog to {catalog.export_json(structure_file)}")
+
+    elif choice == "3":
+        path_filter = input("Learning path number (blank for all): ").strip()
+        path_index = int(path_filter) if path_filter.isdigit() else None
+        failed = catalog.failed_units(path_index)
+        print(f"\n❌ {len(failed)} failed units")
+        for unit in failed:
+            print(f"   - LP{unit['path_index']} / {unit['module_title']} / {unit['title']}: {unit['last_error']}")
+
+    elif choice == "4":
+        stale = catalog.stale_translations()
+        print(f"\n⚠️  {len(stale)} stale translations")
+        for unit in stale:
+            print(f"   - {unit['translation_file']} ({unit['status']})")
+
+    elif choice == "5":
+        print("👋 Goodbye!")
+
+    else:
+        print("❌ Invalid option selected.")
+
+    catalog.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Course discovery over plain HTTP
+Resolves learning paths → modules → units from the Learn catalog API and module
+index pages (no browser), caches the result with a TTL and diffs it against
+course_structure.json
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlparse
+
+import aiohttp
+from bs4 import BeautifulSoup
+from atomic_io import atomic_write_text
+from crawl_log import get_logger
+from retry_queue import CrawlHTTPError, parse_retry_after
+from unit_urls import canonical_unit_url, module_slug, path_key
+
+log = get_logger('discovery')
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+UNIT_SLUG_PATTERN = re.compile(r'^(\d+)-[\w-]+$')
+
+def path_units(path_structure):
+    """Flat list of {'title', 'url'} units of a discovered learning path, in course order"""
+    return [
+        {'title': unit['title'], 'url': unit['url']}
+        for module in path_structure['modules']
+        for unit in module['units']
+    ]
+
+class CourseDiscovery:
+    """Discovers learning path contents without a browser"""
+
+    def __init__(self, base_url="https://learn.microsoft.com", cache_file=Path("content/.discovery_cache.json"),
+                 ttl=24 * 3600, concurrency=8, locale="en-us"):
+        self.base_url = base_url
+        self.cache_file = Path(cache_file)
+        self.ttl = ttl                  # seconds before a cached discovery is refreshed
+        self.concurrency = concurrency
+        self.locale = locale
+        self.semaphore = None
+
+    def read_cache(self):
+        """(paths, discovery time per path) of the cache file; empty when it is missing or unreadable"""
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+        paths = cache.get('paths', {})
+        discovered_at = cache.get('discovered_at', {})
+        if not isinstance(discovered_at, dict):
+            # Older caches stored one time for all their paths
+            discovered_at = {key: discovered_at for key in paths}
+        return paths, discovered_at
+
+    def load_cache(self, path_urls):
+        """Cached learning paths if every requested path is cached and younger than the TTL"""
+        paths, discovered_at = self.read_cache()
+        keys = [path_key(url) for url in path_urls]
+        if not keys or not all(key in paths for key in keys):
+            return None
+        age = time.time() - min(discovered_at.get(key, 0) for key in keys)
+        if age > self.ttl:
+            return None
+        log.info(f"♻️  Using cached discovery from {age / 3600:.1f}h ago: {self.cache_file}")
+        return [paths[key] for key in keys]
+
+    def save_cache(self, discovered_paths):
+        """Add discovered learning paths to the cache (only complete ones, so failures get retried)
+        Paths of other courses already in the cache are kept"""
+        complete = {
+            path_key(path['url']): path for path in discovered_paths
+            if path['modules'] and not any(module.get('error') for module in path['modules'])
+        }
+        if not complete:
+            return
+        paths, discovered_at = self.read_cache()
+        now = time.time()
+        paths.update(complete)
+        discovered_at.update({key: now for key in complete})
+        atomic_write_text(self.cache_file, json.dumps({
+            'discovered_at': discovered_at,
+            'paths': paths
+        }, indent=2, ensure_ascii=False))
+
+    async def fetch_text(self, session, url):
+        """GET a page or API response as text"""
+        async with self.semaphore:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise CrawlHTTPError(url, response.status, parse_retry_after(response.headers.get('Retry-After')))
+                return await response.text()
+
+    async def fetch_catalog(self, session):
+        """Learning paths (keyed by URL), modules and unit titles (keyed by uid) from the Learn catalog API"""
+        url = f"{self.base_url}/api/catalog/?locale={self.locale}&type=learningPaths,modules,units"
+        catalog = json.loads(await self.fetch_text(session, url))
+        return {
+            'paths': {path_key(path['url']): path for path in catalog.get('learningPaths', [])},
+            'modules': {module['uid']: module for module in catalog.get('modules', [])},
+            'units': {unit['uid']: unit for unit in catalog.get('units', [])}
+        }
+
+    async def modules_from_path_page(self, session, path_url):
+        """Modules linked from a learning path page, used when the catalog API has no entry"""
+        soup = BeautifulSoup(await self.fetch_text(session, path_url), 'html.parser')
+        modules = {}
+        for link in soup.find_all('a', href=True):
+            absolute = urljoin(path_url, link['href'])
+            slug = module_slug(absolute)
+            parts = urlparse(absolute).path.strip('/').split('/')
+            # Only links to the module itself, not to one of its units
+            if slug and parts[-1] == slug and slug not in modules:
+                modules[slug] = {
+                    'title': link.get_text(" ", strip=True) or slug.replace('-', ' ').title(),
+                    'url': f"{self.base_url}/{self.locale}/training/modules/{slug}/",
+                    'unit_uids': []
+                }
+        return list(modules.values())
+
+    async def units_from_module_page(self, session, module_url):
+        """Units listed on a module's index page, in unit order"""
+        soup = BeautifulSoup(await self.fetch_text(session, module_url), 'html.parser')
+        slug = module_slug(module_url)
+        units = {}  # canonical url -> (unit number, title)
+        for link in soup.find_all('a', href=True):
+            absolute = urljoin(module_url, link['href'])
+            parts = urlparse(absolute).path.strip('/').split('/')
+            match = UNIT_SLUG_PATTERN.match(parts[-1])
+            if not match or len(parts) < 2 or parts[-2] != slug:
+                continue
+            url = canonical_unit_url(absolute)
+            title = link.get_text(" ", strip=True)
+            if url not in units or (title and not units[url][1]):
+                units[url] = (int(match.group(1)), title)
+        return [
+            {'title': title or url.rstrip('/').rsplit('/', 1)[-1], 'url': url}
+            for url, (_number, title) in sorted(units.items(), key=lambda item: item[1][0])
+        ]
+
+    async def discover_module(self, session, module, catalog):
+        """Fill in a module's units; catalog titles win when the unit counts line up"""
+        try:
+            units = await self.units_from_module_page(session, module['url'])
+        except Exception as e:
+            log.warning(f"⚠️  Could not list units of {module['title']}: {e}")
+            return {'title': module['title'], 'url': module['url'], 'units': [], 'error': str(e)}
+
+        if catalog and len(module['unit_uids']) == len(units):
+            for unit, uid in zip(units, module['unit_uids']):
+                catalog_unit = catalog['units'].get(uid)
+                if catalog_unit and catalog_unit.get('title'):
+                    unit['title'] = catalog_unit['title']
+        return {'title': module['title'], 'url': module['url'], 'units': units}
+
+    async def discover_path(self, session, path_url, catalog):
+        """Resolve one learning path to its modules and units"""
+        catalog_path = catalog['paths'].get(path_key(path_url)) if catalog else None
+        if catalog_path:
+            title = catalog_path['title']
+            modules = []
+            for uid in catalog_path.get('modules', []):
+                module = catalog['modules'].get(uid)
+                if module:
+                    modules.append({
+                        'title': module['title'],
+                        # Catalog URLs always point at learn.microsoft.com; keep requests on base_url
+                        'url': canonical_unit_url(urljoin(self.base_url, urlparse(module['url']).path)),
+                        'unit_uids': module.get('units', [])
+                    })
+        else:
+            title = None
+            modules = await self.modules_from_path_page(session, path_url)
+
+        discovered = await asyncio.gather(*[self.discover_module(session, module, catalog) for module in modules])
+        units = sum(len(module['units']) for module in discovered)
+        log.info(f"🧭 {title or path_url}: {len(discovered)} modules, {units} units")
+        return {'title': title, 'url': path_url, 'modules': list(discovered)}
+
+    async def discover(self, path_urls, refresh=False):
+        """Discover every learning path in parallel, using the cache when it is fresh"""
+        path_urls = [urljoin(self.base_url, url) for url in path_urls]
+        if not refresh:
+            cached = self.load_cache(path_urls)
+            if cached is not None:
+                return cached
+
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=60)
+        async with aiohttp.ClientSession(headers={'User-Agent': USER_AGENT}, timeout=timeout) as session:
+            try:
+                catalog = await self.fetch_catalog(session)
+            except Exception as e:
+                log.warning(f"⚠️  Catalog API unavailable ({e}), reading learning path pages instead")
+                catalog = None
+            paths = await asyncio.gather(*[self.discover_path(session, url, catalog) for url in path_urls])
+
+        self.save_cache(paths)
+        return list(paths)
+
+def diff_structure(discovered_paths, course_structure):
+    """Units added or removed compared with course_structure.json, matched by canonical URL"""
+    discovered_keys = {path_key(path['url']) for path in discovered_paths}
+    known = {}
+    for learning_path in course_structure.get('learning_paths', []):
+        if path_key(learning_path.get('url', '')) not in discovered_keys:
+            continue
+        for module in learning_path.get('modules', []):
+            for unit in module.get('units', []):
+                known[canonical_unit_url(unit['url'])] = {'path': learning_path['title'], 'title': unit['title']}
+
+    found = {}
+    for path in discovered_paths:
+        for unit in path_units(path):
+            found[unit['url']] = {'path': path['title'] or path['url'], 'title': unit['title']}
+
+    return {
+        'added': [dict(url=url, **found[url]) for url in found if url not in known],
+        'removed': [dict(url=url, **known[url]) for url in known if url not in found]
+    }
+
+def print_diff(diff):
+    """Print added and removed units"""
+    if not diff['added'] and not diff['removed']:
+        log.info("✅ course_structure.json matches the discovered course")
+        return
+    for unit in diff['added']:
+        log.info(f"➕ {unit['path']} / {unit['title']}: {unit['url']}")
+    for unit in diff['removed']:
+        log.info(f"➖ {unit['path']} / {unit['title']}: {unit['url']}")
+    log.info(f"📊 {len(diff['added'])} added, {len(diff['removed'])} removed")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Discover AZ-104 units over HTTP and diff against course_structure.json")
+    parser.add_argument('--structure', default="content/course_structure.json")
+    parser.add_argument('--refresh', action='store_true', help="ignore the discovery cache")
+    parser.add_argument('--ttl', type=float, default=24, help="cache lifetime in hours")
+    args = parser.parse_args()
+
+    structure_file = Path(args.structure)
+    if not structure_file.exists():
+        log.error(f"❌ Course structure file not found: {structure_file}")
+        return
+    with open(structure_file, 'r', encoding='utf-8') as f:
+        course_structure = json.load(f)
+
+    discovery = CourseDiscovery(ttl=args.ttl * 3600)
+    path_urls = [learning_path['url'] for learning_path in course_structure.get('learning_paths', [])]
+    discovered = await discovery.discover(path_urls, refresh=args.refresh)
+    print_diff(diff_structure(discovered, course_structure))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Course manifest for the Learn crawlers
+Courses (code, title, URL and learning paths) are data in courses.json, so one
+run can crawl several related courses that share modules, units and images
+"""
+
+import json
+from pathlib import Path
+from unit_urls import path_key
+
+DEFAULT_MANIFEST = Path(__file__).resolve().parent.parent / "courses.json"
+
+def load_manifest(manifest_file=DEFAULT_MANIFEST):
+    """Base URL and courses from a manifest file, checked for the fields the crawler needs"""
+    with open(manifest_file, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    codes = set()
+    for course in manifest.get('courses', []):
+        for field in ('code', 'title', 'url', 'learning_paths'):
+            if not course.get(field):
+                raise ValueError(f"{manifest_file}: course {course.get('code', '?')} has no {field}")
+        if course['code'].lower() in codes:
+            raise ValueError(f"{manifest_file}: course {course['code']} is listed twice")
+        codes.add(course['code'].lower())
+
+        for path_info in course['learning_paths']:
+            if not path_info.get('title') or not path_info.get('url'):
+                raise ValueError(f"{manifest_file}: course {course['code']} has a learning path without title or url")
+            # Unknown module counts are fine; the crawler only warns when a known count differs
+            path_info.setdefault('expected_modules', None)
+
+    manifest.setdefault('base_url', "https://learn.microsoft.com")
+    manifest.setdefault('courses', [])
+    return manifest
+
+def select_courses(courses, codes=None):
+    """Courses with the given codes in the given order, or the first course when none are given"""
+    if not codes:
+        return courses[:1]
+    by_code = {course['code'].lower(): course for course in courses}
+    unknown = [code for code in codes if code.lower() not in by_code]
+    if unknown:
+        raise ValueError(f"Unknown course {', '.join(unknown)} (manifest has {', '.join(sorted(by_code))})")
+    return [by_code[code.lower()] for code in dict.fromkeys(code.lower() for code in codes)]
+
+def unique_paths(courses):
+    """Learning paths of the given courses, each path shared between courses listed once"""
+    paths = {}
+    for course in courses:
+        for path_info in course['learning_paths']:
+            paths.setdefault(path_key(path_info['url']), path_info)
+    return list(paths.values())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Checkpoints for resumable AZ-104 course crawls
+Records discovered learning path structure and completed units on disk
+"""
+
+import json
+import time
+from pathlib import Path
+from atomic_io import atomic_write_text
+from crawl_log import get_logger
+from unit_urls import canonical_unit_url
+
+log = get_logger('checkpoint')
+
+class CrawlCheckpoint:
+    """Periodically persisted record of crawl progress"""
+
+    def __init__(self, checkpoint_file=Path("content/.crawl_checkpoint.json"), save_every=5, save_interval=30):
+        self.checkpoint_file = Path(checkpoint_file)
+        self.save_every = save_every          # units between saves
+        self.save_interval = save_interval    # seconds between saves
+        self.unsaved_changes = 0
+        self.last_saved = time.time()
+        self.state = self._empty_state()
+
+    def _empty_state(self):
+        """Fresh checkpoint state"""
+        return {
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'updated_at': None,
+            'learning_paths': {},   # path url -> {'units': [...]}
+            'completed_units': {}   # canonical unit url -> local file relative to the content dir
+        }
+
+    def load(self):
+        """Load an existing checkpoint, returning True if one was found"""
+        if not self.checkpoint_file.exists():
+            return False
+        try:
+            with open(self.checkpoint_file, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning(f"⚠️  Could not read checkpoint {self.checkpoint_file}: {e}")
+            self.state = self._empty_state()
+            return False
+        # Checkpoints from before URLs were canonicalized
+        self.state['completed_units'] = {
+            canonical_unit_url(url): local_file for url, local_file in self.state['completed_units'].items()
+        }
+        return True
+
+    def reset(self):
+        """Discard any previous progress"""
+        self.state = self._empty_state()
+        if self.checkpoint_file.exists():
+            self.checkpoint_file.unlink()
+
+    def save(self, force=False):
+        """Write the checkpoint if enough work or time has accumulated"""
+        if not force and self.unsaved_changes < self.save_every and time.time() - self.last_saved < self.save_interval:
+            return False
+        self.state['updated_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        atomic_write_text(self.checkpoint_file, json.dumps(self.state, indent=2, ensure_ascii=False))
+        self.unsaved_changes = 0
+        self.last_saved = time.time()
+        return True
+
+    def path_units(self, path_url):
+        """Units discovered for a learning path in an earlier run, or None"""
+        path_state = self.state['learning_paths'].get(path_url)
+        return path_state['units'] if path_state else None
+
+    def set_path_units(self, path_url, units):
+        """Remember the units discovered for a learning path"""
+        self.state['learning_paths'][path_url] = {'units': units}
+        self.save(force=True)
+
+    def is_unit_done(self, unit_url, output_dir=Path("content")):
+        """Check whether a unit was completed and its file is still on disk"""
+        local_file = self.unit_file(unit_url)
+        return bool(local_file) and (Path(output_dir) / local_file).exists()
+
+    def unit_file(self, unit_url):
+        """Local file a completed unit was saved to (shared by every path that includes it), or None"""
+        return self.state['completed_units'].get(canonical_unit_url(unit_url))
+
+    def mark_unit_done(self, unit_url, local_file):
+        """Record a completed unit and checkpoint periodically"""
+        self.state['completed_units'][canonical_unit_url(unit_url)] = local_file
+        self.unsaved_changes += 1
+        self.save()
+
+    @property
+    def completed_count(self):
+        """Number of completed units"""
+        return len(self.state['completed_units'])
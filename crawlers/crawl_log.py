@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Structured, non-blocking logging for AZ-104 crawlers
+Crawlers log through a QueueHandler; a listener thread formats and writes the
+records, so slow terminals and pipes never stall the event loop. Output is the
+familiar emoji status lines, JSON lines (unit, stage, duration, attempt) or a
+compact live progress line. Per-image events are sampled
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+ROOT_LOGGER = 'az104'
+
+# Structured fields copied into JSON lines when a record carries them (via extra=)
+FIELDS = ('unit', 'stage', 'duration', 'attempt', 'status', 'url', 'worker', 'run_id')
+
+# Settings are also read from the environment, so worker processes log like their coordinator
+ENV_LEVEL = 'AZ104_LOG_LEVEL'
+ENV_JSON = 'AZ104_LOG_JSON'
+ENV_PROGRESS = 'AZ104_LOG_PROGRESS'
+ENV_SAMPLE = 'AZ104_LOG_SAMPLE'
+
+_state = {'listener': None, 'handler': None}
+
+def get_logger(name):
+    """Logger under the az104 hierarchy, configured from the environment on first use"""
+    if _state['listener'] is None:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+def log_summary(log, succeeded, failed):
+    """One summary line for a batch of units, plus an error line when any of them failed"""
+    log.info(f"✅ {succeeded} succeeded, {failed} failed")
+    if failed:
+        log.error(f"❌ Failed: {failed} units")
+
+def has_text(record):
+    """False for separator lines (=====) that only make sense on a terminal"""
+    return any(char.isalnum() for char in record.getMessage())
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and structured fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'msg': record.getMessage().strip()
+        }
+        for field in FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class SampleFilter(logging.Filter):
+    """Let through one in every N INFO records per sample key (extra={'sample': 'image'}); warnings always pass"""
+
+    def __init__(self, every=20):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen = {}
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        self.seen[key] = self.seen.get(key, 0) + 1
+        return self.seen[key] % self.every == 1 or self.every == 1
+
+class ProgressDisplay(logging.Handler):
+    """One self-updating status line; warnings and errors are printed above it"""
+
+    def __init__(self, counters, stream=None, interval=0.2):
+        super().__init__()
+        self.counters = counters  # callable returning a dict of counter name -> value
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self.started = time.perf_counter()
+        self.last_draw = 0.0
+        self.last_message = ''
+        self.drawn = False
+
+    def status_line(self):
+        counters = self.counters()
+        elapsed = time.perf_counter() - self.started
+        done = counters.get('units_ok', 0)
+        images = sum(counters.get(name, 0) for name in ('images_downloaded', 'images_captured', 'images_cached'))
+        line = (f"⏳ {elapsed:6.0f}s | units ✅ {done:g} ❌ {counters.get('units_failed', 0):g} "
+                f"({done / elapsed if elapsed else 0:.2f}/s) | images {images:g} ❌ {counters.get('images_failed', 0):g}")
+        if self.last_message:
+            line = f"{line} | {self.last_message}"
+        return line[:shutil.get_terminal_size((120, 24)).columns - 1]
+
+    def clear(self):
+        if self.drawn:
+            self.stream.write("\r\x1b[K")
+            self.drawn = False
+
+    def emit(self, record):
+        try:
+            message = record.getMessage().strip()
+            if record.levelno >= logging.WARNING:
+                self.clear()
+                self.stream.write(message + "\n")
+            elif has_text(record):
+                self.last_message = message.splitlines()[0]
+            now = time.perf_counter()
+            if record.levelno >= logging.WARNING or now - self.last_draw >= self.interval:
+                self.stream.write("\r\x1b[K" + self.status_line())
+                self.stream.flush()
+                self.drawn = True
+                self.last_draw = now
+        except Exception:
+            self.handleError(record)
+
+class FlushRequest:
+    """Queue marker that is acknowledged once every earlier record has been written"""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+class CrawlLogListener(QueueListener):
+    """QueueListener that acknowledges flush requests in order with the records"""
+
+    def handle(self, record):
+        if isinstance(record, FlushRequest):
+            for handler in self.handlers:
+                if isinstance(handler, ProgressDisplay):
+                    handler.clear()
+                handler.flush()
+            record.event.set()
+            return
+        super().handle(record)
+
+def flush_logs(timeout=5):
+    """Wait until queued records are written, e.g. before printing a menu and calling input()"""
+    listener = _state['listener']
+    if listener is None:
+        return
+    request = FlushRequest()
+    listener.queue.put(request)
+    request.event.wait(timeout)
+
+def stop_logging():
+    """Write everything still queued and stop the listener thread"""
+    listener = _state['listener']
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        if isinstance(handler, ProgressDisplay):
+            handler.clear()
+            handler.stream.write(handler.status_line() + "\n")
+        handler.close()
+    logging.getLogger(ROOT_LOGGER).removeHandler(_state['handler'])
+    _state.update(listener=None, handler=None)
+
+def setup_logging(level=None, json_path=None, progress=None, sample_every=None):
+    """Route az104.* loggers through a queue to the console (plain or progress line) and optional JSON lines
+    json_path '-' writes JSON lines to stdout instead of the console format. Level and JSON path are
+    exported to the environment so worker subprocesses inherit them"""
+    level = (level or os.environ.get(ENV_LEVEL) or 'INFO').upper()
+    json_path = json_path or os.environ.get(ENV_JSON)
+    if progress is None:
+        progress = os.environ.get(ENV_PROGRESS) == '1'
+    sample_every = sample_every or int(os.environ.get(ENV_SAMPLE) or 20)
+
+    stop_logging()
+    os.environ[ENV_LEVEL] = level
+    if json_path:
+        os.environ[ENV_JSON] = str(json_path)
+
+    handlers = []
+    if json_path == '-':
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(JsonFormatter())
+        console.addFilter(has_text)
+    elif progress and sys.stdout.isatty():
+        # Imported here: instrumentation logs through this module
+        from instrumentation import tracer
+        console = ProgressDisplay(lambda: dict(tracer.counters))
+    else:
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter('%(message)s'))
+    handlers.append(console)
+
+    if json_path and json_path != '-':
+        os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+        json_file = logging.FileHandler(json_path, encoding='utf-8')
+        json_file.setFormatter(JsonFormatter())
+        json_file.addFilter(has_text)
+        handlers.append(json_file)
+
+    # Records are only put on the queue here; formatting and writing happen on the listener thread
+    handler = QueueHandler(queue.SimpleQueue())
+    handler.addFilter(SampleFilter(sample_every))
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel(level)
+    root.propagate = False
+    root.addHandler(handler)
+
+    listener = CrawlLogListener(handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _state.update(listener=listener, handler=handler)
+
+def add_logging_args(parser):
+    """Add --log-level, --log-json and --progress to an argparse parser"""
+    parser.add_argument('--log-level', default=None, choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="default INFO; DEBUG adds per-stage timings")
+    parser.add_argument('--log-json', default=None, metavar='PATH',
+                        help="also write JSON lines to PATH ('-' for JSON on stdout)")
+    parser.add_argument('--progress', action='store_true', help="show a live progress line instead of every status line")
+
+def setup_logging_from_args(args):
+    """setup_logging() with the options added by add_logging_args"""
+    setup_logging(args.log_level, args.log_json, args.progress or None)
+
+atexit.register(stop_logging)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Staged crawl pipeline for AZ-104 crawlers
+Units flow through bounded queues between stages (fetch, assets, parse, write)
+so network waits, parsing and disk writes for different units overlap
+"""
+
+import asyncio
+from bs4 import BeautifulSoup
+from content_rules import prune_soup
+from content_validation import validate_content
+from crawl_log import get_logger
+from unit_export import build_document
+
+log = get_logger('pipeline')
+
+class Stage:
+    """One pipeline stage: an async handler run by a fixed number of workers"""
+
+    def __init__(self, name, handler, workers=1, queue_size=8):
+        self.name = name
+        self.handler = handler        # async item -> item for the next stage, or None to drop it
+        self.workers = workers
+        self.queue_size = queue_size  # items waiting for this stage before upstream blocks
+
+class Pipeline:
+    """Runs items through stages connected by bounded queues"""
+
+    def __init__(self, stages, on_error=None):
+        self.stages = stages
+        self.on_error = on_error      # called as on_error(stage_name, item, exception)
+        self.queues = []
+        self.stats = {}
+
+    async def _worker(self, index, stage):
+        """Take items from this stage's queue, handle them and pass results downstream"""
+        inbox = self.queues[index]
+        outbox = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        stats = self.stats[stage.name]
+
+        while True:
+            item = await inbox.get()
+            try:
+                result = await stage.handler(item)
+            except Exception as e:
+                stats['errors'] += 1
+                result = None
+                if self.on_error:
+                    self.on_error(stage.name, item, e)
+
+            if result is None:
+                stats['dropped'] += 1
+            else:
+                stats['done'] += 1
+                if outbox is not None:
+                    # Blocks while the next stage is full, which throttles this one (backpressure)
+                    await outbox.put(result)
+                    self.stats[self.stages[index + 1].name]['max_queued'] = max(
+                        self.stats[self.stages[index + 1].name]['max_queued'], outbox.qsize()
+                    )
+            inbox.task_done()
+
+    async def run(self, items):
+        """Feed items into the first stage and wait until every stage has drained"""
+        self.queues = [asyncio.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        self.stats = {stage.name: {'done': 0, 'dropped': 0, 'errors': 0, 'max_queued': 0} for stage in self.stages}
+        workers = [
+            asyncio.create_task(self._worker(index, stage))
+            for index, stage in enumerate(self.stages)
+            for _ in range(stage.workers)
+        ]
+
+        try:
+            for item in items:
+                await self.queues[0].put(item)
+            # A stage is finished once its queue is drained and everything upstream has finished
+            for queue in self.queues:
+                await queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        return self.stats
+
+    def print_stats(self):
+        """Print per-stage throughput and peak queue depth"""
+        for stage in self.stages:
+            stats = self.stats.get(stage.name)
+            if stats:
+                log.info(
+                    f"   {stage.name:<8} workers={stage.workers} done={stats['done']} "
+                    f"dropped={stats['dropped']} errors={stats['errors']} max_queued={stats['max_queued']}"
+                )
+
+def render_fragment(html, selectors, image_paths, unit):
+    """Parse, prune and validate a unit fragment, point its images at their saved copies and
+    pretty-print it (runs in a worker process); the document is built from the same soup
+    Returns (html, structured document, None), or (None, None, the content problem found)"""
+    soup = BeautifulSoup(html, 'html.parser')
+    if selectors:
+        prune_soup(soup, selectors)
+    problem = validate_content(soup, unit['page_title'])
+    if problem:
+        return None, None, problem
+    for img in soup.find_all('img'):
+        src = img.get('src')
+        if not src:
+            continue
+        img['src'] = image_paths.get(src, src)
+        if not img.get('alt'):
+            img['alt'] = "Course content image"
+    return soup.prettify(), build_document(soup, unit), None
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Local preview server with watch mode
+Builds the site once, then watches the unit pages, assets and index.html: each
+save re-runs only what the changed files affect (cleaning, templates, the site
+copy), link-checks the changed pages and reloads open browser tabs
+"""
+
+import argparse
+import asyncio
+import functools
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from crawl_log import add_logging_args, get_logger, setup_logging_from_args
+from file_watcher import watch
+from link_checker import present_files, scan_files
+from workflow import Workflow, build_steps
+
+log = get_logger('serve')
+
+# Pipeline steps re-run on save; discover, crawl and the full asset check only run in `az104.py build`
+WATCH_STEPS = ['clean', 'templates', 'site']
+
+LIVE_RELOAD_PATH = '/__livereload'
+LIVE_RELOAD_SCRIPT = (
+    '<script>new EventSource("/__livereload").onmessage = function () { location.reload(); };</script>'
+)
+
+# Editors often save in several writes; events this close together are one rebuild
+DEBOUNCE_SECONDS = 0.05
+
+class ReloadBroadcaster:
+    """Wakes every live-reload connection when the site changes"""
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.version = 0
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        """The current version once it differs from version, or after timeout seconds"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    """Serves the site directory uncached, with the live-reload script added to every page"""
+
+    broadcaster = None
+
+    def end_headers(self):
+        self.send_header('Cache-Control', 'no-store')
+        super().end_headers()
+
+    def do_GET(self):
+        if self.path == LIVE_RELOAD_PATH:
+            return self.live_reload()
+        path = Path(self.translate_path(self.path))
+        if path.is_dir() and self.path.split('?')[0].endswith('/'):
+            path = path / "index.html"
+        if path.suffix != '.html' or not path.is_file():
+            return super().do_GET()
+
+        body = path.read_bytes()
+        end = body.rfind(b'</body>')
+        script = LIVE_RELOAD_SCRIPT.encode()
+        body = body[:end] + script + body[end:] if end >= 0 else body + script
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def live_reload(self):
+        """Server-sent events: 'reload' after every rebuild that changed the site, a ping otherwise"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        version = self.broadcaster.version
+        try:
+            while True:
+                current = self.broadcaster.wait(version, 15)
+                self.wfile.write(b"data: reload\n\n" if current != version else b": ping\n\n")
+                self.wfile.flush()
+                version = current
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        log.debug(f"🌐 {self.address_string()} {format % args}")
+
+class SiteWatcher:
+    """Rebuilds what saved files affect and tells the browser to reload"""
+
+    def __init__(self, workflow, broadcaster, poll=False):
+        self.workflow = workflow
+        self.broadcaster = broadcaster
+        self.poll = poll
+        self.content_dir = workflow.content_dir
+
+    def roots(self):
+        for language in ('english', 'vietnamese', 'assets'):
+            (self.content_dir / language).mkdir(parents=True, exist_ok=True)
+        return [
+            self.content_dir / "english",
+            self.content_dir / "vietnamese",
+            self.content_dir / "assets",
+            self.content_dir / "course_structure.json",
+            Path("index.html")
+        ]
+
+    def check_links(self, pages):
+        """Log broken local references of the changed pages"""
+        relative = [str(page.relative_to(self.content_dir)) for page in pages]
+        if not relative:
+            return
+        present = present_files(self.content_dir)
+        for result in scan_files(self.content_dir, relative):
+            if result['error']:
+                log.warning(f"⚠️  {result['file']}: unreadable ({result['error']})")
+            for ref in result['local']:
+                if ref['target'] not in present:
+                    log.warning(f"❌ {result['file']}: broken <{ref['tag']} {ref['attribute']}> {ref['value']}")
+
+    def rebuild(self, changed):
+        """Bring the site up to date; reload browsers if the site changed"""
+        started = time.perf_counter()
+        results = asyncio.run(self.workflow.run(WATCH_STEPS, only=True))
+        pages = [path for path in changed if path.suffix == '.html' and path.is_file()
+                 and path.is_relative_to(self.content_dir)]
+        self.check_links(pages)
+        if results.get('site') == 'ran':
+            self.broadcaster.notify()
+            log.info(f"🔁 {len(changed)} changed files rebuilt in {time.perf_counter() - started:.2f}s",
+                     extra={'duration': round(time.perf_counter() - started, 3)})
+
+    def run(self):
+        watcher = watch(self.roots(), self.poll)
+        log.info(f"👀 Watching {self.content_dir} and index.html ({type(watcher).__name__})")
+        try:
+            while True:
+                changed = watcher.changes()
+                changed |= watcher.changes(DEBOUNCE_SECONDS)
+                if changed:
+                    self.rebuild(changed)
+        finally:
+            watcher.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the site locally and rebuild it on every save")
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--site-dir', default="site")
+    parser.add_argument('--poll', action='store_true', help="poll for changes instead of using inotify")
+    add_logging_args(parser)
+    args = parser.parse_args()
+    setup_logging_from_args(args)
+
+    content_dir = Path("content")
+    site_dir = Path(args.site_dir)
+    workflow = Workflow(build_steps(content_dir, site_dir), content_dir, options={'site_dir': site_dir})
+    broadcaster = ReloadBroadcaster()
+    site_watcher = SiteWatcher(workflow, broadcaster, args.poll)
+    site_watcher.rebuild(set())
+
+    PreviewHandler.broadcaster = broadcaster
+    server = ThreadingHTTPServer((args.host, args.port), functools.partial(PreviewHandler, directory=str(site_dir)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    log.info(f"🌐 Serving {site_dir}/ at http://{args.host}:{server.server_port}/ (Ctrl+C to stop)")
+
+    try:
+        site_watcher.run()
+    except KeyboardInterrupt:
+        log.info("\n👋 Stopped")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+File change watcher for the content tree
+Uses Linux inotify through ctypes (no extra packages) and falls back to
+polling modification times elsewhere or when inotify is unavailable
+"""
+
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+def ignored(name):
+    """Editor swap files, atomic-write temporaries and dot files never trigger a rebuild"""
+    return name.startswith('.') or name.endswith(('.tmp', '.swp', '~'))
+
+class InotifyWatcher:
+    """Recursive inotify watch of directories (and single files); changes() returns the paths written, moved or deleted"""
+
+    def __init__(self, roots):
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC | os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}  # watch descriptor -> directory
+        self.single_files = {}  # watch descriptor -> names watched in a directory that is not watched whole
+        self.roots = [Path(root) for root in roots]
+        for root in self.roots:
+            if root.is_dir():
+                self.add_tree(root)
+            else:
+                self.add_file(root)
+
+    def add_tree(self, directory):
+        """Watch a directory and every directory below it"""
+        for current, dirs, _files in os.walk(directory):
+            dirs[:] = [name for name in dirs if not ignored(name)]
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd >= 0:
+                self.directories[wd] = Path(current)
+
+    def add_file(self, path):
+        """Watch one file through its directory"""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path.parent), WATCH_MASK)
+        if wd >= 0:
+            self.directories[wd] = path.parent
+            self.single_files.setdefault(wd, set()).add(path.name)
+
+    def changes(self, timeout=None):
+        """Paths changed since the last call, waiting up to timeout seconds for the first one"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; report every watched root so callers rescan
+                    changed.update(self.roots)
+                    continue
+                directory = self.directories.get(wd)
+                if mask & IN_IGNORED:
+                    self.directories.pop(wd, None)
+                    continue
+                if directory is None or not name or ignored(os.fsdecode(name)):
+                    continue
+                if wd in self.single_files and os.fsdecode(name) not in self.single_files[wd]:
+                    continue
+                path = directory / os.fsdecode(name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # New directories are watched, and files already copied into them reported
+                        self.add_tree(path)
+                        changed.update(p for p in path.rglob('*') if p.is_file())
+                    continue
+                changed.add(path)
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Compares modification times of every file under the roots; used where inotify is unavailable"""
+
+    def __init__(self, roots, interval=0.3):
+        self.roots = [Path(root) for root in roots]
+        self.interval = interval
+        self.state = self.scan()
+
+    def scan(self):
+        state = {}
+        for root in self.roots:
+            if root.is_file():
+                stat = root.stat()
+                state[root] = (stat.st_mtime_ns, stat.st_size)
+            for current, dirs, files in os.walk(root):
+                dirs[:] = [name for name in dirs if not ignored(name)]
+                for name in files:
+                    if not ignored(name):
+                        path = Path(current) / name
+                        try:
+                            stat = path.stat()
+                        except FileNotFoundError:
+                            continue
+                        state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def changes(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.scan()
+            changed = {path for path in current.keys() | self.state.keys() if current.get(path) != self.state.get(path)}
+            self.state = current
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+            time.sleep(self.interval)
+
+    def close(self):
+        pass
+
+def watch(roots, poll=False):
+    """InotifyWatcher on Linux, PollingWatcher otherwise or when asked to poll"""
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(roots)
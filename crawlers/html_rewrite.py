@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Bulk HTML rewrite engine for maintenance fixes on saved unit pages
+Every selected transform runs in one tokenizer pass per file. Transforms don't
+re-serialize the document: they replace spans of the original text, so bytes
+they don't touch stay exactly as they were and files whose bytes don't change
+are never written. Files are processed in a process pool; --dry-run reports
+what would change (with --diff, as unified diffs)
+"""
+
+import argparse
+import difflib
+import html
+import os
+import sys
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from atomic_io import atomic_write_bytes
+from link_checker import LANGUAGE_DIRS, page_files, present_files
+
+# Files are rewritten in chunks of this many per worker task
+CHUNK_SIZE = 32
+
+# Below this many files a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 64
+
+TRANSFORMS = {}  # name -> Transform subclass
+
+def register(transform_class):
+    """Class decorator making a transform available by its name"""
+    TRANSFORMS[transform_class.name] = transform_class
+    return transform_class
+
+class Transform:
+    """Base class for rewrites; a fresh instance sees the tokens of one file in order
+    Offsets index the original text; call rewriter.replace(start, end, text) to change a span"""
+
+    name = ''
+    description = ''
+
+    def start_tag(self, rewriter, tag, attrs, start, end):
+        pass
+
+    def end_tag(self, rewriter, tag, start):
+        pass
+
+    def data(self, rewriter, text, start):
+        pass
+
+class Rewriter(HTMLParser):
+    """Tokenizes one document and collects the span replacements its transforms ask for"""
+
+    def __init__(self, text, transforms):
+        super().__init__(convert_charrefs=False)
+        self.text = text
+        self.transforms = transforms
+        self.edits = []  # (start, end, replacement, transform name)
+        self.line_starts = [0]
+        position = text.find('\n')
+        while position >= 0:
+            self.line_starts.append(position + 1)
+            position = text.find('\n', position + 1)
+
+    def position(self):
+        """Offset in the original text of the token being handled"""
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def replace(self, start, end, replacement, transform):
+        if self.text[start:end] != replacement:
+            self.edits.append((start, end, replacement, transform.name))
+
+    def handle_starttag(self, tag, attrs):
+        start = self.position()
+        end = start + len(self.get_starttag_text())
+        for transform in self.transforms:
+            transform.start_tag(self, tag, attrs, start, end)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        start = self.position()
+        for transform in self.transforms:
+            transform.end_tag(self, tag, start)
+
+    def handle_data(self, data):
+        start = self.position()
+        for transform in self.transforms:
+            transform.data(self, data, start)
+
+    def rewritten(self):
+        """(new text, edits per transform); when two edits overlap the first one wins"""
+        self.feed(self.text)
+        self.close()
+        parts, counts, position = [], {}, 0
+        for start, end, replacement, name in sorted(self.edits, key=lambda edit: edit[0]):
+            if start < position:
+                continue
+            parts.append(self.text[position:start])
+            parts.append(replacement)
+            position = end
+            counts[name] = counts.get(name, 0) + 1
+        parts.append(self.text[position:])
+        return ''.join(parts), counts
+
+@register
+class SourceLinkText(Transform):
+    """Show the unit URL as the text of the Source link in the course information box"""
+
+    name = 'source-link-text'
+    description = "make the Source: link text the unit URL"
+
+    def __init__(self):
+        self.div_depth = 0      # nesting depth inside <div class="source-info">, 0 outside
+        self.paragraph = None   # text of the current <p> in the box
+        self.link = None        # (href, offset where its text starts) of the Source link
+        self.done = False
+
+    def start_tag(self, rewriter, tag, attrs, start, end):
+        if self.done:
+            return
+        if tag == 'div':
+            if self.div_depth:
+                self.div_depth += 1
+            elif 'source-info' in (dict(attrs).get('class') or '').split():
+                self.div_depth = 1
+        elif tag == 'p' and self.div_depth:
+            self.paragraph = ''
+        elif tag == 'a' and self.paragraph is not None and 'Source:' in self.paragraph:
+            href = dict(attrs).get('href')
+            if href:
+                self.link = (href, end)
+
+    def end_tag(self, rewriter, tag, start):
+        if self.done:
+            return
+        if tag == 'a' and self.link:
+            href, text_start = self.link
+            if html.unescape(rewriter.text[text_start:start]) != href:
+                rewriter.replace(text_start, start, html.escape(href, quote=False), self)
+            self.link = None
+            self.done = True
+        elif tag == 'p':
+            self.paragraph = None
+        elif tag == 'div' and self.div_depth:
+            self.div_depth -= 1
+
+    def data(self, rewriter, text, start):
+        if self.paragraph is not None:
+            self.paragraph += text
+
+@register
+class NoopenerLinks(Transform):
+    """Add rel="noopener" to links that open a new tab"""
+
+    name = 'noopener'
+    description = 'add rel="noopener" to target="_blank" links'
+
+    def start_tag(self, rewriter, tag, attrs, start, end):
+        attributes = dict(attrs)
+        if tag != 'a' or attributes.get('target') != '_blank' or 'rel' in attributes:
+            return
+        tag_text = rewriter.text[start:end]
+        close = len(tag_text) - (2 if tag_text.endswith('/>') else 1)
+        rewriter.replace(start, end, f'{tag_text[:close].rstrip()} rel="noopener"{tag_text[close:]}', self)
+
+def rewrite_text(text, names):
+    """Run the named transforms over one document in a single pass; returns (text, edits per transform)"""
+    return Rewriter(text, [TRANSFORMS[name]() for name in names]).rewritten()
+
+def rewrite_files(content_dir, relative_paths, names, dry_run=False, diff=False):
+    """Rewrite a chunk of pages (runs in a worker process); one result dict per page"""
+    content_dir = Path(content_dir)
+    results = []
+    for relative_path in relative_paths:
+        path = content_dir / relative_path
+        result = {'file': relative_path, 'changed': False, 'edits': {}, 'diff': None, 'error': None}
+        try:
+            original = path.read_bytes()
+            # surrogateescape round-trips bytes that are not valid UTF-8 unchanged
+            text = original.decode('utf-8', errors='surrogateescape')
+            new_text, result['edits'] = rewrite_text(text, names)
+            data = new_text.encode('utf-8', errors='surrogateescape')
+            result['changed'] = data != original
+            if result['changed'] and diff:
+                result['diff'] = ''.join(difflib.unified_diff(
+                    text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                    f"a/{relative_path}", f"b/{relative_path}", n=1
+                ))
+            if result['changed'] and not dry_run:
+                atomic_write_bytes(path, data)
+        except Exception as e:
+            result['error'] = str(e)
+        results.append(result)
+    return results
+
+class BulkRewriter:
+    """Applies registered transforms to every unit page of some languages, in parallel"""
+
+    def __init__(self, names, content_dir=Path("content"), workers=None, dry_run=False, diff=False):
+        unknown = [name for name in names if name not in TRANSFORMS]
+        if unknown:
+            raise ValueError(f"Unknown transform {', '.join(unknown)} (available: {', '.join(TRANSFORMS)})")
+        self.names = list(names)
+        self.content_dir = Path(content_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.dry_run = dry_run
+        self.diff = diff
+
+    def run(self, languages=LANGUAGE_DIRS):
+        """Rewrite every page; returns the report dict"""
+        start = time.perf_counter()
+        pages = page_files(present_files(self.content_dir), languages)
+        chunks = [pages[i:i + CHUNK_SIZE] for i in range(0, len(pages), CHUNK_SIZE)]
+        args = (self.names, self.dry_run, self.diff)
+        if self.workers == 1 or len(pages) < MIN_FILES_FOR_POOL:
+            results = [result for chunk in chunks for result in rewrite_files(self.content_dir, chunk, *args)]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(rewrite_files, self.content_dir, chunk, *args) for chunk in chunks]
+                results = [result for future in futures for result in future.result()]
+
+        edits = {name: 0 for name in self.names}
+        for result in results:
+            for name, count in result['edits'].items():
+                edits[name] += count
+        return {
+            'transforms': self.names,
+            'dry_run': self.dry_run,
+            'pages': len(pages),
+            'changed': [result for result in results if result['changed']],
+            'errors': [result for result in results if result['error']],
+            'edits': edits,
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+def print_report(report, show_diff=False):
+    """Print the diff (if collected) and the summary"""
+    for result in report['changed']:
+        if show_diff and result['diff']:
+            print(result['diff'], end='')
+    for result in report['errors']:
+        print(f"❌ {result['file']}: {result['error']}")
+
+    verb = "would change" if report['dry_run'] else "changed"
+    print("\n" + "=" * 60)
+    print(f"📊 {report['pages']} pages scanned in {report['seconds']:.2f}s, {len(report['changed'])} {verb}")
+    for name, count in report['edits'].items():
+        print(f"   {name:<18}{count} edits")
+    if report['dry_run'] and report['changed']:
+        print("🔍 Dry run: nothing was written (--diff shows the changes)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply maintenance rewrites to every saved unit page in one pass")
+    parser.add_argument('transforms', nargs='*', help="transforms to apply (see --list)")
+    parser.add_argument('--list', action='store_true', help="list the available transforms")
+    parser.add_argument('--content-dir', default="content")
+    parser.add_argument('--language', action='append', choices=LANGUAGE_DIRS,
+                        help="only rewrite this language (repeatable; default: all)")
+    parser.add_argument('--dry-run', action='store_true', help="report what would change without writing")
+    parser.add_argument('--diff', action='store_true', help="print unified diffs of the changes")
+    parser.add_argument('--workers', type=int, default=None, help="rewriter processes (default: CPU count)")
+    args = parser.parse_args()
+
+    if args.list or not args.transforms:
+        for name, transform_class in TRANSFORMS.items():
+            print(f"  {name:<18}{transform_class.description}")
+        return
+
+    try:
+        rewriter = BulkRewriter(args.transforms, Path(args.content_dir), args.workers, args.dry_run, args.diff)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    report = rewriter.run(tuple(args.language or LANGUAGE_DIRS))
+    print_report(report, args.diff)
+    sys.exit(1 if report['errors'] else 0)
+
+if __name__ == "__main__":
+    main()
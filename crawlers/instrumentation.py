@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Crawl instrumentation for AZ-104 crawlers
+Records per-unit, per-stage spans and counters and exports them as
+Chrome trace JSON and a Prometheus textfile
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from atomic_io import atomic_write_text
+from crawl_log import get_logger
+
+log = get_logger('metrics')
+
+def percentile(values, q):
+    """Linear-interpolated percentile of a list of numbers (q in 0..100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+class Instrumentation:
+    """Collects stage spans and counters for one crawl run"""
+
+    def __init__(self, metric_prefix="az104_crawl"):
+        self.metric_prefix = metric_prefix
+        self.origin = time.perf_counter()
+        self.spans = []                      # (stage, unit, start, duration, lane, args)
+        self.counters = defaultdict(float)   # counter name -> value
+        self.lanes = {}                      # task/thread id -> small trace lane number
+        self.lock = threading.Lock()
+
+    def reset(self):
+        """Forget everything recorded so far"""
+        with self.lock:
+            self.origin = time.perf_counter()
+            self.spans = []
+            self.counters = defaultdict(float)
+            self.lanes = {}
+
+    def _lane(self):
+        """Trace lane for the current asyncio task (or thread), so concurrent units don't overlap"""
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = threading.get_ident()
+        if key not in self.lanes:
+            self.lanes[key] = len(self.lanes) + 1
+        return self.lanes[key]
+
+    @contextmanager
+    def span(self, stage, unit=None, **args):
+        """Time a block of work as one stage of a unit"""
+        start = time.perf_counter()
+        lane = self._lane()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.spans.append((stage, unit, start - self.origin, duration, lane, args))
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f"⏱️  {stage} {duration:.3f}s {unit or ''}",
+                          extra={'unit': unit, 'stage': stage, 'duration': round(duration, 4)})
+
+    def count(self, name, value=1):
+        """Increment a counter such as bytes, images or retries"""
+        with self.lock:
+            self.counters[name] += value
+
+    def stage_durations(self):
+        """Durations grouped by stage name"""
+        durations = defaultdict(list)
+        for stage, _unit, _start, duration, _lane, _args in self.spans:
+            durations[stage].append(duration)
+        return durations
+
+    def export_chrome_trace(self, trace_file):
+        """Write spans as Chrome trace events (open in chrome://tracing or Perfetto)"""
+        pid = os.getpid()
+        events = []
+        for stage, unit, start, duration, lane, args in self.spans:
+            event_args = dict(args)
+            if unit:
+                event_args['unit'] = unit
+            events.append({
+                'name': stage,
+                'cat': 'crawl',
+                'ph': 'X',
+                'ts': round(start * 1_000_000),
+                'dur': round(duration * 1_000_000),
+                'pid': pid,
+                'tid': lane,
+                'args': event_args
+            })
+        for name, value in sorted(self.counters.items()):
+            events.append({
+                'name': name, 'cat': 'counter', 'ph': 'C',
+                'ts': round((time.perf_counter() - self.origin) * 1_000_000),
+                'pid': pid, 'args': {name: value}
+            })
+        atomic_write_text(trace_file, json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+        return Path(trace_file)
+
+    def export_prometheus(self, prom_file):
+        """Write stage summaries and counters in Prometheus textfile format"""
+        prefix = self.metric_prefix
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per crawl stage",
+            f"# TYPE {prefix}_stage_seconds summary"
+        ]
+        for stage, values in sorted(self.stage_durations().items()):
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {percentile(values, q * 100):.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {sum(values):.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {len(values)}')
+
+        for name, value in sorted(self.counters.items()):
+            metric = f"{prefix}_{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value:g}")
+
+        atomic_write_text(prom_file, "\n".join(lines) + "\n")
+        return Path(prom_file)
+
+    def print_summary(self):
+        """Print p50/p95/p99 per stage and the counters"""
+        durations = self.stage_durations()
+        if not durations:
+            log.info("📊 No timing data recorded")
+            return
+
+        log.info(f"\n📊 Stage latency (seconds)")
+        log.info(f"{'stage':<20}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'total':>10}")
+        for stage, values in sorted(durations.items(), key=lambda item: -sum(item[1])):
+            log.info(
+                f"{stage:<20}{len(values):>8}{percentile(values, 50):>10.3f}"
+                f"{percentile(values, 95):>10.3f}{percentile(values, 99):>10.3f}{sum(values):>10.1f}"
+            )
+        if self.counters:
+            log.info("📈 Counters: " + ", ".join(f"{name}={value:g}" for name, value in sorted(self.counters.items())))
+
+    def report(self, metrics_dir=Path("content/metrics"), run_name="crawl"):
+        """Export the trace and textfile, then print the summary"""
+        metrics_dir = Path(metrics_dir)
+        trace_file = self.export_chrome_trace(metrics_dir / f"{run_name}_trace.json")
+        prom_file = self.export_prometheus(metrics_dir / f"{run_name}.prom")
+        self.print_summary()
+        log.info(f"🧭 Trace saved to: {trace_file}")
+        log.info(f"📈 Metrics saved to: {prom_file}")
+
+# Shared instance so every crawler in a process reports into the same run
+tracer = Instrumentation()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Lease queue for sharded AZ-104 re-crawls
+A coordinator splits units into shards; worker processes lease shards, keep
+them alive with heartbeats and record per-unit results. Leases whose worker
+stops heartbeating expire and are handed to another worker. Workers must run
+on the same host: they also write course_catalog.db, which is in WAL mode and
+must not be shared over a network filesystem
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from crawl_log import get_logger
+from unit_urls import canonical_unit_url
+
+log = get_logger('leases')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    id INTEGER PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    shard INTEGER NOT NULL,
+    units TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_expires REAL,
+    updated_at REAL NOT NULL,
+    UNIQUE (run_id, shard)
+);
+
+CREATE TABLE IF NOT EXISTS lease_results (
+    run_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    content_hash TEXT,
+    error TEXT,
+    worker TEXT,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (run_id, url)
+);
+
+CREATE INDEX IF NOT EXISTS idx_leases_claim ON leases(run_id, status, lease_expires);
+"""
+
+def worker_name():
+    """Identify this worker process"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+class LeaseQueue:
+    """Shards of units leased to workers through a shared SQLite file"""
+
+    def __init__(self, db_path=Path("content/crawl_leases.db"), lease_seconds=300, max_attempts=3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds  # a lease expires this long after its last heartbeat
+        self.max_attempts = max_attempts    # leases given out this often without finishing are failed
+
+        # isolation_level=None: transactions are explicit, so a claim can take the write lock up front
+        self.conn = sqlite3.connect(str(self.db_path), timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        # Short-lived claims and heartbeats from many processes; a rollback journal keeps the file self-contained
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.executescript(SCHEMA)
+
+    def _write(self, statement, params=()):
+        """Run one statement in its own write transaction"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.execute(statement, params)
+            self.conn.execute("COMMIT")
+            return cursor.rowcount
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def create_run(self, units, shard_size=10):
+        """Split units ({'url', 'title', 'local_file'}) into pending shards and return the run id"""
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for shard, start in enumerate(range(0, len(units), shard_size), 1):
+                self.conn.execute(
+                    "INSERT INTO leases (run_id, shard, units, updated_at) VALUES (?, ?, ?, ?)",
+                    (run_id, shard, json.dumps(units[start:start + shard_size]), now)
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return run_id
+
+    def latest_run(self):
+        """Most recently created run id, or None"""
+        row = self.conn.execute("SELECT MAX(run_id) AS run_id FROM leases").fetchone()
+        return row['run_id']
+
+    def claim(self, run_id, worker):
+        """Lease the next pending or expired shard to a worker; returns {'id', 'shard', 'units'} or None"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Shards that keep losing their worker (e.g. a unit that crashes the browser) stop circulating
+            self.conn.execute(
+                "UPDATE leases SET status='failed', worker=NULL, updated_at=? "
+                "WHERE run_id=? AND status='leased' AND lease_expires < ? AND attempts >= ?",
+                (now, run_id, now, self.max_attempts)
+            )
+            row = self.conn.execute(
+                "SELECT id, shard, units, attempts FROM leases WHERE run_id=? AND "
+                "(status='pending' OR (status='leased' AND lease_expires < ?)) ORDER BY shard LIMIT 1",
+                (run_id, now)
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE leases SET status='leased', worker=?, attempts=attempts + 1, "
+                    "lease_expires=?, updated_at=? WHERE id=?",
+                    (worker, now + self.lease_seconds, now, row['id'])
+                )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        if not row:
+            return None
+        if row['attempts']:
+            log.info(f"♻️  Reassigned expired shard {row['shard']} (attempt {row['attempts'] + 1})")
+        return {'id': row['id'], 'shard': row['shard'], 'units': json.loads(row['units'])}
+
+    def heartbeat(self, lease_id, worker):
+        """Extend a lease; False means it expired and now belongs to another worker"""
+        now = time.time()
+        return self._write(
+            "UPDATE leases SET lease_expires=?, updated_at=? WHERE id=? AND worker=? AND status='leased'",
+            (now + self.lease_seconds, now, lease_id, worker)
+        ) == 1
+
+    def complete(self, lease_id, worker):
+        """Mark a shard done if this worker still holds it"""
+        return self._write(
+            "UPDATE leases SET status='done', lease_expires=NULL, updated_at=? "
+            "WHERE id=? AND worker=? AND status='leased'",
+            (time.time(), lease_id, worker)
+        ) == 1
+
+    def record_result(self, run_id, url, success, worker, content_hash=None, error=None):
+        """Store the outcome of one unit; the latest attempt wins"""
+        self._write(
+            "INSERT INTO lease_results (run_id, url, success, content_hash, error, worker, finished_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(run_id, url) DO UPDATE SET success=excluded.success, "
+            "content_hash=excluded.content_hash, error=excluded.error, worker=excluded.worker, "
+            "finished_at=excluded.finished_at",
+            (run_id, canonical_unit_url(url), int(bool(success)), content_hash, error, worker, time.time())
+        )
+
+    def succeeded_urls(self, run_id):
+        """Units of a run that already succeeded, so a reassigned shard skips them"""
+        return {
+            row['url'] for row in self.conn.execute(
+                "SELECT url FROM lease_results WHERE run_id=? AND success=1", (run_id,)
+            )
+        }
+
+    def results(self, run_id):
+        """Per-unit results of a run"""
+        return [dict(row) for row in self.conn.execute(
+            "SELECT * FROM lease_results WHERE run_id=? ORDER BY url", (run_id,)
+        )]
+
+    def open_count(self, run_id):
+        """Shards of a run that are pending or leased"""
+        row = self.conn.execute(
+            "SELECT COUNT(*) AS n FROM leases WHERE run_id=? AND status IN ('pending', 'leased')", (run_id,)
+        ).fetchone()
+        return row['n']
+
+    def status_counts(self, run_id):
+        """Number of shards of a run per status"""
+        return {
+            row['status']: row['n'] for row in self.conn.execute(
+                "SELECT status, COUNT(*) AS n FROM leases WHERE run_id=? GROUP BY status", (run_id,)
+            )
+        }
+
+    def run_units(self, run_id):
+        """Every unit of a run, in shard order"""
+        return [
+            unit
+            for row in self.conn.execute("SELECT units FROM leases WHERE run_id=? ORDER BY shard", (run_id,))
+            for unit in json.loads(row['units'])
+        ]
+
+    def close(self):
+        self.conn.close()
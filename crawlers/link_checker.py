@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Link and asset integrity checker for the AZ-104 content tree
+Scans every English and Vietnamese unit page in a process pool, indexes the
+assets they reference against the files in content/, and reports broken
+local references and images that fell back to remote URLs. Exits non-zero
+when anything is broken, so it can gate a build
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+from atomic_io import atomic_write_text
+
+LANGUAGE_DIRS = ('english', 'vietnamese')
+
+# tag -> attributes holding asset references; <a href> is checked separately as a page link
+ASSET_ATTRIBUTES = {
+    'img': ('src', 'srcset'),
+    'source': ('src', 'srcset'),
+    'link': ('href',),
+    'script': ('src',)
+}
+
+# Pages are scanned in chunks of this many files per worker task
+CHUNK_SIZE = 32
+
+# Below this many pages a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 64
+
+class ReferenceParser(HTMLParser):
+    """Collects (tag, attribute, value) for asset references and page links"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.references = []
+
+    def handle_starttag(self, tag, attrs):
+        names = ASSET_ATTRIBUTES.get(tag, ('href',) if tag == 'a' else ())
+        for name, value in attrs:
+            if name in names and value:
+                if name == 'srcset':
+                    # "url 1x, url 2x" -> one reference per candidate
+                    for candidate in value.split(','):
+                        if candidate.strip():
+                            self.references.append((tag, name, candidate.split()[0]))
+                else:
+                    self.references.append((tag, name, value.strip()))
+
+    handle_startendtag = handle_starttag
+
+def classify(tag, value):
+    """'local', 'remote' or None (anchors, data URLs and links back to Learn are not checked)"""
+    if not value or value.startswith(('#', 'data:', 'mailto:', 'javascript:')):
+        return None
+    parsed = urlparse(value)
+    if parsed.scheme or value.startswith('//'):
+        # Remote pages are expected in links; remote assets mean a download failed
+        return None if tag == 'a' else 'remote'
+    if value.startswith('/'):
+        # Site-relative links point at learn.microsoft.com, not at the content tree
+        return None if tag == 'a' else 'remote'
+    return 'local'
+
+def scan_files(content_dir, relative_paths):
+    """Collect the references of a chunk of pages (runs in a worker process)
+    Local references are resolved to paths relative to content_dir"""
+    content_dir = Path(content_dir)
+    results = []
+    for relative_path in relative_paths:
+        parser = ReferenceParser()
+        try:
+            parser.feed((content_dir / relative_path).read_text(encoding='utf-8', errors='replace'))
+            parser.close()
+        except Exception as e:
+            results.append({'file': relative_path, 'local': [], 'remote': [], 'error': str(e)})
+            continue
+
+        page_dir = os.path.dirname(relative_path)
+        local, remote = [], []
+        for tag, attribute, value in parser.references:
+            kind = classify(tag, value)
+            if kind == 'remote':
+                remote.append({'tag': tag, 'attribute': attribute, 'value': value})
+            elif kind == 'local':
+                target = os.path.normpath(os.path.join(page_dir, unquote(urlparse(value).path)))
+                local.append({'tag': tag, 'attribute': attribute, 'value': value, 'target': target.replace(os.sep, '/')})
+        results.append({'file': relative_path, 'local': local, 'remote': remote, 'error': None})
+    return results
+
+def present_files(content_dir):
+    """Every file under content_dir as a POSIX path relative to it"""
+    content_dir = str(content_dir)
+    present = set()
+    for root, _dirs, files in os.walk(content_dir):
+        relative_root = os.path.relpath(root, content_dir)
+        for name in files:
+            path = name if relative_root == '.' else os.path.join(relative_root, name)
+            present.add(path.replace(os.sep, '/'))
+    return present
+
+def page_files(present, languages=LANGUAGE_DIRS):
+    """Unit pages of the given language directories, sorted"""
+    prefixes = tuple(f"{language}/" for language in languages)
+    return sorted(path for path in present if path.startswith(prefixes) and path.endswith('.html'))
+
+class LinkChecker:
+    """Checks every unit page's local references against the files present in content/"""
+
+    def __init__(self, content_dir=Path("content"), workers=None):
+        self.content_dir = Path(content_dir)
+        self.workers = workers or os.cpu_count() or 1
+
+    def scan(self, pages):
+        """References of every page, scanned in a process pool for large trees"""
+        chunks = [pages[i:i + CHUNK_SIZE] for i in range(0, len(pages), CHUNK_SIZE)]
+        if self.workers == 1 or len(pages) < MIN_FILES_FOR_POOL:
+            return [result for chunk in chunks for result in scan_files(self.content_dir, chunk)]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(scan_files, self.content_dir, chunk) for chunk in chunks]
+            return [result for future in futures for result in future.result()]
+
+    def check(self, languages=LANGUAGE_DIRS):
+        """Build the reference index and return the report dict"""
+        start = time.perf_counter()
+        present = present_files(self.content_dir)
+        pages = page_files(present, languages)
+        scanned = self.scan(pages)
+
+        units = []
+        referenced = set()
+        totals = {'pages': len(pages), 'references': 0, 'broken': 0, 'remote': 0, 'unreadable': 0}
+        for result in scanned:
+            broken = [ref for ref in result['local'] if ref['target'] not in present]
+            referenced.update(ref['target'] for ref in result['local'])
+            totals['references'] += len(result['local']) + len(result['remote'])
+            totals['broken'] += len(broken)
+            totals['remote'] += len(result['remote'])
+            totals['unreadable'] += bool(result['error'])
+            if broken or result['remote'] or result['error']:
+                units.append({
+                    'file': result['file'],
+                    'broken': broken,
+                    'remote': result['remote'],
+                    'error': result['error']
+                })
+
+        assets = {path for path in present if path.startswith('assets/') and not path.rsplit('/', 1)[-1].startswith('.')}
+        seconds = time.perf_counter() - start
+        return {
+            'content_dir': str(self.content_dir),
+            'totals': totals,
+            'assets': {
+                'present': len(assets),
+                'referenced': len(referenced & assets),
+                'unreferenced': sorted(assets - referenced)
+            },
+            'units': units,
+            'seconds': round(seconds, 3),
+            'seconds_per_100_pages': round(seconds * 100 / len(pages), 3) if pages else 0.0
+        }
+
+def print_report(report, verbose=False):
+    """Print the summary and the pages with problems"""
+    totals = report['totals']
+    for unit in report['units']:
+        print(f"\n📄 {unit['file']}")
+        if unit['error']:
+            print(f"   ❌ Unreadable: {unit['error']}")
+        for ref in unit['broken']:
+            print(f"   ❌ Broken <{ref['tag']} {ref['attribute']}>: {ref['value']}")
+        for ref in unit['remote']:
+            print(f"   🌐 Remote <{ref['tag']} {ref['attribute']}>: {ref['value']}")
+
+    assets = report['assets']
+    print("\n" + "=" * 60)
+    print(f"📊 {totals['pages']} pages, {totals['references']} references checked in {report['seconds']:.2f}s "
+          f"({report['seconds_per_100_pages']:.3f}s per 100 pages)")
+    print(f"❌ Broken local references: {totals['broken']}")
+    print(f"🌐 Remote asset references: {totals['remote']}")
+    if totals['unreadable']:
+        print(f"⚠️  Unreadable pages: {totals['unreadable']}")
+    print(f"🖼️  Assets: {assets['present']} present, {assets['referenced']} referenced, "
+          f"{len(assets['unreferenced'])} unreferenced")
+    if verbose:
+        for path in assets['unreferenced']:
+            print(f"   • {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that unit pages' local links and assets resolve")
+    parser.add_argument('--content-dir', default="content")
+    parser.add_argument('--language', action='append', choices=LANGUAGE_DIRS,
+                        help="only check this language (repeatable; default: all)")
+    parser.add_argument('--workers', type=int, default=None, help="scanner processes (default: CPU count)")
+    parser.add_argument('--json', default=None, help="also write the full report to this file")
+    parser.add_argument('--allow-remote', action='store_true', help="don't fail on images left as remote URLs")
+    parser.add_argument('--verbose', action='store_true', help="list unreferenced assets")
+    args = parser.parse_args()
+
+    checker = LinkChecker(Path(args.content_dir), args.workers)
+    report = checker.check(tuple(args.language or LANGUAGE_DIRS))
+    print_report(report, args.verbose)
+    if args.json:
+        atomic_write_text(args.json, json.dumps(report, indent=2, ensure_ascii=False))
+        print(f"📝 Report saved to: {args.json}")
+
+    totals = report['totals']
+    failed = totals['broken'] or totals['unreadable'] or (totals['remote'] and not args.allow_remote)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
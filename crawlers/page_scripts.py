@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+In-page JavaScript used by the AZ-104 crawlers
+Each script gathers everything it needs in a single evaluation so the crawler
+makes one browser round trip instead of one (or more) per element
+"""
+
+# Passed to page.eval_on_selector_all('img', ...): metadata for every image
+IMAGE_METADATA_JS = """
+(images) => images.map((img) => ({
+    src: img.getAttribute('src'),
+    resolvedSrc: img.src,
+    currentSrc: img.currentSrc,
+    srcset: img.getAttribute('srcset'),
+    width: img.naturalWidth || img.width,
+    height: img.naturalHeight || img.height
+}))
+"""
+
+# Passed to page.eval_on_selector_all('a[href*="/training/modules/"]', ...): href and text of every link
+UNIT_LINKS_JS = """
+(links) => links.map((link) => ({
+    href: link.getAttribute('href'),
+    text: link.innerText
+}))
+"""
+
+# Passed to page.wait_for_function(...) with a list of content root selectors: true once a root
+# exists and every image has loaded (lazy images outside the viewport don't count)
+CONTENT_SETTLED_JS = """
+(roots) => roots.some((selector) => document.querySelector(selector))
+    && Array.from(document.images).every((img) => img.complete || img.loading === 'lazy')
+"""
+
+# Passed to page.evaluate(...) with content_rules.prune_args(...): prunes a copy of the unit
+# content in the browser (same rules as content_rules.prune_soup) and returns the remaining
+# HTML plus metadata for the images that survived, or null when no root matches
+PRUNE_CONTENT_JS = """
+(args) => {
+    let root = null;
+    for (const selector of args.roots) {
+        root = document.querySelector(selector);
+        if (root) break;
+    }
+    if (!root) return null;
+
+    // Prune a copy so the live page (and its loaded images) stays untouched
+    const liveImages = Array.from(root.querySelectorAll('img'));
+    const copy = root.cloneNode(true);
+    copy.querySelectorAll('img').forEach((img, i) => img.setAttribute('data-crawl-image', i));
+
+    for (const selector of args.selectors) {
+        copy.querySelectorAll(selector).forEach((element) => element.remove());
+    }
+
+    if (args.patterns.length) {
+        const patterns = args.patterns.map((pattern) => new RegExp(pattern, 'is'));
+        const walker = document.createTreeWalker(copy, NodeFilter.SHOW_TEXT | NodeFilter.SHOW_COMMENT);
+        const nodes = [];
+        while (walker.nextNode()) nodes.push(walker.currentNode);
+        for (const node of nodes) {
+            const text = node.data.trim();
+            if (!patterns.some((pattern) => pattern.test(text))) continue;
+            const parent = node.parentNode;
+            if (parent === copy) copy.replaceChildren();
+            else if (parent) parent.remove();
+        }
+    }
+
+    if (args.dropEmpty) {
+        for (const element of Array.from(copy.querySelectorAll('*'))) {
+            if (!copy.contains(element)) continue;
+            if (!element.textContent.trim() && !element.querySelector('img')
+                    && !args.keepEmpty.includes(element.tagName.toLowerCase())) {
+                element.remove();
+            }
+        }
+    }
+
+    const images = [];
+    copy.querySelectorAll('img[data-crawl-image]').forEach((img) => {
+        const live = liveImages[Number(img.getAttribute('data-crawl-image'))];
+        img.removeAttribute('data-crawl-image');
+        images.push({
+            src: live.getAttribute('src'),
+            resolvedSrc: live.src,
+            currentSrc: live.currentSrc,
+            srcset: live.getAttribute('srcset'),
+            width: live.naturalWidth || live.width,
+            height: live.naturalHeight || live.height
+        });
+    });
+
+    return {html: copy.innerHTML, images: images};
+}
+"""
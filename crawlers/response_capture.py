@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Capture image responses from a Playwright page
+Chromium already downloads every image while the page settles; keeping those
+bodies lets the crawler save them without fetching each image a second time
+"""
+
+import asyncio
+
+class ImageResponseCapture:
+    """Stores image bodies loaded by the browser, keyed by request and final URL"""
+
+    def __init__(self, page, max_bytes=64 * 1024 * 1024):
+        self.page = page
+        self.max_bytes = max_bytes    # stop capturing past this many bytes per page
+        self.bodies = {}              # url -> (body, content_type)
+        self.total_bytes = 0
+        self.pending = set()
+        self.attached = False
+
+    def attach(self):
+        """Start listening for responses on the page"""
+        if not self.attached:
+            self.page.on('response', self._on_response)
+            self.attached = True
+        return self
+
+    def detach(self):
+        """Stop listening and release captured bodies"""
+        if self.attached:
+            self.page.remove_listener('response', self._on_response)
+            self.attached = False
+        for task in self.pending:
+            task.cancel()
+        self.pending.clear()
+        self.bodies.clear()
+        self.total_bytes = 0
+
+    def _on_response(self, response):
+        """Schedule reading the body of successful image responses"""
+        if response.status != 200 or response.request.resource_type != 'image':
+            return
+        task = asyncio.ensure_future(self._store(response))
+        self.pending.add(task)
+        task.add_done_callback(self.pending.discard)
+
+    async def _store(self, response):
+        """Read a response body and index it under every URL in its redirect chain"""
+        try:
+            body = await response.body()
+        except Exception:
+            return
+        if self.total_bytes + len(body) > self.max_bytes:
+            return
+        self.total_bytes += len(body)
+
+        entry = (body, response.headers.get('content-type'))
+        self.bodies[response.url] = entry
+        request = response.request.redirected_from
+        while request is not None:
+            self.bodies[request.url] = entry
+            request = request.redirected_from
+
+    async def drain(self):
+        """Wait for bodies that are still being read"""
+        if self.pending:
+            await asyncio.gather(*list(self.pending), return_exceptions=True)
+
+    def get(self, url):
+        """Captured (body, content_type) for a URL, or None"""
+        return self.bodies.get(url)
+
+    def __len__(self):
+        return len(self.bodies)
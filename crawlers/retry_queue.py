@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Persistent retry queue and per-host circuit breaker for AZ-104 crawls
+Failed units are stored in SQLite and retried with jittered exponential backoff
+"""
+
+import asyncio
+import random
+import sqlite3
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from urllib.parse import urlparse
+from crawl_log import get_logger
+from unit_urls import canonical_unit_url
+
+log = get_logger('retry_queue')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS retry_queue (
+    url TEXT PRIMARY KEY,
+    output_path TEXT NOT NULL,
+    title TEXT,
+    error_class TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_eligible REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    updated_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_retry_queue_due ON retry_queue(status, next_eligible);
+"""
+
+RETRYABLE_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+class CrawlHTTPError(Exception):
+    """HTTP error returned while navigating to a unit page"""
+
+    def __init__(self, url, status, retry_after=None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def host_of(url):
+    """Return the host part of a URL"""
+    return urlparse(url).netloc.lower()
+
+class RetryQueue:
+    """Durable queue of failed unit crawls with jittered exponential backoff"""
+
+    def __init__(self, db_path=Path("content/course_catalog.db"), base_delay=30, max_delay=3600, max_attempts=8):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Re-key entries from older queues by canonical URL, keeping the most recent one
+        (with the most attempts any of them made, so backoff and dead-lettering carry over)"""
+        with self.conn:
+            groups = {}
+            for row in self.conn.execute("SELECT url, attempts, updated_at FROM retry_queue").fetchall():
+                groups.setdefault(canonical_unit_url(row['url']), []).append(row)
+            for url, rows in groups.items():
+                if len(rows) == 1 and rows[0]['url'] == url:
+                    continue
+                newest = max(rows, key=lambda row: row['updated_at'])
+                for row in rows:
+                    if row is not newest:
+                        self.conn.execute("DELETE FROM retry_queue WHERE url = ?", (row['url'],))
+                self.conn.execute(
+                    "UPDATE retry_queue SET url = ?, attempts = ? WHERE url = ?",
+                    (url, max(row['attempts'] for row in rows), newest['url'])
+                )
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    def backoff_delay(self, attempts, retry_after=None):
+        """Delay before the next attempt, honoring a server-provided Retry-After"""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        # Equal jitter: keep half the backoff, randomize the rest so retries don't synchronize
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def record_failure(self, url, output_path, error, title=None, retry_after=None):
+        """Record a failed crawl and schedule its next attempt"""
+        url = canonical_unit_url(url)
+        now = time.time()
+        with self.conn:
+            # The catalog is shared by pipeline and sharded workers: read and write under one write lock
+            self.conn.execute("BEGIN IMMEDIATE")
+            row = self.conn.execute("SELECT attempts FROM retry_queue WHERE url = ?", (url,)).fetchone()
+            attempts = (row['attempts'] if row else 0) + 1
+            status = 'dead' if attempts >= self.max_attempts else 'pending'
+            next_eligible = now + self.backoff_delay(attempts, retry_after)
+            self.conn.execute(
+                "INSERT INTO retry_queue (url, output_path, title, error_class, error, attempts, next_eligible, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(url) DO UPDATE SET "
+                "output_path=excluded.output_path, title=COALESCE(excluded.title, retry_queue.title), "
+                "error_class=excluded.error_class, error=excluded.error, attempts=excluded.attempts, "
+                "next_eligible=excluded.next_eligible, status=excluded.status, updated_at=excluded.updated_at",
+                (url, str(output_path), title, type(error).__name__, str(error), attempts, next_eligible, status, now)
+            )
+        return next_eligible
+
+    def record_success(self, url):
+        """Mark a queued unit as done"""
+        with self.conn:
+            self.conn.execute(
+                "UPDATE retry_queue SET status='done', updated_at=? WHERE url = ?",
+                (time.time(), canonical_unit_url(url))
+            )
+
+    def enqueue(self, url, output_path, title=None, error="queued manually"):
+        """Add a unit that should be retried as soon as possible"""
+        url = canonical_unit_url(url)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO retry_queue (url, output_path, title, error_class, error, attempts, next_eligible, status, updated_at) "
+                "VALUES (?, ?, ?, NULL, ?, 0, ?, 'pending', ?) ON CONFLICT(url) DO UPDATE SET "
+                "status='pending', next_eligible=excluded.next_eligible, updated_at=excluded.updated_at",
+                (url, str(output_path), title, error, now, now)
+            )
+
+    def due(self, limit=None):
+        """Entries whose backoff has elapsed, oldest first"""
+        query = "SELECT * FROM retry_queue WHERE status='pending' AND next_eligible <= ? ORDER BY next_eligible"
+        params = [time.time()]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.conn.execute(query, params)]
+
+    def pending(self):
+        """All entries still waiting to be retried"""
+        return [
+            dict(row) for row in
+            self.conn.execute("SELECT * FROM retry_queue WHERE status='pending' ORDER BY next_eligible")
+        ]
+
+    def dead(self):
+        """Entries that exhausted their attempts"""
+        return [dict(row) for row in self.conn.execute("SELECT * FROM retry_queue WHERE status='dead' ORDER BY url")]
+
+    def get(self, url):
+        """Return a single queue entry, or None"""
+        row = self.conn.execute("SELECT * FROM retry_queue WHERE url = ?", (canonical_unit_url(url),)).fetchone()
+        return dict(row) if row else None
+
+    def seconds_until_next(self):
+        """Seconds until the next pending entry becomes eligible, or None if the queue is empty"""
+        row = self.conn.execute(
+            "SELECT MIN(next_eligible) AS next_eligible FROM retry_queue WHERE status='pending'"
+        ).fetchone()
+        if row['next_eligible'] is None:
+            return None
+        return max(0.0, row['next_eligible'] - time.time())
+
+class CircuitBreaker:
+    """Per-host circuit breaker that pauses crawling when the error rate spikes"""
+
+    def __init__(self, window=20, failure_threshold=0.5, min_requests=5, cooldown=120, max_cooldown=1800):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.outcomes = {}      # host -> deque of recent True/False outcomes
+        self.open_until = {}    # host -> timestamp when the breaker half-opens
+        self.trips = {}         # host -> consecutive trips, used to grow the cooldown
+
+    def record(self, url, success, retry_after=None):
+        """Record a request outcome and trip the breaker if the host is failing"""
+        host = host_of(url)
+        outcomes = self.outcomes.setdefault(host, deque(maxlen=self.window))
+        outcomes.append(bool(success))
+
+        if success:
+            if self.trips.get(host) and len(outcomes) >= self.min_requests and all(list(outcomes)[-self.min_requests:]):
+                self.trips[host] = 0
+            return
+
+        failures = outcomes.count(False)
+        if retry_after is not None or (
+            len(outcomes) >= self.min_requests and failures / len(outcomes) >= self.failure_threshold
+        ):
+            self.trip(host, retry_after)
+
+    def trip(self, host, retry_after=None):
+        """Open the breaker for a host"""
+        trips = self.trips.get(host, 0) + 1
+        self.trips[host] = trips
+        pause = min(self.max_cooldown, self.cooldown * (2 ** (trips - 1)))
+        if retry_after is not None:
+            pause = max(pause, retry_after)
+        self.open_until[host] = time.time() + pause
+        # Start the half-open probe period with a clean window
+        self.outcomes[host] = deque(maxlen=self.window)
+        log.info(f"🛑 Circuit open for {host}: pausing crawl for {pause:.0f}s")
+
+    def remaining(self, url):
+        """Seconds left before requests to this URL's host are allowed again"""
+        return max(0.0, self.open_until.get(host_of(url), 0) - time.time())
+
+    def is_open(self, url):
+        """Check whether requests to this URL's host are paused"""
+        return self.remaining(url) > 0
+
+    async def wait_if_open(self, url):
+        """Block until the host's breaker closes"""
+        remaining = self.remaining(url)
+        while remaining > 0:
+            log.info(f"⏸️  Waiting {remaining:.0f}s for circuit on {host_of(url)} to close...")
+            await asyncio.sleep(remaining)
+            remaining = self.remaining(url)
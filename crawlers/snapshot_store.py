@@ -0,0 +1,479 @@
+#!/usr/bin/env python3
+"""
+Content-addressed snapshot history of crawled unit pages
+A snapshot records which version of every page was on disk after a crawl.
+Pages are split into line-aligned chunks at content-defined boundaries, so an
+edit only adds the chunks around it; chunks and page versions are stored once
+however many snapshots contain them, compressed with zstd and a dictionary
+trained on our own pages (zlib with a preset dictionary when zstandard is not
+installed). A snapshot only lists the pages it changed, and a page's version at
+any date is one indexed lookup. Change reports list the blocks translators
+have to revisit between two snapshots
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import sys
+import time
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from link_checker import page_files, present_files
+
+try:
+    import zstandard
+except ImportError:  # chunks are compressed with zlib when zstandard is not installed
+    zstandard = None
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at TEXT NOT NULL,
+    label TEXT,
+    pages INTEGER NOT NULL,
+    changed INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    codec TEXT NOT NULL,
+    data BLOB NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS chunks (
+    hash BLOB PRIMARY KEY,
+    codec TEXT NOT NULL,
+    dictionary_id INTEGER REFERENCES dictionaries(id),
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS pages (
+    hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    chunks BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS snapshot_pages (
+    path TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    page_hash TEXT REFERENCES pages(hash),
+    PRIMARY KEY (path, snapshot_id)
+) WITHOUT ROWID;
+"""
+
+# Chunks are keyed by a 16-byte BLAKE2b digest; a page version lists its chunk keys back to back
+CHUNK_KEY_SIZE = 16
+
+# A chunk ends after a line whose CRC has these bits clear, once it holds MIN_CHUNK bytes
+MIN_CHUNK = 1024
+MAX_CHUNK = 16 * 1024
+BOUNDARY_MASK = 0x1F
+
+ZSTD_LEVEL = 19
+ZSTD_DICTIONARY_SIZE = 64 * 1024
+ZLIB_LEVEL = 9
+ZLIB_DICTIONARY_SIZE = 32 * 1024  # the deflate window; a longer preset dictionary is never used
+
+# Fewer sample chunks than this don't train a useful dictionary
+MIN_TRAINING_CHUNKS = 64
+
+def split_chunks(data):
+    """Line-aligned, content-defined chunks of a page; an insertion only changes the chunks around it"""
+    chunks, current = [], bytearray()
+    for line in data.splitlines(keepends=True):
+        current += line
+        while len(current) >= MAX_CHUNK:
+            chunks.append(bytes(current[:MAX_CHUNK]))
+            del current[:MAX_CHUNK]
+        if len(current) >= MIN_CHUNK and zlib.crc32(line) & BOUNDARY_MASK == 0:
+            chunks.append(bytes(current))
+            current = bytearray()
+    if current:
+        chunks.append(bytes(current))
+    return chunks
+
+def chunk_key(chunk):
+    return hashlib.blake2b(chunk, digest_size=CHUNK_KEY_SIZE).digest()
+
+def train_zlib_dictionary(samples, size=ZLIB_DICTIONARY_SIZE):
+    """Preset zlib dictionary: the lines shared by most chunks, the most valuable last (closest to the data)"""
+    counts = Counter(line for sample in samples for line in set(sample.splitlines(keepends=True)))
+    ranked = sorted((line for line, count in counts.items() if count > 1),
+                    key=lambda line: counts[line] * len(line), reverse=True)
+    picked, total = [], 0
+    for line in ranked:
+        if total + len(line) <= size:
+            picked.append(line)
+            total += len(line)
+    return b''.join(reversed(picked))
+
+def translatable_blocks(document):
+    """{block id: text} of a unit document's headings and translatable blocks"""
+    blocks = {}
+    for section in document['sections']:
+        if section['heading']:
+            blocks[section['id']] = section['heading']
+        for block in section['blocks']:
+            if block['translatable']:
+                blocks[block['id']] = block['text']
+    return blocks
+
+class SnapshotStore:
+    """SQLite store of page snapshots, deduplicated by chunk and compressed with a trained dictionary"""
+
+    def __init__(self, db_path=Path("content/snapshots.db")):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.codec = 'zstd' if zstandard else 'zlib'
+        self.dictionaries = {}    # dictionary id -> bytes
+        self.compressor = None    # (dictionary id, zstd compressor) of the last chunk written
+        self.decompressors = {}   # dictionary id -> zstd decompressor
+
+    def close(self):
+        """Close the database connection"""
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+    @contextmanager
+    def transaction(self):
+        """Run a block of statements in a single transaction"""
+        with self.conn:
+            yield self.conn
+
+    def dictionary(self, dictionary_id):
+        if dictionary_id not in self.dictionaries:
+            row = self.conn.execute("SELECT data FROM dictionaries WHERE id = ?", (dictionary_id,)).fetchone()
+            self.dictionaries[dictionary_id] = bytes(row['data'])
+        return self.dictionaries[dictionary_id]
+
+    def current_dictionary(self):
+        """Id of the newest dictionary for this store's codec, or None"""
+        row = self.conn.execute(
+            "SELECT id FROM dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1", (self.codec,)
+        ).fetchone()
+        return row['id'] if row else None
+
+    def train(self, samples):
+        """Train a dictionary on sample chunks for the chunks written from now on; its id, or None if too few samples"""
+        samples = list(samples)
+        if len(samples) < MIN_TRAINING_CHUNKS:
+            return None
+        if self.codec == 'zstd':
+            try:
+                data = zstandard.train_dictionary(ZSTD_DICTIONARY_SIZE, samples).as_bytes()
+            except zstandard.ZstdError:
+                return None
+        else:
+            data = train_zlib_dictionary(samples)
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO dictionaries (codec, data, created_at) VALUES (?, ?, ?)",
+                (self.codec, data, time.strftime('%Y-%m-%d %H:%M:%S'))
+            )
+        return cursor.lastrowid
+
+    def compress(self, chunk, dictionary_id):
+        """(codec, stored bytes) of a chunk; 'raw' when compressing doesn't make it smaller"""
+        if self.codec == 'zstd':
+            if self.compressor is None or self.compressor[0] != dictionary_id:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary(dictionary_id)) if dictionary_id else None
+                self.compressor = (dictionary_id, zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data))
+            data = self.compressor[1].compress(chunk)
+        else:
+            # Raw deflate (no zlib header): the dictionary is known from the chunk's row
+            if dictionary_id:
+                compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=self.dictionary(dictionary_id))
+            else:
+                compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15)
+            data = compressor.compress(chunk) + compressor.flush()
+        if len(data) >= len(chunk):
+            return 'raw', chunk
+        return self.codec, data
+
+    def decompress(self, codec, dictionary_id, data):
+        if codec == 'raw':
+            return data
+        if codec == 'zlib':
+            if dictionary_id:
+                decompressor = zlib.decompressobj(-15, zdict=self.dictionary(dictionary_id))
+            else:
+                decompressor = zlib.decompressobj(-15)
+            return decompressor.decompress(data) + decompressor.flush()
+        if zstandard is None:
+            raise RuntimeError(f"{self.db_path} holds zstd-compressed pages; install zstandard to read them")
+        if dictionary_id not in self.decompressors:
+            dict_data = zstandard.ZstdCompressionDict(self.dictionary(dictionary_id)) if dictionary_id else None
+            self.decompressors[dictionary_id] = zstandard.ZstdDecompressor(dict_data=dict_data)
+        return self.decompressors[dictionary_id].decompress(data)
+
+    def store_page(self, conn, data, page_hash, dictionary_id, stats):
+        """Store a page version's chunks that aren't stored yet"""
+        if conn.execute("SELECT 1 FROM pages WHERE hash = ?", (page_hash,)).fetchone():
+            return
+        keys = []
+        for chunk in split_chunks(data):
+            key = chunk_key(chunk)
+            keys.append(key)
+            if conn.execute("SELECT 1 FROM chunks WHERE hash = ?", (key,)).fetchone():
+                continue
+            codec, stored = self.compress(chunk, dictionary_id)
+            conn.execute(
+                "INSERT INTO chunks (hash, codec, dictionary_id, size, data) VALUES (?, ?, ?, ?, ?)",
+                (key, codec, dictionary_id if codec != 'raw' else None, len(chunk), stored)
+            )
+            stats['new_chunks'] += 1
+            stats['stored_bytes'] += len(stored)
+        conn.execute("INSERT INTO pages (hash, size, chunks) VALUES (?, ?, ?)", (page_hash, len(data), b''.join(keys)))
+
+    def take(self, content_dir=Path("content"), languages=('english',), label=None):
+        """Record the pages on disk as a new snapshot; returns the report dict"""
+        start = time.perf_counter()
+        content_dir = Path(content_dir)
+        pages = {path: (content_dir / path).read_bytes() for path in page_files(present_files(content_dir), languages)}
+        latest = self.conn.execute("SELECT MAX(id) FROM snapshots").fetchone()[0]
+        prefixes = tuple(f"{language}/" for language in languages)
+        previous = {path: page_hash for path, page_hash in self.page_versions(latest).items()
+                    if path.startswith(prefixes)} if latest else {}
+
+        dictionary_id = self.current_dictionary()
+        if dictionary_id is None:
+            dictionary_id = self.train(chunk for data in pages.values() for chunk in split_chunks(data))
+
+        stats = {'new_chunks': 0, 'stored_bytes': 0}
+        added, changed = [], []
+        with self.transaction() as conn:
+            snapshot_id = conn.execute(
+                "INSERT INTO snapshots (taken_at, label, pages) VALUES (?, ?, ?)",
+                (time.strftime('%Y-%m-%d %H:%M:%S'), label, len(pages))
+            ).lastrowid
+            for path, data in pages.items():
+                page_hash = hashlib.sha256(data).hexdigest()
+                if previous.get(path) == page_hash:
+                    continue
+                self.store_page(conn, data, page_hash, dictionary_id, stats)
+                conn.execute("INSERT INTO snapshot_pages (path, snapshot_id, page_hash) VALUES (?, ?, ?)",
+                             (path, snapshot_id, page_hash))
+                (changed if path in previous else added).append(path)
+            removed = sorted(path for path in previous if path not in pages)
+            conn.executemany("INSERT INTO snapshot_pages (path, snapshot_id, page_hash) VALUES (?, ?, NULL)",
+                             [(path, snapshot_id) for path in removed])
+            conn.execute("UPDATE snapshots SET changed = ? WHERE id = ?",
+                         (len(added) + len(changed) + len(removed), snapshot_id))
+        return {
+            'snapshot': snapshot_id,
+            'pages': len(pages),
+            'added': added,
+            'changed': changed,
+            'removed': removed,
+            'new_chunks': stats['new_chunks'],
+            'stored_bytes': stats['stored_bytes'],
+            'seconds': round(time.perf_counter() - start, 3)
+        }
+
+    def snapshots(self):
+        return self.conn.execute("SELECT * FROM snapshots ORDER BY id").fetchall()
+
+    def resolve(self, at=None):
+        """Snapshot id for at: None for the latest, a snapshot id, or a date or time (the last snapshot taken by then)"""
+        if at is None:
+            row = self.conn.execute("SELECT id FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+        elif str(at).isdigit():
+            row = self.conn.execute("SELECT id FROM snapshots WHERE id = ?", (int(at),)).fetchone()
+        else:
+            at = str(at).replace('T', ' ')
+            if len(at) == 10:
+                at += ' 23:59:59'  # a bare date means the end of that day
+            row = self.conn.execute(
+                "SELECT id FROM snapshots WHERE taken_at <= ? ORDER BY taken_at DESC, id DESC LIMIT 1", (at,)
+            ).fetchone()
+        if not row:
+            raise LookupError("No snapshots yet" if at is None else f"No snapshot at {at}")
+        return row['id']
+
+    def page_versions(self, snapshot_id):
+        """{path: page hash} of every page in a snapshot"""
+        versions = {}
+        for row in self.conn.execute(
+            "SELECT path, page_hash FROM snapshot_pages WHERE snapshot_id <= ? ORDER BY path, snapshot_id",
+            (snapshot_id,)
+        ):
+            versions[row['path']] = row['page_hash']
+        return {path: page_hash for path, page_hash in versions.items() if page_hash}
+
+    def page_bytes(self, page_hash):
+        """The bytes of a stored page version"""
+        keys = bytes(self.conn.execute("SELECT chunks FROM pages WHERE hash = ?", (page_hash,)).fetchone()['chunks'])
+        parts = []
+        for i in range(0, len(keys), CHUNK_KEY_SIZE):
+            row = self.conn.execute(
+                "SELECT codec, dictionary_id, data FROM chunks WHERE hash = ?", (keys[i:i + CHUNK_KEY_SIZE],)
+            ).fetchone()
+            parts.append(self.decompress(row['codec'], row['dictionary_id'], bytes(row['data'])))
+        return b''.join(parts)
+
+    def read(self, path, at=None):
+        """A page's bytes as of at (see resolve), or None if it didn't exist then"""
+        row = self.conn.execute(
+            "SELECT page_hash FROM snapshot_pages WHERE path = ? AND snapshot_id <= ? ORDER BY snapshot_id DESC LIMIT 1",
+            (path, self.resolve(at))
+        ).fetchone()
+        return self.page_bytes(row['page_hash']) if row and row['page_hash'] else None
+
+    def history(self, path):
+        """The snapshots that changed a page: (snapshot id, taken_at, page hash or None once removed)"""
+        return self.conn.execute(
+            "SELECT s.id, s.taken_at, p.page_hash FROM snapshot_pages p JOIN snapshots s ON s.id = p.snapshot_id "
+            "WHERE p.path = ? ORDER BY s.id", (path,)
+        ).fetchall()
+
+    def change_report(self, old_id, new_id):
+        """Pages added, removed and changed between two snapshots, with the translatable blocks each change touched"""
+        from unit_export import page_document
+        old, new = self.page_versions(old_id), self.page_versions(new_id)
+        units = []
+        for path in sorted(path for path in new if path in old and new[path] != old[path]):
+            old_blocks = translatable_blocks(page_document(self.page_bytes(old[path])))
+            new_blocks = translatable_blocks(page_document(self.page_bytes(new[path])))
+            units.append({
+                'path': path,
+                'added': [text for block_id, text in new_blocks.items() if block_id not in old_blocks],
+                'removed': [text for block_id, text in old_blocks.items() if block_id not in new_blocks]
+            })
+        return {
+            'from': old_id,
+            'to': new_id,
+            'added': sorted(path for path in new if path not in old),
+            'removed': sorted(path for path in old if path not in new),
+            'changed': units
+        }
+
+    def stats(self):
+        """Snapshot count, bytes the snapshots hold in full and bytes actually stored"""
+        full_bytes, sizes = 0, {}
+        rows = self.conn.execute(
+            "SELECT p.snapshot_id, p.path, v.size FROM snapshot_pages p LEFT JOIN pages v ON v.hash = p.page_hash "
+            "ORDER BY p.snapshot_id"
+        ).fetchall()
+        position = 0
+        for snapshot in self.snapshots():
+            while position < len(rows) and rows[position]['snapshot_id'] == snapshot['id']:
+                sizes[rows[position]['path']] = rows[position]['size'] or 0
+                position += 1
+            full_bytes += sum(sizes.values())
+        chunks = self.conn.execute("SELECT COUNT(*) AS count, COALESCE(SUM(LENGTH(data)), 0) AS bytes FROM chunks").fetchone()
+        dictionaries = self.conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) AS bytes FROM dictionaries").fetchone()
+        return {
+            'snapshots': len(self.snapshots()),
+            'page_versions': self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+            'chunks': chunks['count'],
+            'full_bytes': full_bytes,
+            'stored_bytes': chunks['bytes'] + dictionaries['bytes'],
+            'codec': self.codec
+        }
+
+def print_change_report(report):
+    print(f"📝 Changes from snapshot {report['from']} to {report['to']}")
+    for path in report['added']:
+        print(f"🆕 {path}")
+    for path in report['removed']:
+        print(f"🗑️  {path}")
+    for unit in report['changed']:
+        if not unit['added'] and not unit['removed']:
+            print(f"🎨 {unit['path']}: markup only")
+            continue
+        print(f"✏️  {unit['path']}: {len(unit['added'])} blocks added, {len(unit['removed'])} removed")
+        for text in unit['added']:
+            print(f"   + {text[:120]}")
+        for text in unit['removed']:
+            print(f"   - {text[:120]}")
+    if not (report['added'] or report['removed'] or report['changed']):
+        print("✅ No changes")
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot history of the crawled unit pages")
+    parser.add_argument('command', choices=['take', 'list', 'show', 'history', 'report', 'stats', 'train'])
+    parser.add_argument('path', nargs='?', help="page for show and history, e.g. english/<path>/<module>/<unit>.html")
+    parser.add_argument('--db', default="content/snapshots.db")
+    parser.add_argument('--content-dir', default="content")
+    parser.add_argument('--language', action='append', choices=['english', 'vietnamese'],
+                        help="language to snapshot (repeatable; default: english)")
+    parser.add_argument('--label', help="note stored with a new snapshot")
+    parser.add_argument('--at', help="show: snapshot id, date (YYYY-MM-DD) or time (default: latest)")
+    parser.add_argument('--from', dest='old', help="report: older snapshot id, date or time (default: the one before --to)")
+    parser.add_argument('--to', dest='new', help="report: newer snapshot id, date or time (default: latest)")
+    args = parser.parse_args()
+
+    store = SnapshotStore(Path(args.db))
+    path = args.path
+    if path and path.startswith(f"{args.content_dir.rstrip('/')}/"):
+        path = path[len(args.content_dir.rstrip('/')) + 1:]
+    if args.command in ('show', 'history') and not path:
+        parser.error(f"{args.command} needs a page path")
+
+    try:
+        if args.command == 'take':
+            report = store.take(Path(args.content_dir), tuple(args.language or ['english']), args.label)
+            print(f"📸 Snapshot {report['snapshot']}: {report['pages']} pages, {len(report['added'])} added, "
+                  f"{len(report['changed'])} changed, {len(report['removed'])} removed; {report['new_chunks']} new "
+                  f"chunks ({report['stored_bytes'] / 1024:.1f} KB) in {report['seconds']:.2f}s")
+
+        elif args.command == 'list':
+            for snapshot in store.snapshots():
+                label = f"  {snapshot['label']}" if snapshot['label'] else ""
+                print(f"{snapshot['id']:>5}  {snapshot['taken_at']}  {snapshot['pages']:>4} pages  "
+                      f"{snapshot['changed']:>4} changed{label}")
+
+        elif args.command == 'show':
+            data = store.read(path, args.at)
+            if data is None:
+                print(f"❌ {path} is not in snapshot {store.resolve(args.at)}", file=sys.stderr)
+                sys.exit(1)
+            sys.stdout.buffer.write(data)
+
+        elif args.command == 'history':
+            for row in store.history(path):
+                print(f"{row['id']:>5}  {row['taken_at']}  {row['page_hash'][:12] if row['page_hash'] else 'removed'}")
+
+        elif args.command == 'report':
+            new_id = store.resolve(args.new)
+            old_id = store.resolve(args.old) if args.old else new_id - 1
+            if old_id < 1:
+                print("ℹ️  Only one snapshot so far; nothing to compare")
+                return
+            print_change_report(store.change_report(old_id, new_id))
+
+        elif args.command == 'stats':
+            stats = store.stats()
+            ratio = stats['full_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0
+            print(f"📊 {stats['snapshots']} snapshots, {stats['page_versions']} page versions, {stats['chunks']} chunks")
+            print(f"   {stats['full_bytes'] / 1024 / 1024:.1f} MB of pages stored in "
+                  f"{stats['stored_bytes'] / 1024 / 1024:.2f} MB ({ratio:.0f}x, {stats['codec']})")
+            if stats['codec'] == 'zlib':
+                print("ℹ️  Install zstandard for smaller snapshots (pip install zstandard)")
+
+        elif args.command == 'train':
+            samples = [chunk for page_hash in store.page_versions(store.resolve()).values()
+                       for chunk in split_chunks(store.page_bytes(page_hash))]
+            dictionary_id = store.train(samples)
+            if dictionary_id is None:
+                print(f"❌ Too few chunks to train a dictionary ({len(samples)})")
+                sys.exit(1)
+            print(f"✅ Dictionary {dictionary_id} trained on {len(samples)} chunks; new chunks use it")
+    except LookupError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
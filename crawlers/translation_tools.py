@@ -6,8 +6,9 @@ Translation tools for AZ-104 Vietnamese content
 import asyncio
 import json
 from pathlib import Path
-from bs4 import BeautifulSoup
 import aiofiles
+from course_catalog import CourseCatalog, file_hash
+from unit_export import load_document, translatable_words
 
 class TranslationTools:
     """Tools for managing Vietnamese translations"""
@@ -16,6 +17,7 @@ class TranslationTools:
         self.english_dir = Path("content/english")
         self.vietnamese_dir = Path("content/vietnamese")
         self.vietnamese_dir.mkdir(exist_ok=True)
+        self.catalog = CourseCatalog()
         self.processed_count = 0
         
     async def create_vietnamese_template(self, english_file_path):
@@ -24,6 +26,7 @@ class TranslationTools:
             async with aiofiles.open(english_file_path, 'r', encoding='utf-8') as f:
                 content = await f.read()
             
+            from bs4 import BeautifulSoup
             soup = BeautifulSoup(content, 'html.parser')
             
             # Update title
@@ -65,6 +68,14 @@ class TranslationTools:
             async with aiofiles.open(vietnamese_file_path, 'w', encoding='utf-8') as f:
                 await f.write(str(soup))
             
+            # Remember which English revision this template was made from
+            self.catalog.set_translation_status(
+                str(english_file_path.relative_to(self.english_dir.parent)),
+                str(vietnamese_file_path.relative_to(self.vietnamese_dir.parent)),
+                'template',
+                file_hash(english_file_path)
+            )
+            
             self.processed_count += 1
             print(f"✅ Created template: {relative_path}")
             return True
@@ -98,7 +109,8 @@ class TranslationTools:
         await self.create_structure_summary()
     
     async def create_structure_summary(self):
-        """Create a summary of the Vietnamese content structure"""
+        """Create a summary of the Vietnamese content structure
+        Word counts come from the English pages' structured documents (pages without one are not counted)"""
         structure = {
             "project": "AZ-104 Vietnamese Translation",
             "created_templates": self.processed_count,
@@ -114,8 +126,11 @@ class TranslationTools:
                     if module_dir.is_dir():
                         module_name = module_dir.name
                         html_files = list(module_dir.glob("*.html"))
+                        documents = [load_document(self.english_dir / path_name / module_name / f.name, rebuild=False)
+                                     for f in html_files]
                         structure["structure"][path_name]["modules"][module_name] = {
                             "unit_count": len(html_files),
+                            "translatable_words": sum(translatable_words(d) for d in documents if d),
                             "units": [f.name for f in sorted(html_files)]
                         }
         
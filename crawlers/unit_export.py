@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Structured JSON export of unit pages
+Next to every unit page the crawlers save <unit>.json: its sections and blocks
+(with IDs that stay the same while a block's text does and content hashes),
+the images with their dimensions, and code blocks flagged as not to be
+translated. It is built from the parse the crawler already made, so
+translation, search and site tools can load it instead of parsing the HTML
+again. Documents of older pages are (re)built from the saved HTML on demand
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import time
+from pathlib import Path
+from atomic_io import async_atomic_write_text, atomic_write_text
+from link_checker import LANGUAGE_DIRS, page_files, present_files
+
+FORMAT_VERSION = 1
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+# tag -> block type; anything else is descended into
+BLOCK_TAGS = {
+    'p': 'paragraph',
+    'ul': 'list',
+    'ol': 'list',
+    'dl': 'list',
+    'pre': 'code',
+    'table': 'table',
+    'blockquote': 'note',
+    'img': 'image'
+}
+
+# Block types whose text is translated; code and images are kept as they are
+TRANSLATABLE = ('heading', 'paragraph', 'list', 'table', 'note')
+
+# Inline markup worth keeping in a block's html (plain-text blocks carry only text)
+INLINE_MARKUP = re.compile(r'<(a|strong|b|em|i|code|kbd|sup|sub|br|span)\b', re.IGNORECASE)
+
+# Pages are exported in chunks of this many files per worker task
+CHUNK_SIZE = 16
+
+# Below this many pages a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 32
+
+def document_path(html_path):
+    """The JSON document saved next to a unit page"""
+    return Path(html_path).with_suffix('.json')
+
+def normalized_text(element):
+    """Visible text with whitespace collapsed; the same for a fragment and its pretty-printed copy"""
+    return ' '.join(element.get_text(' ').split())
+
+def digest(*parts):
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+def image_size(path):
+    """(width, height) read from a PNG, GIF, JPEG or SVG file header, or None"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(256 * 1024)
+    except OSError:
+        return None
+    try:
+        if head.startswith(b'\x89PNG\r\n\x1a\n'):
+            return struct.unpack('>II', head[16:24])
+        if head[:6] in (b'GIF87a', b'GIF89a'):
+            return struct.unpack('<HH', head[6:10])
+        if head.startswith(b'\xff\xd8'):
+            # Walk the JPEG segments to the first start-of-frame marker
+            position = 2
+            while position + 9 < len(head):
+                if head[position] != 0xFF:
+                    position += 1
+                    continue
+                marker = head[position + 1]
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    height, width = struct.unpack('>HH', head[position + 5:position + 9])
+                    return width, height
+                position += 2 + struct.unpack('>H', head[position + 2:position + 4])[0]
+            return None
+        if b'<svg' in head[:4096]:
+            svg = head[head.index(b'<svg'):].split(b'>', 1)[0].decode('utf-8', 'replace')
+            width = re.search(r'\bwidth="([\d.]+)(px)?"', svg)
+            height = re.search(r'\bheight="([\d.]+)(px)?"', svg)
+            if width and height:
+                return round(float(width.group(1))), round(float(height.group(1)))
+            view_box = re.search(r'\bviewBox="[\d.\-]+[ ,]+[\d.\-]+[ ,]+([\d.]+)[ ,]+([\d.]+)"', svg)
+            if view_box:
+                return round(float(view_box.group(1))), round(float(view_box.group(2)))
+    except (struct.error, ValueError):
+        pass
+    return None
+
+class DocumentBuilder:
+    """Splits a unit's content element into sections of typed blocks"""
+
+    def __init__(self):
+        self.sections = [{'id': 's-intro', 'heading': None, 'level': None, 'blocks': []}]
+        self.images = []
+        self.seen_ids = {}
+
+    def stable_id(self, prefix, kind, text):
+        """ID from the block's type and text; repeats of the same text get -2, -3, ..."""
+        base = f"{prefix}-{digest(kind, text)[:8]}"
+        self.seen_ids[base] = self.seen_ids.get(base, 0) + 1
+        count = self.seen_ids[base]
+        return base if count == 1 else f"{base}-{count}"
+
+    def add_images(self, element, block_id):
+        images = [element] if element.name == 'img' else element.find_all('img')
+        for img in images:
+            if img.get('src'):
+                self.images.append({
+                    'src': img['src'],
+                    'alt': img.get('alt') or '',
+                    'block': block_id,
+                    'width': int(img['width']) if str(img.get('width', '')).isdigit() else None,
+                    'height': int(img['height']) if str(img.get('height', '')).isdigit() else None
+                })
+
+    def add_text(self, text):
+        """Loose text directly inside a container, as a paragraph"""
+        text = ' '.join(text.split())
+        self.sections[-1]['blocks'].append({
+            'id': self.stable_id('b', 'paragraph', text),
+            'type': 'paragraph',
+            'hash': digest('paragraph', text)[:16],
+            'text': text,
+            'translatable': True
+        })
+
+    def add_heading(self, element):
+        text = normalized_text(element)
+        if not text:
+            return
+        section_id = self.stable_id('s', 'heading', text)
+        self.sections.append({
+            'id': section_id,
+            'heading': text,
+            'level': int(element.name[1]),
+            'hash': digest('heading', text)[:16],
+            'blocks': []
+        })
+
+    def add_block(self, element, kind):
+        if kind == 'code':
+            code = element.find('code') or element
+            text = code.get_text().strip('\n')
+            classes = ' '.join(code.get('class') or [])
+            language = re.search(r'\b(?:lang|language)-([\w+#-]+)', classes)
+        else:
+            text = normalized_text(element)
+            language = None
+            if kind == 'paragraph' and not text and element.find('img'):
+                kind = 'image'
+        if not text and kind != 'image':
+            return
+
+        references = [tag.get('href') or tag.get('src') or '' for tag in element.find_all(['a', 'img'])]
+        if element.name == 'img':
+            references.append(element.get('src') or '')
+        block = {
+            'id': self.stable_id('b', kind, text or ' '.join(references)),
+            'type': kind,
+            'hash': digest(kind, text, *references)[:16],
+            'text': text,
+            'translatable': kind in TRANSLATABLE
+        }
+        if language:
+            block['language'] = language.group(1)
+        markup = str(element)
+        if kind in TRANSLATABLE and (kind in ('list', 'table') or INLINE_MARKUP.search(markup)):
+            block['html'] = ' '.join(markup.split())
+        self.sections[-1]['blocks'].append(block)
+        self.add_images(element, block['id'])
+
+    def walk(self, element):
+        for child in element.children:
+            name = getattr(child, 'name', None)
+            if name is None:
+                # Text directly inside a container (comments and doctypes are other string types)
+                if type(child).__name__ == 'NavigableString' and child.strip():
+                    self.add_text(child)
+            elif name in HEADING_TAGS:
+                self.add_heading(child)
+            elif name in BLOCK_TAGS:
+                self.add_block(child, BLOCK_TAGS[name])
+            elif name == 'div' and 'alert' in (child.get('class') or []):
+                self.add_block(child, 'note')
+            elif name not in ('script', 'style', 'noscript'):
+                self.walk(child)
+
+def build_document(root, unit=None):
+    """Sections, blocks and images of a unit's content element (a BeautifulSoup tag)
+    unit: title, url and page_title of the unit"""
+    builder = DocumentBuilder()
+    builder.walk(root)
+    sections = [section for section in builder.sections if section['blocks'] or section['heading']]
+    return {'unit': unit or {}, 'sections': sections, 'images': builder.images}
+
+def finish_document(document, html_path, source_hash):
+    """Complete a built document for the page it was saved as: source hash and image sizes"""
+    html_path = Path(html_path)
+    for image in document['images']:
+        if image['width'] is None and not re.match(r'^[a-z]+:|^//', image['src']):
+            size = image_size(html_path.parent / image['src'])
+            if size:
+                image['width'], image['height'] = size
+    return {
+        'version': FORMAT_VERSION,
+        'unit': document['unit'],
+        'source_hash': source_hash,
+        'sections': document['sections'],
+        'images': document['images']
+    }
+
+def translatable_words(document):
+    """Words in a document's headings and translatable blocks"""
+    words = 0
+    for section in document['sections']:
+        words += len((section['heading'] or '').split())
+        words += sum(len(block['text'].split()) for block in section['blocks'] if block['translatable'])
+    return words
+
+def document_json(document):
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':'))
+
+async def save_unit_document(document, html_path, source_hash):
+    """Write the document of a page the crawler just saved (source_hash: sha256 of the saved page)"""
+    if document is None:
+        return
+    document = finish_document(document, html_path, source_hash)
+    await async_atomic_write_text(document_path(html_path), document_json(document))
+
+def page_unit(soup):
+    """Unit details from a saved page's course information box"""
+    unit = {'title': None, 'url': None, 'page_title': soup.title.get_text().strip() if soup.title else None}
+    source_info = soup.find('div', class_='source-info')
+    if source_info:
+        for paragraph in source_info.find_all('p'):
+            text = paragraph.get_text(' ', strip=True)
+            if text.startswith('Unit:'):
+                unit['title'] = text[len('Unit:'):].strip()
+            elif text.startswith('Source:') and paragraph.find('a'):
+                unit['url'] = paragraph.find('a').get('href')
+    return unit
+
+def page_document(data):
+    """Document built from the bytes of a saved unit page (not finished: no source hash or image sizes)"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(data.decode('utf-8', errors='replace'), 'html.parser')
+    root = soup.find('div', class_='main-content') or soup.find('div', id='module-unit-content') or soup.body or soup
+    return build_document(root, page_unit(soup))
+
+def export_page(html_path):
+    """Build and save the document of a saved unit page; returns it"""
+    data = Path(html_path).read_bytes()
+    document = finish_document(page_document(data), html_path, hashlib.sha256(data).hexdigest())
+    atomic_write_text(document_path(html_path), document_json(document))
+    return document
+
+def load_document(html_path, rebuild=True):
+    """The structured document of a unit page; rebuilt from the HTML when missing or older than the page
+    With rebuild=False a missing or stale document is returned as None"""
+    html_path = Path(html_path)
+    try:
+        with open(document_path(html_path), 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        if document.get('version') == FORMAT_VERSION and \
+                document.get('source_hash') == hashlib.sha256(html_path.read_bytes()).hexdigest():
+            return document
+    except (OSError, ValueError):
+        pass
+    return export_page(html_path) if rebuild else None
+
+def export_files(paths, force=False):
+    """Export a chunk of pages (runs in a worker process); returns (exported, up to date, failed paths)"""
+    from content_validation import is_error_page
+    exported, current, failed = 0, 0, []
+    for path in paths:
+        try:
+            if not force and load_document(path, rebuild=False):
+                current += 1
+                continue
+            # Error placeholders have no content to export
+            if is_error_page(Path(path).read_text(encoding='utf-8', errors='replace')):
+                continue
+            export_page(path)
+            exported += 1
+        except Exception:
+            failed.append(path)
+    return exported, current, failed
+
+def export_pages(paths, force=False, workers=None):
+    """Export many pages, in a process pool for large batches"""
+    paths = list(paths)
+    chunks = [paths[i:i + CHUNK_SIZE] for i in range(0, len(paths), CHUNK_SIZE)]
+    if workers == 1 or len(paths) < MIN_FILES_FOR_POOL:
+        results = [export_files(chunk, force) for chunk in chunks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(export_files, chunks, [force] * len(chunks)))
+    return (
+        sum(result[0] for result in results),
+        sum(result[1] for result in results),
+        [path for result in results for path in result[2]]
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Write the structured JSON document of every saved unit page")
+    parser.add_argument('--content-dir', default="content")
+    parser.add_argument('--language', action='append', choices=LANGUAGE_DIRS,
+                        help="export this language (repeatable; default: english)")
+    parser.add_argument('--force', action='store_true', help="rebuild documents that are up to date")
+    parser.add_argument('--workers', type=int, default=None, help="exporter processes (default: CPU count)")
+    args = parser.parse_args()
+
+    content_dir = Path(args.content_dir)
+    pages = [content_dir / page for page in page_files(present_files(content_dir), tuple(args.language or ['english']))]
+    start = time.perf_counter()
+    exported, current, failed = export_pages(pages, args.force, args.workers or os.cpu_count())
+    for path in failed:
+        print(f"❌ Could not export {path}")
+    print(f"📦 {exported} documents written, {current} up to date, {len(failed)} failed "
+          f"({len(pages)} pages in {time.perf_counter() - start:.2f}s)")
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
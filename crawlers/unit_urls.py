@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+URL helpers for Microsoft Learn units
+Canonical URLs are the keys for units and images everywhere (catalog, checkpoint,
+retry queue, image caches), so the same page reached through different learning
+paths or tracking links is crawled and stored once
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+# Query parameters that only track how a page was reached
+TRACKING_PARAMS = {'ns-enrollment-type', 'ns-enrollment-id', 'wt.mc_id'}
+
+def canonical_unit_url(url):
+    """Unit URL without query string or fragment, lowercase host and a trailing slash"""
+    parsed = urlparse(url.strip())
+    path = parsed.path if parsed.path.endswith('/') else parsed.path + '/'
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), path, '', '', ''))
+
+def canonical_asset_url(url):
+    """Image or other asset URL without fragment and tracking parameters, remaining query sorted"""
+    if url.startswith('data:'):
+        return url
+    parsed = urlparse(url.strip())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith('utm_')
+    )
+    return urlunparse((parsed.scheme.lower(), parsed.netloc.lower(), parsed.path, '', urlencode(query), ''))
+
+def path_key(url):
+    """Comparable key for a learning path or module URL (path only, no locale casing or slash issues)"""
+    return urlparse(url).path.rstrip('/').lower()
+
+def module_slug(url):
+    """Module name from a /training/modules/<module>/... URL, or None"""
+    parts = urlparse(url).path.strip('/').split('/')
+    if 'modules' in parts:
+        index = parts.index('modules')
+        if index + 1 < len(parts):
+            return parts[index + 1]
+    return None
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Make-like build pipeline for the AZ-104 content
+discover -> crawl -> clean -> gc -> (templates | assets) -> site, and gc -> export
+and snapshot, without prompts.
+Each step declares the files it reads and writes; a step whose inputs hash the
+same as on its last successful run is skipped, per-file steps only process the
+files that changed, and steps that don't depend on each other run in parallel
+"""
+
+import argparse
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+from atomic_io import atomic_write_text
+from crawl_log import add_logging_args, get_logger, setup_logging_from_args
+
+log = get_logger('workflow')
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+
+CACHE_FILE = ".workflow_cache.json"
+
+# A pristine Vietnamese template; files without it have been translated and are never regenerated
+TEMPLATE_MARKER = "📝 Nội dung dịch tiếng Việt sẽ được thêm vào đây"
+
+# Below this many pages a process pool costs more than it saves
+MIN_FILES_FOR_POOL = 16
+
+def import_script(name):
+    """Import a module from scripts/, which imports crawlers/ modules as top-level modules"""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    import importlib
+    return importlib.import_module(name)
+
+class FileHashes:
+    """sha256 of files, recomputed only when a file's size or modification time changed"""
+
+    def __init__(self, known=None):
+        self.known = known or {}  # path -> [mtime_ns, size, sha256]
+
+    def digest(self, path):
+        stat = os.stat(path)
+        entry = self.known.get(str(path))
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        self.known[str(path)] = [stat.st_mtime_ns, stat.st_size, sha.hexdigest()]
+        return sha.hexdigest()
+
+    def forget_missing(self):
+        """Drop entries of files that no longer exist"""
+        self.known = {path: entry for path, entry in self.known.items() if os.path.exists(path)}
+
+class Step:
+    """One pipeline step: the files it reads and writes, the steps it runs after, and its action
+
+    inputs are glob patterns and outputs paths, relative to the working directory. A step with
+    `each` is a per-file step: each(source) names the file written for a source (the source
+    itself when it is updated in place) and the action is called with the changed and removed
+    sources, returning the sources that failed; a failed source is retried once it changes.
+    Other steps' actions take only the workflow"""
+
+    def __init__(self, name, action, inputs=(), outputs=(), after=(), each=None, params=None, description=''):
+        self.name = name
+        self.action = action
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.after = tuple(after)
+        self.each = each
+        self.params = params or {}
+        self.description = description
+
+    def input_files(self):
+        """Files currently matching the input patterns, sorted"""
+        files = set()
+        for pattern in self.inputs:
+            files.update(path for path in Path('.').glob(pattern) if path.is_file() and not path.name.startswith('.'))
+        return sorted(files)
+
+    def missing_outputs(self):
+        return [output for output in self.outputs if not Path(output).exists()]
+
+class Workflow:
+    """Runs steps in dependency order, skipping those whose inputs are unchanged since their last success"""
+
+    def __init__(self, steps, content_dir=Path("content"), force=(), dry_run=False, options=None):
+        self.steps = {step.name: step for step in steps}
+        self.content_dir = Path(content_dir)
+        self.cache_file = self.content_dir / CACHE_FILE
+        self.force = set(force)
+        self.dry_run = dry_run
+        self.options = options or {}
+        self.cache = self.load_cache()
+        self.hashes = FileHashes(self.cache.get('hashes'))
+        self.results = {}
+
+    def load_cache(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'hashes': {}, 'steps': {}}
+
+    def save_cache(self):
+        self.hashes.forget_missing()
+        self.cache['hashes'] = self.hashes.known
+        atomic_write_text(self.cache_file, json.dumps(self.cache, indent=1, sort_keys=True))
+
+    def selection(self, targets=None, only=False):
+        """Names of the steps to run for the targets (and, unless only, everything they run after), in order"""
+        for name in targets or ():
+            if name not in self.steps:
+                raise ValueError(f"Unknown step {name} (steps: {', '.join(self.steps)})")
+        wanted = set(targets or self.steps)
+        if not only:
+            pending = list(wanted)
+            while pending:
+                for name in self.steps[pending.pop()].after:
+                    if name not in wanted:
+                        wanted.add(name)
+                        pending.append(name)
+        return [name for name in self.steps if name in wanted]
+
+    def digest(self, step, files):
+        """Hash of a step's parameters and the content of its input files"""
+        sha = hashlib.sha256(json.dumps(step.params, sort_keys=True).encode())
+        for path in files:
+            sha.update(f"{path}\0{self.hashes.digest(path)}\0".encode())
+        return sha.hexdigest()
+
+    def dirty_files(self, step):
+        """(changed sources, removed sources) of a per-file step"""
+        record = self.cache['steps'].get(step.name, {})
+        recorded = record.get('files', {})
+        failed = record.get('failed', {})  # sources the action failed on, with their content hash then
+        forced = step.name in self.force or step.missing_outputs()
+        files = step.input_files()
+        changed = [
+            path for path in files
+            if forced or failed.get(str(path)) != self.hashes.digest(path) and (
+                recorded.get(str(path)) != self.hashes.digest(path) or not step.each(path).exists()
+            )
+        ]
+        current = {str(path) for path in files}
+        removed = [Path(path) for path in recorded if path not in current]
+        return changed, removed
+
+    def is_dirty(self, step):
+        """Whether a whole step has to run"""
+        if step.name in self.force or step.missing_outputs():
+            return True
+        return self.cache['steps'].get(step.name, {}).get('digest') != self.digest(step, step.input_files())
+
+    async def call(self, function, *args):
+        """Await a coroutine action; run a plain one in a thread so parallel steps overlap"""
+        if inspect.iscoroutinefunction(function):
+            return await function(*args)
+        return await asyncio.to_thread(function, *args)
+
+    async def run_step(self, step):
+        """Run one step if it is dirty; returns 'ran', 'cached', 'partial' or 'failed' ('dirty' in a dry run)"""
+        started = time.perf_counter()
+        record = self.cache['steps'].setdefault(step.name, {})
+        try:
+            if step.each:
+                changed, removed = self.dirty_files(step)
+                if not changed and not removed:
+                    return 'cached'
+                log.info(f"▶️  {step.name}: {len(changed)} changed, {len(removed)} removed",
+                         extra={'stage': step.name})
+                if self.dry_run:
+                    return 'dirty'
+                failed = {str(path) for path in await self.call(step.action, self, changed, removed) or ()}
+                files = record.setdefault('files', {})
+                failures = {path: digest for path, digest in record.get('failed', {}).items() if Path(path).exists()}
+                for path in removed:
+                    files.pop(str(path), None)
+                for path in changed:
+                    if not path.exists():
+                        continue
+                    # Hashed after the action: in-place steps record the file they left behind
+                    if str(path) in failed:
+                        failures[str(path)] = self.hashes.digest(path)
+                    else:
+                        files[str(path)] = self.hashes.digest(path)
+                        failures.pop(str(path), None)
+                record['failed'] = failures
+                status = 'partial' if failed else 'ran'
+                if failed:
+                    log.warning(f"⚠️  {step.name}: {len(failed)} files failed, retried once they change",
+                                extra={'stage': step.name})
+            else:
+                if not self.is_dirty(step):
+                    return 'cached'
+                log.info(f"▶️  {step.name}", extra={'stage': step.name})
+                if self.dry_run:
+                    return 'dirty'
+                await self.call(step.action, self)
+                record['digest'] = self.digest(step, step.input_files())
+                status = 'ran'
+        except Exception as e:
+            log.error(f"❌ {step.name} failed: {e}", extra={'stage': step.name, 'status': 'failed'})
+            return 'failed'
+
+        record['finished_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.save_cache()
+        duration = time.perf_counter() - started
+        log.info(f"✅ {step.name} done in {duration:.1f}s",
+                 extra={'stage': step.name, 'duration': round(duration, 3), 'status': status})
+        return status
+
+    async def run(self, targets=None, only=False):
+        """Run the selected steps, each as soon as the steps it runs after have finished"""
+        names = self.selection(targets, only)
+        tasks = {}
+
+        async def run_after(step):
+            upstream = [await tasks[name] for name in step.after if name in tasks]
+            if 'failed' in upstream or 'skipped' in upstream:
+                log.warning(f"⏭️  {step.name}: skipped, an earlier step failed", extra={'stage': step.name})
+                return 'skipped'
+            if self.dry_run and 'dirty' in upstream:
+                # What it would process depends on what the earlier steps produce
+                return 'after dirty'
+            return await self.run_step(step)
+
+        # Steps are declared after the steps they depend on, so every awaited task already exists
+        for name in names:
+            tasks[name] = asyncio.ensure_future(run_after(self.steps[name]))
+        for name in names:
+            self.results[name] = await tasks[name]
+        return self.results
+
+# Step actions
+
+def load_courses(workflow):
+    """(base URL, selected courses) from the manifest"""
+    from course_manifest import load_manifest, select_courses
+    manifest = load_manifest(workflow.options.get('manifest') or Path(__file__).resolve().parent.parent / "courses.json")
+    codes = workflow.options.get('courses')
+    courses = manifest['courses'] if codes == ['all'] else select_courses(manifest['courses'], codes)
+    return manifest['base_url'], courses
+
+async def discover(workflow):
+    """Resolve every learning path's modules and units over HTTP"""
+    from course_discovery import CourseDiscovery
+    from course_manifest import unique_paths
+    base_url, courses = load_courses(workflow)
+    discovery = CourseDiscovery(base_url, workflow.content_dir / ".discovery_cache.json")
+    await discovery.discover([path_info['url'] for path_info in unique_paths(courses)], refresh=True)
+
+async def crawl(workflow):
+    """Crawl the selected courses, resuming so units already on disk are not fetched again"""
+    crawler_module = import_script('az104_crawler')
+    base_url, courses = load_courses(workflow)
+    crawler = crawler_module.AZ104Crawler(resume=True, discover=True, courses=courses, base_url=base_url)
+    await crawler.crawl_complete_course()
+
+def clean_files(paths):
+    """Clean a chunk of unit pages in place (runs in a worker process); returns the paths that failed"""
+    from content_validation import is_error_page
+    cleaner = import_script('content_cleaner').ContentCleaner()
+    failed = []
+    for path in paths:
+        # Error placeholders keep their marker so the retry tools still find them
+        if is_error_page(path.read_text(encoding='utf-8', errors='replace')):
+            continue
+        if not cleaner.clean_file(path):
+            failed.append(path)
+    return failed
+
+def clean(workflow, changed, removed):
+    """Clean the English pages that changed since they were last cleaned"""
+    if len(changed) < MIN_FILES_FOR_POOL:
+        return clean_files(changed)
+    chunks = [changed[i:i + MIN_FILES_FOR_POOL] for i in range(0, len(changed), MIN_FILES_FOR_POOL)]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workflow.options.get('workers')) as pool:
+        return [path for failed in pool.map(clean_files, chunks) for path in failed]
+
+async def templates(workflow, changed, removed):
+    """Create Vietnamese templates for changed English pages, leaving translated pages alone"""
+    from translation_tools import TranslationTools
+    tools = TranslationTools()
+    pending = []
+    for english_file in changed:
+        target = workflow.steps['templates'].each(english_file)
+        if target.exists() and TEMPLATE_MARKER not in target.read_text(encoding='utf-8', errors='replace'):
+            # The catalog reports the translation as stale against the new English page
+            continue
+        pending.append(english_file)
+
+    failed = []
+    for i in range(0, len(pending), 20):
+        batch = pending[i:i + 20]
+        results = await asyncio.gather(*(tools.create_vietnamese_template(path) for path in batch))
+        failed.extend(path for path, ok in zip(batch, results) if not ok)
+    return failed
+
+def export(workflow, changed, removed):
+    """Write the structured JSON documents of the English pages that changed"""
+    from unit_export import document_path, export_pages
+    for source in removed:
+        document_path(source).unlink(missing_ok=True)
+    exported, _current, failed = export_pages(changed, force=True, workers=workflow.options.get('workers'))
+    log.info(f"📦 export: {exported} documents written, {len(failed)} failed", extra={'stage': 'export'})
+    return failed
+
+def snapshot(workflow):
+    """Record the English pages in the snapshot history"""
+    from snapshot_store import SnapshotStore
+    store = SnapshotStore(workflow.content_dir / "snapshots.db")
+    try:
+        report = store.take(workflow.content_dir, label='build')
+    finally:
+        store.close()
+    log.info(f"📸 snapshot {report['snapshot']}: {len(report['added'])} added, {len(report['changed'])} changed, "
+             f"{len(report['removed'])} removed", extra={'stage': 'snapshot'})
+
+def collect_assets(workflow):
+    """Collect garbage assets (report only unless asked); merging duplicates rewrites the pages using them"""
+    from asset_gc import AssetGC
+    mode = workflow.options.get('asset_gc') or 'report'
+    gc_report = AssetGC(workflow.content_dir, workers=workflow.options.get('workers')).run(
+        mode, merge_duplicates=mode != 'report'
+    )
+    if mode == 'report':
+        log.info(f"🖼️  gc: {len(gc_report['unreferenced'])} unreferenced, "
+                 f"{len(gc_report['duplicates'])} duplicate groups (--asset-gc quarantine to reclaim)",
+                 extra={'stage': 'gc'})
+    else:
+        log.info(f"🖼️  gc: {len(gc_report['swept'])} assets moved out ({gc_report['quarantine'] or mode})",
+                 extra={'stage': 'gc'})
+
+def assets(workflow):
+    """Check the English pages' links and assets"""
+    from link_checker import LinkChecker
+    report = LinkChecker(workflow.content_dir, workflow.options.get('workers')).check(('english',))
+    totals = report['totals']
+    if totals['broken'] or totals['remote']:
+        log.warning(f"⚠️  assets: {totals['broken']} broken local references, {totals['remote']} remote images "
+                    f"(python az104.py check-links for details)", extra={'stage': 'assets'})
+
+def unit_index(workflow):
+    """Table of contents of every unit, linking the English page and its Vietnamese page when there is one"""
+    import html
+    with open(workflow.content_dir / "course_structure.json", 'r', encoding='utf-8') as f:
+        structure = json.load(f)
+
+    lines = []
+    for learning_path in structure.get('learning_paths', []):
+        lines.append(f"<h2>{html.escape(learning_path['title'])}</h2>")
+        for module in learning_path.get('modules', []):
+            lines.append(f"<h3>{html.escape(module['title'])}</h3>\n<ol>")
+            for unit in module.get('units', []):
+                # Older structures name the English folder english_original
+                relative = unit.get('local_file', '').split('/', 1)[-1]
+                links = [
+                    f'<a href="content/{language}/{html.escape(relative)}">{label}</a>'
+                    for language, label in (('english', 'EN'), ('vietnamese', 'VI'))
+                    if (workflow.content_dir / language / relative).exists()
+                ]
+                lines.append(f"<li>{html.escape(unit['title'])} {' · '.join(links)}</li>")
+            lines.append("</ol>")
+
+    return f"""<!DOCTYPE html>
+<html lang="vi">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{html.escape(structure.get('course_title', 'AZ-104'))} - Mục lục</title>
+    <link rel="stylesheet" href="content/assets/styles.css">
+</head>
+<body>
+<h1>{html.escape(structure.get('course_title', 'AZ-104'))}</h1>
+{chr(10).join(lines)}
+</body>
+</html>
+"""
+
+def site(workflow, changed, removed):
+    """Copy changed pages and assets into the site directory and rebuild its unit index"""
+    target_for = workflow.steps['site'].each
+    for source in changed:
+        target = target_for(source)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(source, target)
+    for source in removed:
+        target_for(source).unlink(missing_ok=True)
+    atomic_write_text(workflow.options['site_dir'] / "units.html", unit_index(workflow))
+    log.info(f"🌐 site: {len(changed)} files copied, {len(removed)} removed -> {workflow.options['site_dir']}",
+             extra={'stage': 'site'})
+
+def build_steps(content_dir=Path("content"), site_dir=Path("site"), courses=None, asset_gc='report'):
+    """The content pipeline, each step after the steps it depends on
+    Options that change a step's output are part of its input digest"""
+    english = f"{content_dir}/english/**/*.html"
+    vietnamese = f"{content_dir}/vietnamese/**/*.html"
+    return [
+        Step('discover', discover, inputs=["courses.json"], outputs=[content_dir / ".discovery_cache.json"],
+             params={'courses': courses}, description="resolve learning paths' units over HTTP"),
+        Step('crawl', crawl, inputs=["courses.json", f"{content_dir}/.discovery_cache.json"],
+             outputs=[content_dir / "course_structure.json"], after=['discover'], params={'courses': courses},
+             description="crawl new and missing units"),
+        Step('clean', clean, inputs=[english], after=['crawl'], each=lambda path: path,
+             description="clean changed English pages in place"),
+        # Merging duplicate assets rewrites pages, so everything that reads the pages runs after it
+        Step('gc', collect_assets, inputs=[english, f"{content_dir}/assets/**/*"], after=['clean'],
+             params={'asset_gc': asset_gc}, description="collect unreferenced and duplicate assets"),
+        Step('templates', templates, inputs=[english], after=['gc'],
+             each=lambda path: content_dir / "vietnamese" / path.relative_to(content_dir / "english"),
+             description="Vietnamese templates for changed pages"),
+        Step('assets', assets, inputs=[english, f"{content_dir}/assets/**/*"], after=['gc'],
+             description="check links and assets"),
+        # The documents are written next to their pages; error pages have none and are simply re-checked
+        Step('export', export, inputs=[english], after=['gc'], each=lambda path: path,
+             description="structured JSON documents of changed pages"),
+        Step('snapshot', snapshot, inputs=[english], after=['gc'],
+             description="record the pages in the snapshot history"),
+        Step('site', site, inputs=["index.html", f"{content_dir}/course_structure.json", english, vietnamese,
+                                   f"{content_dir}/assets/**/*"],
+             outputs=[site_dir / "units.html"], after=['templates', 'assets'],
+             each=lambda path: site_dir / path, description=f"copy changed files into {site_dir}/")
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Bring the content up to date: discover -> crawl -> clean -> gc -> templates + assets + export + snapshot -> site"
+    )
+    parser.add_argument('targets', nargs='*', help="steps to bring up to date, with the steps they depend on (default: all)")
+    parser.add_argument('--only', action='store_true', help="run just the named steps, not the steps they depend on")
+    parser.add_argument('--force', action='append', default=[], metavar='STEP', help="run STEP even if its inputs are unchanged")
+    parser.add_argument('--force-all', action='store_true', help="ignore the cache")
+    parser.add_argument('--dry-run', action='store_true', help="show which steps are out of date without running them")
+    parser.add_argument('--list', action='store_true', help="list the steps and exit")
+    parser.add_argument('--course', action='append', metavar='CODE',
+                        help="course code from courses.json (repeatable; 'all' for every course; default: the first)")
+    parser.add_argument('--site-dir', default="site", help="where the site step writes the static site")
+    parser.add_argument('--asset-gc', choices=['report', 'quarantine'], default='report',
+                        help="what the gc step does with unreferenced and duplicate assets")
+    parser.add_argument('--workers', type=int, default=None, help="processes for cleaning and link checks")
+    add_logging_args(parser)
+    args = parser.parse_args()
+    setup_logging_from_args(args)
+
+    content_dir = Path("content")
+    site_dir = Path(args.site_dir)
+    steps = build_steps(content_dir, site_dir, args.course, args.asset_gc)
+    if args.list:
+        for step in steps:
+            after = f" (after {', '.join(step.after)})" if step.after else ""
+            print(f"  {step.name:<11}{step.description}{after}")
+        return
+
+    workflow = Workflow(
+        steps, content_dir,
+        force=[step.name for step in steps] if args.force_all else args.force,
+        dry_run=args.dry_run,
+        options={'courses': args.course, 'site_dir': site_dir, 'asset_gc': args.asset_gc, 'workers': args.workers}
+    )
+    try:
+        results = asyncio.run(workflow.run(args.targets, args.only))
+    except ValueError as e:
+        log.error(f"❌ {e}")
+        sys.exit(2)
+
+    log.info("\n" + "=" * 40)
+    icons = {'ran': '✅', 'cached': '💤', 'dirty': '🔄', 'after dirty': '🔄', 'partial': '⚠️ ', 'failed': '❌', 'skipped': '⏭️ '}
+    for name, status in results.items():
+        log.info(f"{icons[status]} {name:<11}{status}")
+    if any(status in ('failed', 'partial', 'skipped') for status in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -4,22 +4,48 @@ AZ-104 Microsoft Learn Course Crawler
 Main script to crawl the complete AZ-104 course content
 """
 
+import argparse
 import asyncio
-import json
+import hashlib
+import multiprocessing
+import os
 import re
+import sys
 import time
 import aiohttp
-import hashlib
 from pathlib import Path
 from playwright.async_api import async_playwright
 from bs4 import BeautifulSoup
-import aiofiles
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "crawlers"))
+from adaptive_timeouts import AdaptiveTimeouts
+from asset_index import AssetIndex
+from atomic_io import async_atomic_write_bytes, async_atomic_write_text
+from content_rules import COURSE_CRAWLER_UNWANTED, COURSE_ROOT_SELECTORS, prune_args, prune_soup
+from content_validation import (
+    ERROR, ERROR_PAGE_MARKER, OK, EmptyContentError, ExtractionResult, save_error_page, validate_content
+)
+from course_catalog import CourseCatalog
+from course_discovery import CourseDiscovery, path_units
+from course_manifest import DEFAULT_MANIFEST, load_manifest, select_courses, unique_paths
+from crawl_log import add_logging_args, get_logger, setup_logging_from_args
+from crawl_pipeline import Pipeline, Stage, render_fragment
+from crawl_checkpoint import CrawlCheckpoint
+from instrumentation import tracer
+from page_scripts import PRUNE_CONTENT_JS, UNIT_LINKS_JS
+from response_capture import ImageResponseCapture
+from retry_queue import RetryQueue, CircuitBreaker, CrawlHTTPError, RETRYABLE_STATUS_CODES, parse_retry_after
+from unit_export import build_document, save_unit_document
+from unit_urls import canonical_asset_url, canonical_unit_url, path_key
+
+log = get_logger('course_crawler')
+
 class AZ104Crawler:
-    def __init__(self):
-        self.base_url = "https://learn.microsoft.com"
-        self.course_url = "https://learn.microsoft.com/en-us/training/courses/az-104t00"
+    def __init__(self, resume=False, prune_in_browser=False, pipeline=False, pipeline_workers=None, queue_size=8,
+                 discover=False, refresh_discovery=False, courses=None, base_url="https://learn.microsoft.com"):
+        self.base_url = base_url
         self.output_dir = Path("content")
         self.output_dir.mkdir(exist_ok=True)
         
@@ -28,39 +54,46 @@ class AZ104Crawler:
         (self.output_dir / "vietnamese").mkdir(exist_ok=True)
         (self.output_dir / "assets").mkdir(exist_ok=True)
         
-        # All 6 learning paths
-        self.learning_paths = [
-            {
-                'title': 'AZ-104: Prerequisites for Azure administrators',
-                'url': '/en-us/training/paths/az-104-administrator-prerequisites/',
-                'expected_modules': 5
-            },
-            {
-                'title': 'AZ-104: Manage identities and governance in Azure',
-                'url': '/en-us/training/paths/az-104-manage-identities-governance/',
-                'expected_modules': 6
-            },
-            {
-                'title': 'AZ-104: Configure and manage virtual networks for Azure administrators',
-                'url': '/en-us/training/paths/az-104-manage-virtual-networks/',
-                'expected_modules': 8
-            },
-            {
-                'title': 'AZ-104: Implement and manage storage in Azure',
-                'url': '/en-us/training/paths/az-104-manage-storage/',
-                'expected_modules': 4
-            },
-            {
-                'title': 'AZ-104: Deploy and manage Azure compute resources',
-                'url': '/en-us/training/paths/az-104-manage-compute-resources/',
-                'expected_modules': 5
-            },
-            {
-                'title': 'AZ-104: Monitor and back up Azure resources',
-                'url': '/en-us/training/paths/az-104-monitor-backup-resources/',
-                'expected_modules': 3
-            }
-        ]
+        # Per-unit crawl state lives in the catalog; course_structure.json is exported from it
+        self.catalog = CourseCatalog(self.output_dir / "course_catalog.db")
+        self.retry_queue = RetryQueue(self.output_dir / "course_catalog.db")
+        self.circuit_breaker = CircuitBreaker()
+        self.asset_index = AssetIndex(self.output_dir / "course_catalog.db", self.output_dir / "assets")
+        self.timeouts = AdaptiveTimeouts(self.output_dir / "course_catalog.db")
+        
+        # Progress checkpoint so a crashed crawl can pick up where it stopped
+        self.resume = resume
+        self.checkpoint = CrawlCheckpoint(self.output_dir / ".crawl_checkpoint.json")
+        self.units_crawled = 0  # units fetched from the network in this run
+        self.tracer = tracer
+        
+        # Prune unwanted elements in the page and transfer only the remaining fragment
+        self.prune_in_browser = prune_in_browser
+        
+        # Staged pipeline: overlap page fetches, parsing, image downloads and writes across units
+        self.pipeline = pipeline
+        self.pipeline_workers = {
+            'fetch': 2,
+            'parse': min(4, os.cpu_count() or 1),
+            'assets': 4,
+            'write': 2,
+            **(pipeline_workers or {})
+        }
+        self.queue_size = queue_size
+        self.browser = None
+        self.process_pool = None
+        
+        # Resolve units over plain HTTP (catalog API + module pages) instead of scraping path pages
+        self.discover = discover
+        self.refresh_discovery = refresh_discovery
+        self.discovered_units = {}  # learning path url -> [{'title', 'url'}]
+        
+        # Courses to crawl (from courses.json); modules, units and images they share are fetched once
+        if courses is None:
+            manifest = load_manifest()
+            self.base_url = manifest['base_url']
+            courses = select_courses(manifest['courses'])
+        self.courses = courses
     
     def clean_filename(self, filename):
         """Clean filename for filesystem compatibility"""
@@ -69,11 +102,12 @@ class AZ104Crawler:
         return filename[:100]
     
     async def save_content(self, content, filepath):
-        """Save content to file asynchronously"""
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        async with aiofiles.open(filepath, 'w', encoding='utf-8') as f:
-            await f.write(content)
-        print(f"✅ Saved: {filepath.name}")
+        """Save content to file asynchronously (temp file + rename)"""
+        with self.tracer.span('write', str(filepath)):
+            await async_atomic_write_text(filepath, content)
+        self.tracer.count('bytes_written', len(content.encode('utf-8')))
+        log.info(f"✅ Saved: {filepath.name}")
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
     
     def group_units_by_module(self, units):
         """Group units by their module (based on URL pattern)"""
@@ -99,81 +133,124 @@ class AZ104Crawler:
     
     async def extract_units_from_learning_path(self, page, path_url):
         """Extract all units from a learning path"""
-        print(f"🔍 Extracting units from: {path_url}")
+        log.info(f"🔍 Extracting units from: {path_url}")
         
         full_url = self.base_url + path_url
-        await page.goto(full_url)
-        await page.wait_for_load_state('networkidle')
-        await page.wait_for_timeout(2000)
+        await self.circuit_breaker.wait_if_open(full_url)
+        with self.tracer.span('path_navigation', full_url):
+            await page.goto(full_url)
+            await page.wait_for_load_state('networkidle')
+            await page.wait_for_timeout(2000)
         
-        unit_links = await page.query_selector_all('a[href*="/training/modules/"]')
+        with self.tracer.span('link_extraction', full_url):
+            # href and text for every link in one round trip
+            unit_links = await page.eval_on_selector_all('a[href*="/training/modules/"]', UNIT_LINKS_JS)
         
         units = []
         seen_urls = set()
         
         for link in unit_links:
-            try:
-                href = await link.get_attribute('href')
-                if not href or href in seen_urls:
-                    continue
-                
-                seen_urls.add(href)
-                
-                if href.startswith('/'):
-                    full_unit_url = self.base_url + href
-                else:
-                    full_unit_url = href
-                
-                title = await link.inner_text()
-                title = title.strip()
-                
-                if title and full_unit_url and title.lower() != 'start':
-                    units.append({
-                        'title': title,
-                        'url': full_unit_url
-                    })
-                    
-            except Exception as e:
+            href = link['href']
+            if not href:
+                continue
+            
+            if href.startswith('/'):
+                full_unit_url = self.base_url + href
+            else:
+                full_unit_url = href
+            
+            # Enrollment query strings differ per learning path; the unit is the same page
+            full_unit_url = canonical_unit_url(full_unit_url)
+            if full_unit_url in seen_urls:
                 continue
+            seen_urls.add(full_unit_url)
+            
+            title = (link['text'] or '').strip()
+            
+            if title and full_unit_url and title.lower() != 'start':
+                units.append({
+                    'title': title,
+                    'url': full_unit_url
+                })
         
-        print(f"📚 Found {len(units)} units in this learning path")
+        log.info(f"📚 Found {len(units)} units in this learning path")
         return units
     
-    async def download_image(self, session, img_url, assets_dir):
-        """Download image and return local path"""
+    async def download_image(self, session, img_url, assets_dir, capture=None):
+        """Save image (from the browser's response if captured, else download) and return local path"""
+        # Concurrent units that share an image wait for the first download instead of repeating it
+        async with self.asset_index.claim(img_url):
+            return await self._download_image(session, img_url, assets_dir, capture)
+    
+    async def _download_image(self, session, img_url, assets_dir, capture):
+        """Download one image unless the asset index already has it (caller holds the URL's claim)"""
         try:
-            # Create a hash-based filename to avoid conflicts
-            url_hash = hashlib.md5(img_url.encode()).hexdigest()[:8]
+            entry = self.asset_index.get(img_url)
+            if entry:
+                self.tracer.count('images_cached')
+                return f"../../../assets/{entry['local_file']}"
+            
+            # Create a hash-based filename to avoid conflicts (tracking parameters don't count)
+            url_hash = hashlib.md5(canonical_asset_url(img_url).encode()).hexdigest()[:8]
             parsed_url = urlparse(img_url)
             file_ext = Path(parsed_url.path).suffix or '.jpg'
             local_filename = f"img_{url_hash}{file_ext}"
             local_path = assets_dir / local_filename
             
-            # Skip if already downloaded
+            # Saved by a run that predates the index
             if local_path.exists():
+                self.asset_index.put(img_url, local_filename)
+                self.tracer.count('images_cached')
+                return f"../../../assets/{local_filename}"
+            
+            captured = capture.get(img_url) if capture else None
+            if captured:
+                content, content_type = captured
+                await async_atomic_write_bytes(local_path, content)
+                self.asset_index.put(img_url, local_filename, content, content_type=content_type)
+                self.tracer.count('images_captured')
+                self.tracer.count('captured_bytes', len(content))
+                log.info(f"📷 Saved image from browser: {local_filename}", extra={'sample': 'image', 'stage': 'image', 'url': img_url})
                 return f"../../../assets/{local_filename}"
             
             async with session.get(img_url) as response:
                 if response.status == 200:
                     content = await response.read()
-                    async with aiofiles.open(local_path, 'wb') as f:
-                        await f.write(content)
-                    print(f"📷 Downloaded image: {local_filename}")
+                    await async_atomic_write_bytes(local_path, content)
+                    self.asset_index.put(
+                        img_url, local_filename, content,
+                        etag=response.headers.get('ETag'),
+                        content_type=response.headers.get('Content-Type')
+                    )
+                    self.tracer.count('images_downloaded')
+                    self.tracer.count('image_bytes', len(content))
+                    log.info(f"📷 Downloaded image: {local_filename}", extra={'sample': 'image', 'stage': 'image', 'url': img_url})
                     return f"../../../assets/{local_filename}"
                 else:
-                    print(f"❌ Failed to download image: {img_url} (Status: {response.status})")
+                    log.error(f"❌ Failed to download image: {img_url} (Status: {response.status})",
+                              extra={'stage': 'image', 'url': img_url})
+                    self.tracer.count('images_failed')
                     return img_url
         except Exception as e:
-            print(f"❌ Error downloading image {img_url}: {e}")
+            log.error(f"❌ Error downloading image {img_url}: {e}", extra={'stage': 'image', 'url': img_url})
+            self.tracer.count('images_failed')
             return img_url
 
-    async def process_images(self, soup, base_url, assets_dir):
+    def resolve_image_url(self, src, base_url):
+        """Convert a relative image src to an absolute URL"""
+        if src.startswith('//'):
+            return 'https:' + src
+        if src.startswith('/') or not src.startswith('http'):
+            return urljoin(base_url, src)
+        return src
+    
+    async def process_images(self, soup, base_url, assets_dir, unit_url=None, capture=None):
         """Process and download images in the content"""
         images = soup.find_all('img')
         if not images:
             return soup
         
-        print(f"🖼️  Processing {len(images)} images...")
+        log.info(f"🖼️  Processing {len(images)} images...")
         
         async with aiohttp.ClientSession() as session:
             for img in images:
@@ -181,19 +258,14 @@ class AZ104Crawler:
                 if not src:
                     continue
                 
-                # Convert relative URLs to absolute
-                if src.startswith('//'):
-                    img_url = 'https:' + src
-                elif src.startswith('/'):
-                    img_url = urljoin(base_url, src)
-                elif not src.startswith('http'):
-                    img_url = urljoin(base_url, src)
-                else:
-                    img_url = src
+                img_url = self.resolve_image_url(src, base_url)
                 
                 # Download and update src
-                local_path = await self.download_image(session, img_url, assets_dir)
+                with self.tracer.span('image_download', unit_url, image=img_url):
+                    local_path = await self.download_image(session, img_url, assets_dir, capture)
                 img['src'] = local_path
+                if unit_url and local_path != img_url:
+                    self.catalog.record_asset(unit_url, img_url, local_path)
                 
                 # Add alt text if missing
                 if not img.get('alt'):
@@ -201,53 +273,83 @@ class AZ104Crawler:
         
         return soup
 
-    async def extract_clean_content(self, page, unit_url, unit_title):
-        """Extract and clean content from a unit page"""
-        print(f"📖 Extracting: {unit_title}")
+    async def get_content_html(self, page, unit_url):
+        """Unit content HTML (already pruned when prune_in_browser is set), or None if missing"""
+        if self.prune_in_browser:
+            with self.tracer.span('extract_html', unit_url):
+                pruned = await page.evaluate(PRUNE_CONTENT_JS, prune_args(COURSE_ROOT_SELECTORS, COURSE_CRAWLER_UNWANTED))
+            content_html = pruned['html'] if pruned else None
+        else:
+            main_content = None
+            for selector in COURSE_ROOT_SELECTORS:
+                main_content = await page.query_selector(selector)
+                if main_content:
+                    break
+            if not main_content:
+                return None
+            with self.tracer.span('extract_html', unit_url):
+                content_html = await main_content.inner_html()
+        
+        if content_html is not None:
+            self.tracer.count('html_bytes', len(content_html))
+        return content_html
+    
+    async def navigate_to_unit(self, page, unit_url):
+        """Open a unit page and let it settle, failing fast on throttling or server errors"""
+        await self.circuit_breaker.wait_if_open(unit_url)
+        with self.tracer.span('navigation', unit_url):
+            response = await self.timeouts.goto(page, unit_url)
+        if response and response.status in RETRYABLE_STATUS_CODES:
+            error = CrawlHTTPError(unit_url, response.status, parse_retry_after(response.headers.get('retry-after')))
+            self.circuit_breaker.record(unit_url, False, error.retry_after)
+            raise error
+        self.circuit_breaker.record(unit_url, True)
+        with self.tracer.span('settle', unit_url):
+            # Ends as soon as the content and its images are in, capped by this unit's settle history
+            await self.timeouts.settle(page, unit_url, COURSE_ROOT_SELECTORS)
+    
+    async def extract_clean_content(self, page, unit_url, unit_title, course_title):
+        """Extract and clean content from a unit page, as an ExtractionResult"""
+        log.info(f"📖 Extracting: {unit_title}")
         
+        # Keep the images Chromium loads so they don't have to be downloaded again
+        capture = ImageResponseCapture(page).attach()
         try:
-            await page.goto(unit_url)
-            await page.wait_for_load_state('networkidle')
-            await page.wait_for_timeout(1000)
-            
+            await self.navigate_to_unit(page, unit_url)
             page_title = await page.title()
             
-            # Find main content
-            main_content = await page.query_selector('#module-unit-content')
-            if not main_content:
-                main_content = await page.query_selector('main')
+            content_html = await self.get_content_html(page, unit_url)
+            soup = None
+            if content_html is not None:
+                with self.tracer.span('parse', unit_url):
+                    soup = BeautifulSoup(content_html, 'html.parser')
+                    if not self.prune_in_browser:
+                        prune_soup(soup, COURSE_CRAWLER_UNWANTED)
             
-            if main_content:
-                content_html = await main_content.inner_html()
-                soup = BeautifulSoup(content_html, 'html.parser')
-                
-                # Remove unwanted elements
-                unwanted_selectors = [
-                    '.xp-tag', '.metadata', '.page-metadata',
-                    '[data-progress-uid]', '[data-bi-name]',
-                    '.visually-hidden', '.docon', 
-                    'button', '.button', '[role="button"]',
-                    '.feedback', '.rating', '.helpful',
-                    '.navigation', '.breadcrumb'
-                ]
-                
-                for selector in unwanted_selectors:
-                    for element in soup.select(selector):
-                        element.decompose()
-                
-                # Process images
-                assets_dir = self.output_dir / "assets"
-                soup = await self.process_images(soup, self.base_url, assets_dir)
-                
-                # Create clean HTML
-                clean_html = self._create_clean_html(page_title, unit_title, unit_url, soup)
-                return clean_html
+            problem = validate_content(soup, page_title)
+            if problem:
+                log.warning(f"⚠️  {problem.status}: {problem} ({unit_url})",
+                            extra={'unit': unit_url, 'stage': 'validate', 'status': problem.status})
+                return ExtractionResult.failed(problem, self._create_error_html(unit_url, str(problem)))
+            
+            # Process images
+            assets_dir = self.output_dir / "assets"
+            await capture.drain()
+            soup = await self.process_images(soup, self.base_url, assets_dir, unit_url, capture)
+            
+            # Create clean HTML
+            with self.tracer.span('render', unit_url):
+                clean_html = self._create_clean_html(page_title, unit_title, unit_url, course_title, soup.prettify())
+                document = build_document(soup, {'title': unit_title, 'url': unit_url, 'page_title': page_title})
+            return ExtractionResult(OK, clean_html, document=document)
             
         except Exception as e:
-            print(f"❌ Error extracting content from {unit_url}: {e}")
-            return self._create_error_html(unit_url, str(e))
+            log.error(f"❌ Error extracting content from {unit_url}: {e}", extra={'unit': unit_url, 'stage': 'extract'})
+            return ExtractionResult.failed(e, self._create_error_html(unit_url, str(e)))
+        finally:
+            capture.detach()
     
-    def _create_clean_html(self, page_title, unit_title, unit_url, content_soup):
+    def _create_clean_html(self, page_title, unit_title, unit_url, course_title, content_html):
         """Create clean HTML with consistent styling"""
         return f"""<!DOCTYPE html>
 <html lang="en">
@@ -262,11 +364,11 @@ class AZ104Crawler:
         <h2>📚 Course Information</h2>
         <p><strong>Unit:</strong> {unit_title}</p>
         <p><strong>Source:</strong> <a href="{unit_url}" target="_blank">{unit_url}</a></p>
-        <p><strong>Course:</strong> AZ-104: Microsoft Azure Administrator</p>
+        <p><strong>Course:</strong> {course_title}</p>
     </div>
     
     <div class="main-content">
-        {content_soup.prettify()}
+        {content_html}
     </div>
     
     <div class="translation-placeholder">
@@ -280,7 +382,7 @@ class AZ104Crawler:
         """Create error HTML"""
         return f"""<!DOCTYPE html>
 <html>
-<head><title>Error</title></head>
+<head><title>Error</title>{ERROR_PAGE_MARKER}</head>
 <body>
     <h1>Error Extracting Content</h1>
     <p>Could not extract content from: <a href="{url}">{url}</a></p>
@@ -288,16 +390,187 @@ class AZ104Crawler:
 </body>
 </html>"""
     
-    async def crawl_learning_path(self, page, path_info, path_index):
-        """Crawl a single learning path"""
-        print(f"\n🎯 Processing Learning Path {path_index}: {path_info['title']}")
+    def record_unit_success(self, job, content_hash):
+        """Record a saved unit in the retry queue, checkpoint and catalog"""
+        unit = job['unit']
+        self.retry_queue.record_success(unit['url'])
+        self.tracer.count('units_ok')
+        self.checkpoint.mark_unit_done(unit['url'], job['local_file'])
+        self.catalog.record_unit_result(
+            job['module_id'], job['unit_index'], unit['title'], unit['url'], job['local_file'],
+            success=True, content_hash=content_hash
+        )
+    
+    def record_unit_failure(self, job, error):
+        """Record a failed unit in the catalog and queue it for a backoff retry"""
+        unit = job['unit']
+        log.error(f"❌ Error processing unit {unit['title']}: {error}",
+                  extra={'unit': unit['url'], 'stage': 'unit', 'status': getattr(error, 'status', ERROR)})
+        self.tracer.count('units_failed')
+        self.tracer.count(f"units_{getattr(error, 'status', ERROR)}")
+        self.catalog.record_unit_result(
+            job['module_id'], job['unit_index'], unit['title'], unit['url'], job['local_file'],
+            success=False, error=str(error)
+        )
+        self.retry_queue.record_failure(
+            unit['url'], job['filepath'], error, unit['title'], getattr(error, 'retry_after', None)
+        )
+    
+    async def new_page(self):
+        """Open a browser page with the crawler's headers"""
+        page = await self.browser.new_page()
+        await page.set_extra_http_headers({
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        })
+        return page
+    
+    async def run_unit_pipeline(self, jobs):
+        """Crawl units through the fetch → assets → parse → write pipeline"""
+        workers = self.pipeline_workers
+        log.info(f"\n🏭 Pipeline: {len(jobs)} units "
+              f"(fetch={workers['fetch']}, assets={workers['assets']}, parse={workers['parse']}, write={workers['write']})")
+        
+        if self.process_pool is None:
+            # spawn, not fork: the parent has Playwright and event loop threads running
+            self.process_pool = ProcessPoolExecutor(
+                max_workers=workers['parse'], mp_context=multiprocessing.get_context('spawn')
+            )
+        
+        # Each fetch worker borrows its own page
+        pages = asyncio.Queue()
+        for _ in range(workers['fetch']):
+            pages.put_nowait(await self.new_page())
+        
+        loop = asyncio.get_running_loop()
+        assets_dir = self.output_dir / "assets"
+        
+        async def fetch(job):
+            page = await pages.get()
+            capture = ImageResponseCapture(page).attach()
+            try:
+                with self.tracer.span('fetch_stage', job['unit']['url']):
+                    await self.navigate_to_unit(page, job['unit']['url'])
+                    job['page_title'] = await page.title()
+                    # Images that survive pruning are known before parsing, so each fragment is parsed once
+                    with self.tracer.span('extract_html', job['unit']['url']):
+                        pruned = await page.evaluate(
+                            PRUNE_CONTENT_JS, prune_args(COURSE_ROOT_SELECTORS, COURSE_CRAWLER_UNWANTED)
+                        )
+                    job['image_srcs'] = [image['src'] for image in pruned['images'] if image['src']] if pruned else []
+                    if self.prune_in_browser:
+                        job['html'] = pruned['html'] if pruned else None
+                        if pruned:
+                            self.tracer.count('html_bytes', len(pruned['html']))
+                    else:
+                        job['html'] = await self.get_content_html(page, job['unit']['url'])
+                    await capture.drain()
+                    job['captured'] = dict(capture.bodies)
+                if job['html'] is None:
+                    raise EmptyContentError("No main content found")
+                log.info(f"📖 Fetched: {job['unit']['title']}")
+                # Same per-page pacing as the sequential crawl
+                await asyncio.sleep(1)
+            except Exception as e:
+                job['error'] = e
+            finally:
+                capture.detach()
+                pages.put_nowait(page)
+            return job
+        
+        async def fetch_assets(job):
+            if 'error' not in job:
+                unit_url = job['unit']['url']
+                captured = job.pop('captured')
+                job['image_paths'] = {}
+                for src in job['image_srcs']:
+                    img_url = self.resolve_image_url(src, self.base_url)
+                    with self.tracer.span('image_download', unit_url, image=img_url):
+                        # A dict has the same get(url) -> (body, content_type) shape as ImageResponseCapture
+                        local_path = await self.download_image(session, img_url, assets_dir, captured)
+                    job['image_paths'][src] = local_path
+                    if local_path != img_url:
+                        self.catalog.record_asset(unit_url, img_url, local_path)
+            return job
+        
+        async def parse(job):
+            if 'error' not in job:
+                unit = job['unit']
+                selectors = None if self.prune_in_browser else COURSE_CRAWLER_UNWANTED
+                details = {'title': unit['title'], 'url': unit['url'], 'page_title': job['page_title']}
+                with self.tracer.span('parse', unit['url']):
+                    job['content_html'], job['document'], problem = await loop.run_in_executor(
+                        self.process_pool, render_fragment, job.pop('html'), selectors, job['image_paths'], details
+                    )
+                if problem:
+                    log.warning(f"⚠️  {problem.status}: {problem} ({unit['url']})")
+                    job['error'] = problem
+            return job
+        
+        async def write(job):
+            unit = job['unit']
+            with self.tracer.span('unit_write', unit['url']):
+                if 'error' in job:
+                    # The error page only fills a gap; a unit saved by an earlier crawl stays in place
+                    await save_error_page(job['filepath'], self._create_error_html(unit['url'], str(job['error'])))
+                    self.record_unit_failure(job, job['error'])
+                    return job
+                
+                with self.tracer.span('render', unit['url']):
+                    content = self._create_clean_html(job['page_title'], unit['title'], unit['url'],
+                                                      job['course_title'], job.pop('content_html'))
+                content_hash = await self.save_content(content, job['filepath'])
+                await save_unit_document(job.pop('document'), job['filepath'], content_hash)
+            
+            self.record_unit_success(job, content_hash)
+            job['ok'] = True
+            return job
+        
+        def on_error(stage_name, job, error):
+            self.record_unit_failure(job, error)
+        
+        pipeline = Pipeline([
+            Stage('fetch', fetch, workers['fetch'], self.queue_size),
+            Stage('assets', fetch_assets, workers['assets'], self.queue_size),
+            Stage('parse', parse, workers['parse'], self.queue_size),
+            Stage('write', write, workers['write'], self.queue_size)
+        ], on_error=on_error)
+        
+        try:
+            async with aiohttp.ClientSession() as session:
+                await pipeline.run(jobs)
+        finally:
+            while not pages.empty():
+                await pages.get_nowait().close()
+        
+        log.info(f"🏭 Pipeline finished:")
+        pipeline.print_stats()
+    
+    async def crawl_learning_path(self, page, path_info, path_index, course_title):
+        """Crawl a single learning path; its pages name course_title (the first course that includes the path)"""
+        log.info(f"\n🎯 Processing Learning Path {path_index}: {path_info['title']}")
         
         path_dir = self.output_dir / "english" / f"{path_index:02d}_{self.clean_filename(path_info['title'])}"
+        path_id = self.catalog.upsert_learning_path(
+            path_index, path_info['title'], self.base_url + path_info['url'], path_info['expected_modules']
+        )
         
-        units = await self.extract_units_from_learning_path(page, path_info['url'])
+        units = self.checkpoint.path_units(path_info['url'])
+        if units is not None:
+            log.info(f"♻️  Using {len(units)} units discovered in the previous run")
+        else:
+            units = self.discovered_units.get(path_info['url'])
+            if units:
+                log.info(f"🧭 Using {len(units)} units from HTTP discovery")
+            else:
+                units = await self.extract_units_from_learning_path(page, path_info['url'])
+            self.checkpoint.set_path_units(path_info['url'], units)
+        # Checkpoints from older runs still carry per-path enrollment query strings
+        units = [dict(unit, url=canonical_unit_url(unit['url'])) for unit in units]
         modules = self.group_units_by_module(units)
         
-        print(f"📦 Organized into {len(modules)} modules")
+        log.info(f"📦 Organized into {len(modules)} modules")
+        if path_info['expected_modules'] is not None and len(modules) != path_info['expected_modules']:
+            log.warning(f"⚠️  Expected {path_info['expected_modules']} modules, found {len(modules)}")
         
         path_structure = {
             'title': path_info['title'],
@@ -307,10 +580,14 @@ class AZ104Crawler:
             'modules': []
         }
         
+        jobs = []  # units handed to the staged pipeline
+        
         for module_index, module in enumerate(modules, 1):
-            print(f"\n📁 Module {module_index}: {module['title']}")
+            log.info(f"\n📁 Module {module_index}: {module['title']}")
+            crawled_before_module = self.units_crawled
             
             module_dir = path_dir / f"{module_index:02d}_{self.clean_filename(module['title'])}"
+            module_id = self.catalog.upsert_module(path_id, module_index, module['title'])
             
             module_structure = {
                 'title': module['title'],
@@ -318,81 +595,248 @@ class AZ104Crawler:
             }
             
             for unit_index, unit in enumerate(module['units'], 1):
-                try:
-                    content = await self.extract_clean_content(page, unit['url'], unit['title'])
-                    
-                    unit_filename = f"{unit_index:02d}_{self.clean_filename(unit['title'])}.html"
-                    unit_filepath = module_dir / unit_filename
-                    await self.save_content(content, unit_filepath)
-                    
+                unit_filename = f"{unit_index:02d}_{self.clean_filename(unit['title'])}.html"
+                unit_filepath = module_dir / unit_filename
+                local_file = str(unit_filepath.relative_to(self.output_dir))
+                # Register the unit before extraction so image assets can reference it
+                self.catalog.upsert_unit(module_id, unit_index, unit['title'], unit['url'], local_file)
+                
+                # A unit shared with an earlier learning path is stored once, in that path's folder
+                stored = self.catalog.unit_by_url(unit['url'])
+                if stored and stored['module_id'] != module_id and stored['local_file']:
+                    local_file = stored['local_file']
+                    unit_filepath = self.output_dir / local_file
+                    log.info(f"🔗 Shared with another learning path: {local_file}")
+                
+                if self.checkpoint.is_unit_done(unit['url'], self.output_dir):
+                    log.info(f"⏭️  Already crawled: {unit['title']}")
                     module_structure['units'].append({
                         'title': unit['title'],
                         'url': unit['url'],
-                        'local_file': str(unit_filepath.relative_to(self.output_dir))
+                        'local_file': local_file
                     })
+                    continue
+                
+                self.units_crawled += 1
+                job = {
+                    'module_id': module_id,
+                    'unit_index': unit_index,
+                    'unit': unit,
+                    'filepath': unit_filepath,
+                    'local_file': local_file,
+                    'course_title': course_title,
+                    'entry': {'title': unit['title'], 'url': unit['url'], 'local_file': local_file}
+                }
+                if self.pipeline:
+                    # Listed now to keep the module's unit order; dropped below if it fails
+                    jobs.append(job)
+                    module_structure['units'].append(job['entry'])
+                    continue
+                
+                try:
+                    with self.tracer.span('unit', unit['url'], title=unit['title']):
+                        result = await self.extract_clean_content(page, unit['url'], unit['title'], course_title)
+                        if not result.ok:
+                            await save_error_page(unit_filepath, result.html)
+                            raise result.error
+                        content_hash = await self.save_content(result.html, unit_filepath)
+                        await save_unit_document(result.document, unit_filepath, content_hash)
+                    
+                    self.record_unit_success(job, content_hash)
+                    module_structure['units'].append(job['entry'])
                     
                     await asyncio.sleep(1)
                     
                 except Exception as e:
-                    print(f"❌ Error processing unit {unit['title']}: {e}")
+                    self.record_unit_failure(job, e)
                     continue
             
             path_structure['modules'].append(module_structure)
-            await asyncio.sleep(2)
+            if not self.pipeline and self.units_crawled > crawled_before_module:
+                await asyncio.sleep(2)
+        
+        if jobs:
+            await self.run_unit_pipeline(jobs)
+            failed_entries = [job['entry'] for job in jobs if not job.get('ok')]
+            for module_structure in path_structure['modules']:
+                module_structure['units'] = [
+                    entry for entry in module_structure['units']
+                    if not any(entry is failed for failed in failed_entries)
+                ]
+        
+        self.checkpoint.save(force=True)
         
         return path_structure
     
+    async def discover_units(self):
+        """Resolve every learning path's units over HTTP before the browser starts"""
+        discovery = CourseDiscovery(self.base_url, self.output_dir / ".discovery_cache.json")
+        learning_paths = unique_paths(self.courses)
+        path_urls = [path_info['url'] for path_info in learning_paths]
+        discovered = await discovery.discover(path_urls, refresh=self.refresh_discovery)
+        for path_info, path_structure in zip(learning_paths, discovered):
+            # A module that failed to resolve would leave the path (and its checkpoint) short of units
+            if any(module.get('error') for module in path_structure['modules']):
+                log.warning(f"⚠️  Discovery was incomplete for {path_info['title']}, will scrape its page")
+                continue
+            units = path_units(path_structure)
+            if units:
+                self.discovered_units[path_info['url']] = units
+            else:
+                log.warning(f"⚠️  Discovery found no units for {path_info['title']}, will scrape its page")
+    
+    async def crawl_course(self, page, course, crawled_paths):
+        """Crawl one course's learning paths, reusing paths another course already crawled this run"""
+        course_structure = {
+            'course_title': course['title'],
+            'course_url': self.base_url + course['url'],
+            'crawl_timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'total_learning_paths': len(course['learning_paths']),
+            'learning_paths': []
+        }
+        course_id = self.catalog.upsert_course(
+            course['code'], course['title'], course_structure['course_url'], course_structure['crawl_timestamp']
+        )
+        
+        for path_number, path_info in enumerate(course['learning_paths'], 1):
+            log.info(f"\n{'='*20} LEARNING PATH {path_number}/{len(course['learning_paths'])} {'='*20}")
+            key = path_key(path_info['url'])
+            if key in crawled_paths:
+                log.info(f"🔗 Already crawled for another course: {path_info['title']}")
+                course_structure['learning_paths'].append(crawled_paths[key])
+                continue
+            
+            try:
+                crawled_before_path = self.units_crawled
+                # Paths are numbered across all courses, so each one keeps a single folder
+                path_index = self.catalog.path_index_for(self.base_url + path_info['url'])
+                path_structure = await self.crawl_learning_path(page, path_info, path_index, course['title'])
+                crawled_paths[key] = path_structure
+                course_structure['learning_paths'].append(path_structure)
+                
+                # Paths fully restored from the checkpoint made no requests worth pacing
+                if self.units_crawled > crawled_before_path:
+                    log.info(f"⏳ Waiting 10 seconds before next learning path...")
+                    await asyncio.sleep(10)
+                
+            except Exception as e:
+                log.error(f"❌ Error processing learning path {path_info['title']}: {e}")
+                continue
+        
+        self.catalog.set_course_paths(
+            course_id, [self.base_url + path_info['url'] for path_info in course['learning_paths']]
+        )
+        return course_structure
+    
     async def crawl_complete_course(self):
-        """Crawl the complete AZ-104 course"""
-        print("🚀 Starting AZ-104 Course Crawl")
-        print("=" * 60)
+        """Crawl every selected course; content shared between courses is crawled and stored once"""
+        log.info(f"🚀 Starting course crawl: {', '.join(course['title'] for course in self.courses)}")
+        log.info("=" * 60)
+        
+        if self.resume and self.checkpoint.load():
+            log.info(f"♻️  Resuming from checkpoint: {self.checkpoint.completed_count} units already crawled")
+        else:
+            self.checkpoint.reset()
+        
+        if self.discover:
+            await self.discover_units()
         
         async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            await page.set_extra_http_headers({
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            })
+            self.browser = browser = await p.chromium.launch(headless=True)
+            page = await self.new_page()
             
-            course_structure = {
-                'course_title': 'AZ-104: Microsoft Azure Administrator',
-                'course_url': self.course_url,
-                'crawl_timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
-                'total_learning_paths': len(self.learning_paths),
-                'learning_paths': []
-            }
+            # course_structure.json covers everything crawled; courses/<code>.json covers one course
+            self.catalog.set_course(
+                ' + '.join(course['title'] for course in self.courses),
+                self.base_url + self.courses[0]['url'] if len(self.courses) == 1 else None
+            )
+            crawled_paths = {}  # path key -> path structure, for paths shared between courses
+            course_structures = []
             
             try:
-                for path_index, path_info in enumerate(self.learning_paths, 1):
-                    try:
-                        print(f"\n{'='*20} LEARNING PATH {path_index}/{len(self.learning_paths)} {'='*20}")
-                        path_structure = await self.crawl_learning_path(page, path_info, path_index)
-                        course_structure['learning_paths'].append(path_structure)
-                        
-                        print(f"⏳ Waiting 10 seconds before next learning path...")
-                        await asyncio.sleep(10)
-                        
-                    except Exception as e:
-                        print(f"❌ Error processing learning path {path_info['title']}: {e}")
-                        continue
+                for course_number, course in enumerate(self.courses, 1):
+                    if len(self.courses) > 1:
+                        log.info(f"\n{'#'*20} COURSE {course_number}/{len(self.courses)}: {course['title']} {'#'*20}")
+                    course_structures.append(await self.crawl_course(page, course, crawled_paths))
                 
             finally:
                 await browser.close()
+                self.browser = None
+                if self.process_pool:
+                    self.process_pool.shutdown()
+                    self.process_pool = None
+                self.checkpoint.save(force=True)
             
-            # Save course structure
-            structure_file = self.output_dir / "course_structure.json"
-            async with aiofiles.open(structure_file, 'w', encoding='utf-8') as f:
-                await f.write(json.dumps(course_structure, indent=2, ensure_ascii=False))
+            # Export course structure from the catalog for JSON consumers
+            structure_file = self.catalog.export_json(self.output_dir / "course_structure.json")
+            for course in self.courses:
+                self.catalog.export_json(self.output_dir / "courses" / f"{course['code'].lower()}.json", course['code'])
             
-            print(f"\n🎉 Course crawl completed!")
-            print(f"📊 Structure saved to: {structure_file}")
-            print(f"📁 Content saved to: {self.output_dir}")
+            shared_paths = sum(len(course['learning_paths']) for course in self.courses) - len(unique_paths(self.courses))
+            log.info(f"\n🎉 Course crawl completed!")
+            if shared_paths > 0:
+                log.info(f"🔗 {shared_paths} learning paths shared between courses were crawled once")
+            log.info(f"📊 Structure saved to: {structure_file}")
+            log.info(f"📁 Content saved to: {self.output_dir}")
+            self.asset_index.print_stats()
+            self.tracer.report(self.output_dir / "metrics", "course_crawl")
             
-            return course_structure
+            return course_structures
 
 async def main():
-    crawler = AZ104Crawler()
+    parser = argparse.ArgumentParser(description="Crawl Microsoft Learn courses (AZ-104 by default)")
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help="course manifest (default: courses.json)")
+    parser.add_argument('--course', action='append', metavar='CODE',
+                        help="course code from the manifest to crawl (repeatable, default: the first course)")
+    parser.add_argument('--all-courses', action='store_true', help="crawl every course in the manifest")
+    parser.add_argument('--list-courses', action='store_true', help="list the manifest's courses and exit")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue from content/.crawl_checkpoint.json, skipping completed units")
+    parser.add_argument('--prune-in-browser', action='store_true',
+                        help="remove unwanted elements in the page before transferring the content")
+    parser.add_argument('--discover', action='store_true',
+                        help="find units via the Learn catalog API and module pages instead of the browser")
+    parser.add_argument('--refresh-discovery', action='store_true',
+                        help="ignore content/.discovery_cache.json (--discover)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="overlap page fetches, parsing, image downloads and writes across units")
+    parser.add_argument('--fetch-workers', type=int, default=2, help="browser pages fetching units (--pipeline)")
+    parser.add_argument('--parse-workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help="processes parsing and rendering units (--pipeline)")
+    parser.add_argument('--asset-workers', type=int, default=4, help="units downloading images at once (--pipeline)")
+    parser.add_argument('--write-workers', type=int, default=2, help="units being written at once (--pipeline)")
+    parser.add_argument('--queue-size', type=int, default=8, help="units buffered between stages (--pipeline)")
+    add_logging_args(parser)
+    args = parser.parse_args()
+    setup_logging_from_args(args)
+    
+    manifest = load_manifest(args.manifest)
+    if args.list_courses:
+        for course in manifest['courses']:
+            print(f"{course['code']:<10} {course['title']} ({len(course['learning_paths'])} learning paths)")
+        return
+    try:
+        courses = manifest['courses'] if args.all_courses else select_courses(manifest['courses'], args.course)
+    except ValueError as e:
+        log.error(f"❌ {e}")
+        sys.exit(1)
+    
+    crawler = AZ104Crawler(
+        resume=args.resume,
+        prune_in_browser=args.prune_in_browser,
+        pipeline=args.pipeline,
+        pipeline_workers={
+            'fetch': args.fetch_workers,
+            'parse': args.parse_workers,
+            'assets': args.asset_workers,
+            'write': args.write_workers
+        },
+        queue_size=args.queue_size,
+        discover=args.discover,
+        refresh_discovery=args.refresh_discovery,
+        courses=courses,
+        base_url=manifest['base_url']
+    )
     await crawler.crawl_complete_course()
 
 if __name__ == "__main__":
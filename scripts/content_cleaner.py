@@ -6,38 +6,23 @@ Cleans up crawled content by removing unnecessary elements
 
 import os
 import re
+import sys
 from pathlib import Path
-from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "crawlers"))
+from content_rules import CLEANER_UNWANTED, UNWANTED_TEXT_PATTERNS, prune_soup
 
 class ContentCleaner:
     def __init__(self, content_dir="content/english"):
         self.content_dir = Path(content_dir)
         
-        # Unwanted text patterns to remove
-        self.unwanted_patterns = [
-            r'Get started with Azure.*?Sign up\.',
-            r'Choose the Azure account.*?Sign up\.',
-            r'Pay as you go or try Azure free.*?Sign up\.',
-            r'Module incomplete:.*?Previous Go back to finish',
-            r'Need help\? See our troubleshooting guide.*?reporting an issue\.',
-            r'Feedback\s*Was this page helpful\?\s*Yes\s*No',
-            r'Was this page helpful\?\s*Yes\s*No',
-            r'Sign in to save your progress',
-            r'Complete the module to unlock',
-            r'XP\s*\d+\s*minutes?',
-            r'Completed\s*\d+\s*XP',
-            r'Unit \d+ of \d+',
-            r'Previous\s*Next',
-            r'Continue\s*Next unit:',
-            r'Ask Learn',
-            r'Browse all courses',
-            r'Start learning path',
-            r'Add to collection',
-            r'Share this page'
-        ]
+        # Unwanted elements and text patterns are shared with the crawlers' in-browser pruning
+        self.unwanted_selectors = CLEANER_UNWANTED
+        self.unwanted_patterns = UNWANTED_TEXT_PATTERNS
     
     def extract_clean_content(self, html_content):
         """Extract only the essential learning content"""
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, 'html.parser')
         
         # Find the main content area
@@ -48,38 +33,8 @@ class ContentCleaner:
                 main_content = soup.find('main')
         
         if main_content:
-            # Remove unwanted elements
-            unwanted_selectors = [
-                '.xp-tag', '.metadata', '.page-metadata',
-                '[data-progress-uid]', '[data-bi-name]',
-                '.visually-hidden', '.docon', 
-                'button', '.button', '[role="button"]',
-                '.feedback', '.rating', '.helpful',
-                '.navigation', '.breadcrumb', '.uhf-container',
-                '[data-test-id]', '.site-header',
-                '.module-progress', '.completion',
-                '.cta', '.call-to-action', '.promo',
-                '.ad', '.advertisement'
-            ]
-            
-            for selector in unwanted_selectors:
-                for element in main_content.select(selector):
-                    element.decompose()
-            
-            # Remove text nodes matching unwanted patterns
-            for text_node in main_content.find_all(string=True):
-                text = text_node.strip()
-                for pattern in self.unwanted_patterns:
-                    if re.search(pattern, text, re.IGNORECASE | re.DOTALL):
-                        parent = text_node.parent
-                        if parent:
-                            parent.decompose()
-                        break
-            
-            # Clean up empty elements
-            for element in main_content.find_all():
-                if not element.get_text(strip=True) and not element.find('img') and element.name not in ['br', 'hr']:
-                    element.decompose()
+            # Remove unwanted elements, boilerplate text and empty elements
+            prune_soup(main_content, self.unwanted_selectors, self.unwanted_patterns, drop_empty=True)
             
             return main_content
         
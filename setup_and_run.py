@@ -5,7 +5,6 @@ Setup script for AZ-104 crawler
 
 import subprocess
 import sys
-import os
 
 def run_command(command, description):
     """Run a command and handle errors"""
@@ -43,14 +42,17 @@ def main():
         sys.exit(1)
     
     print("\n🎉 Setup completed successfully!")
-    print("\nTo run the crawler:")
-    print("python az104_advanced_crawler.py")
+    print("\nTo crawl and build everything that is out of date:")
+    print("python az104.py build")
     
-    # Ask if user wants to run now
-    response = input("\nDo you want to start crawling now? (y/n): ").lower().strip()
+    # --build runs the pipeline unattended; otherwise ask
+    if '--build' in sys.argv[1:]:
+        response = 'y'
+    else:
+        response = input("\nDo you want to start crawling now? (y/n): ").lower().strip()
     if response in ['y', 'yes']:
         print("\n🕷️ Starting crawler...")
-        os.system("python az104_advanced_crawler.py")
+        sys.exit(subprocess.run([sys.executable, "az104.py", "build"]).returncode)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file